@@ -0,0 +1,22 @@
+# backend/accounts/management/commands/rebuild_user_search_index.py
+import time
+from django.core.management.base import BaseCommand
+from accounts.search import rebuild_index, INDEX_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Rebuild the trigram search index for all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INDEX_BATCH_SIZE,
+            help='Number of users indexed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        indexed = rebuild_index(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} users in {time.perf_counter() - started:.2f}s')
+        )
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:15
+
+import re
+import unicodedata
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 索引を作った時点の設定（accounts.search と同じ値。以降の変更の影響を受けないようここに固定する）
+SEARCH_FIELDS = ['username', 'email', 'first_name', 'last_name', 'display_name', 'department']
+GRAM_SHIFT = 21
+WORD_SEPARATOR = re.compile(r'[\s@._\-+]+')
+BATCH_SIZE = 1000
+
+
+def user_grams(values):
+    """ユーザー1人分のtrigramのコード（accounts.search.text_grams と同じ規則）"""
+    codes = set()
+    text = unicodedata.normalize('NFKC', ' '.join(value or '' for value in values)).casefold()
+    for word in WORD_SEPARATOR.split(text):
+        if not word:
+            continue
+        padded = f'  {word} '
+        for index in range(len(padded) - 2):
+            code = 0
+            for char in padded[index:index + 3]:
+                code = (code << GRAM_SHIFT) | ord(char)
+            codes.add(code)
+    return codes
+
+
+def build_search_index(apps, schema_editor):
+    """既存のユーザーの索引を作る（以降は保存時のシグナルと一括登録の処理で更新される）"""
+    User = apps.get_model('accounts', 'User')
+    UserSearchTerm = apps.get_model('accounts', 'UserSearchTerm')
+
+    terms = []
+    for user_id, *values in User.objects.order_by('id').values_list('id', *SEARCH_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        terms.extend(UserSearchTerm(gram=code, user_id=user_id) for code in user_grams(values))
+        if len(terms) >= BATCH_SIZE * 20:
+            UserSearchTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE)
+            terms = []
+    UserSearchTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_department_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.BigIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('gram', 'user')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
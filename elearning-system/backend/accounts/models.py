@@ -30,5 +30,23 @@ class User(AbstractUser):
         verbose_name='user permissions',
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # 部署・ロールでの絞り込み（部署別の集計・エクスポート）用
+            models.Index(fields=['department', 'role'], name='accounts_user_dept_role'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
+
+class UserSearchTerm(models.Model):
+    """
+    ユーザー名・メール・氏名・表示名・部署の文字trigram索引（1行 = あるtrigramを含む1ユーザー）
+
+    trigramは3文字のコードポイントを1つの整数にまとめて持つ（accounts.search.gram_code）。
+    """
+    gram = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms')
+
+    class Meta:
+        unique_together = ['gram', 'user']
@@ -0,0 +1,177 @@
+import math
+import re
+import unicodedata
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from .models import User, UserSearchTerm
+
+# 索引するフィールド
+SEARCH_FIELDS = ['username', 'email', 'first_name', 'last_name', 'display_name', 'department']
+
+# 検索語のtrigramのうち、この割合以上を含むユーザーを一致とみなす（タイプミスを許容する）
+SIMILARITY_THRESHOLD = 0.5
+
+# 索引で照合する候補ユーザー数の上限。これより多く該当する検索語は索引では絞り込めない
+MAX_CANDIDATES = 10000
+
+# trigramごとの該当ユーザー数のキャッシュ有効期限（秒）
+GRAM_FREQUENCY_TIMEOUT = 10 * 60
+
+# 索引の作り直しで1回に読み込むユーザー数
+INDEX_BATCH_SIZE = 1000
+
+# Unicodeのコードポイントは21ビットに収まるため、3文字を1つの整数（63ビット）にまとめられる
+GRAM_SHIFT = 21
+
+# メールアドレスやユーザー名は記号で語に分ける
+WORD_SEPARATOR = re.compile(r'[\s@._\-+]+')
+
+
+def normalize(text):
+    """全角・半角と大文字・小文字の違いを吸収する"""
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def gram_code(gram):
+    code = 0
+    for char in gram:
+        code = (code << GRAM_SHIFT) | ord(char)
+    return code
+
+
+def text_grams(text, word_end=True):
+    """
+    文字列のtrigramのコードを返す
+
+    語ごとに前へ空白2つ、後ろへ空白1つを補って切り出す（pg_trgmと同じ方式）。
+    先頭の数文字だけの検索語も語頭のtrigramで一致し、1文字違いでも多くのtrigramが共通する。
+    word_end=Falseのときは語末のtrigramを含めない（語頭一致の検索用）。
+    """
+    codes = set()
+    for word in WORD_SEPARATOR.split(normalize(text)):
+        if not word:
+            continue
+        padded = f'  {word} ' if word_end else f'  {word}'
+        codes.update(gram_code(padded[index:index + 3]) for index in range(len(padded) - 2))
+    return codes
+
+
+def _frequency_key(code):
+    return f'accounts:user_search_df:{code}'
+
+
+def index_users(user_ids, batch_size=INDEX_BATCH_SIZE):
+    """
+    ユーザーの索引を作り直す
+
+    登録・編集時はシグナルから呼ばれる。bulk_createはシグナルを送らないため、
+    一括登録の後は登録したユーザーのIDを渡して呼び出す。
+    """
+    user_ids = list(user_ids)
+    meta = UserSearchTerm._meta
+    sql = 'INSERT INTO {} ({}, {}) VALUES (%s, %s)'.format(
+        connection.ops.quote_name(meta.db_table),
+        connection.ops.quote_name(meta.get_field('gram').column),
+        connection.ops.quote_name(meta.get_field('user').column),
+    )
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset:offset + batch_size]
+        rows = []
+        for user_id, *values in User.objects.filter(id__in=batch).values_list('id', *SEARCH_FIELDS):
+            rows.extend((code, user_id) for code in text_grams(' '.join(value or '' for value in values)))
+        with transaction.atomic():
+            UserSearchTerm.objects.filter(user_id__in=batch).delete()
+            if rows:
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+        # 新しく現れたtrigramが検索で除外されないよう、該当ユーザー数のキャッシュを消す
+        cache.delete_many([_frequency_key(code) for code in {code for code, _ in rows}])
+    return len(user_ids)
+
+
+def rebuild_index(batch_size=INDEX_BATCH_SIZE):
+    """全ユーザーの索引を作り直す（IDのキーセットでbatch_size件ずつ）"""
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return indexed
+        indexed += index_users(batch, batch_size)
+        last_id = batch[-1]
+
+
+def gram_frequencies(codes):
+    """trigramごとの該当ユーザー数（GRAM_FREQUENCY_TIMEOUT 秒キャッシュ）"""
+    keys = {code: _frequency_key(code) for code in codes}
+    cached = cache.get_many(keys.values())
+    missing = [code for code in codes if keys[code] not in cached]
+    if missing:
+        counts = dict(
+            UserSearchTerm.objects.filter(gram__in=missing).values('gram').annotate(
+                count=Count('id')
+            ).values_list('gram', 'count').order_by()
+        )
+        values = {keys[code]: counts.get(code, 0) for code in missing}
+        cache.set_many(values, GRAM_FREQUENCY_TIMEOUT)
+        cached.update(values)
+    return {code: cached[keys[code]] for code in codes}
+
+
+def _match(codes, required, frequencies, queryset):
+    """
+    codesのうちrequired個以上のtrigramを含むユーザーのIDを、含む数の多い順に返す
+
+    required個以上を含むユーザーは、該当ユーザー数の少ないtrigramのうち
+    (全体 - required + 1) 個のどれかを必ず含むため、それらを含むユーザーだけを数える。
+    候補が MAX_CANDIDATES を超える場合はNoneを返す。
+    """
+    present = sorted((code for code in codes if frequencies[code]), key=frequencies.get)
+    if len(present) < required:
+        return []
+
+    rare = present[:len(present) - required + 1]
+    if sum(frequencies[code] for code in rare) > MAX_CANDIDATES:
+        return None
+
+    user_ids = list(
+        UserSearchTerm.objects.filter(
+            gram__in=present,
+            user_id__in=UserSearchTerm.objects.filter(gram__in=rare).values('user_id'),
+        ).values('user_id').annotate(
+            matched=Count('id')
+        ).filter(matched__gte=required).order_by('-matched', '-user_id').values_list('user_id', flat=True)
+    )
+    if queryset is not None and user_ids:
+        # 候補はMAX_CANDIDATES件以下のため、絞り込みは一致したIDに対して行う
+        allowed = set(queryset.filter(id__in=user_ids).values_list('id', flat=True))
+        user_ids = [user_id for user_id in user_ids if user_id in allowed]
+    return user_ids
+
+
+def search_users(query, queryset=None):
+    """
+    検索語に一致するユーザーのIDを一致度の高い順に返す
+
+    まず検索語の各語が語頭から一致するユーザーを探し、いなければtrigramの
+    SIMILARITY_THRESHOLD 以上が共通するユーザーを探す（タイプミスの許容）。
+    検索に使える文字がない、該当ユーザーが多すぎて索引で絞り込めない、またはどちらでも
+    一致しない場合はNoneを返す（呼び出し側で部分一致の検索に切り替える）。
+    語の途中の文字（「佐藤」の「藤」、「営業部」の「部」など）は語頭のtrigramに
+    含まれないため、索引で一致しなくても部分一致では見つかる。
+    querysetを渡すと、その中のユーザーに限定する。
+    """
+    prefix_codes = text_grams(query, word_end=False)
+    if not prefix_codes:
+        return None
+
+    codes = text_grams(query)
+    frequencies = gram_frequencies(codes)
+    user_ids = _match(prefix_codes, len(prefix_codes), frequencies, queryset)
+    if user_ids != []:
+        return user_ids
+    user_ids = _match(codes, max(math.ceil(len(codes) * SIMILARITY_THRESHOLD), 1), frequencies, queryset)
+    return user_ids or None
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from questions import admin_stats
+from .models import User
+from .search import SEARCH_FIELDS, index_users
+
+
+@receiver(post_save, sender=User)
+def index_saved_user(sender, instance, update_fields=None, **kwargs):
+    # ログイン日時の更新など、検索対象以外のフィールドだけの保存では索引を作り直さない
+    if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+        index_users([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def count_saved_user(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        admin_stats.increment('total_users')
+        if instance.is_active:
+            admin_stats.increment('active_users')
+        admin_stats.increment_signups(timezone.localdate(instance.date_joined))
+    elif update_fields is None or 'is_active' in update_fields:
+        # 変更前の値がわからないため、有効ユーザー数だけ数え直させる
+        admin_stats.invalidate('active_users')
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    admin_stats.increment('total_users', -1)
+    if instance.is_active:
+        admin_stats.increment('active_users', -1)
+    admin_stats.increment_signups(timezone.localdate(instance.date_joined), -1)
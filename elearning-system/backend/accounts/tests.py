@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import User
+from .search import SEARCH_FIELDS, search_users
+
+
+class UserSearchTests(TestCase):
+    """ユーザーのtrigram索引での検索結果が、部分一致（icontains）での検索と一致すること"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        cls.tanaka = User.objects.create_user(
+            username='tanaka.taro', email='taro@example.com', password='password',
+            display_name='田中太郎', department='営業部',
+        )
+        cls.suzuki = User.objects.create_user(
+            username='suzuki.hanako', email='hanako@example.com', password='password',
+            display_name='鈴木花子', department='開発部',
+        )
+        cls.sato = User.objects.create_user(
+            username='sato.jiro', password='password', display_name='佐藤次郎', department='営業部',
+        )
+        cls.tanabe = User.objects.create_user(
+            username='tanabe', password='password', display_name='田辺', department='人事部',
+        )
+
+    def setUp(self):
+        # trigramごとの該当ユーザー数のキャッシュを読み直させる
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def icontains(self, query):
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': query})
+        return set(User.objects.filter(condition).values_list('id', flat=True))
+
+    def list_ids(self, query):
+        response = self.client.get(reverse('admin_users'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return {user['id'] for user in (data['results'] if isinstance(data, dict) else data)}
+
+    def test_prefix_queries(self):
+        for query in ['tana', 'TANAKA', 'example', 'hanako', '田', '営業', '鈴木']:
+            expected = self.icontains(query)
+            self.assertTrue(expected, query)
+            self.assertEqual(set(search_users(query)), expected, query)
+            self.assertEqual(self.list_ids(query), expected, query)
+
+    def test_typo_query(self):
+        # 部分一致では見つからないが、trigramの半数以上が共通するユーザーは見つかる
+        self.assertEqual(self.icontains('tanaak'), set())
+        user_ids = search_users('tanaak')
+        self.assertIn(self.tanaka.id, user_ids)
+        self.assertNotIn(self.suzuki.id, user_ids)
+
+    def test_mid_word_query_falls_back_to_icontains(self):
+        for query in ['藤', '部']:
+            self.assertIsNone(search_users(query), query)
+        # 語の途中の英字はtrigramの共通で見つかることもあるが、一覧の結果は部分一致と同じになる
+        for query in ['藤', '部', 'aka', 'ko']:
+            expected = self.icontains(query)
+            self.assertTrue(expected, query)
+            self.assertEqual(self.list_ids(query), expected, query)
+
+    def test_reindex_on_save(self):
+        self.suzuki.display_name = '山本花子'
+        self.suzuki.save()
+
+        self.assertEqual(search_users('山本'), [self.suzuki.id])
+        self.assertIsNone(search_users('鈴木'))
+        self.assertEqual(self.list_ids('鈴木'), set())
@@ -0,0 +1,17 @@
+"""
+Celery application for background jobs
+
+Workers are started with ``celery -A elearning worker``. With
+CELERY_TASK_ALWAYS_EAGER enabled, tasks run inline in the calling process,
+so development and tests need no broker or worker.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elearning.settings')
+
+app = Celery('elearning')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
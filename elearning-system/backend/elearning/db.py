@@ -0,0 +1,25 @@
+"""
+Database helpers shared by the bulk data commands
+"""
+
+from contextlib import contextmanager
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """
+    Temporarily disable auto_now / auto_now_add on the given fields
+
+    bulk_create() calls pre_save(), which would overwrite timestamps that are
+    being copied from elsewhere (snapshots, generated history) with now().
+    """
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = False
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
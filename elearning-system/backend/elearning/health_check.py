@@ -7,6 +7,11 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.db import connection
 from django.core.cache import cache
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .middleware import endpoint_stats
 import time
 
 
@@ -59,4 +64,21 @@ def health_check_detailed(request):
         'status': status,
         'checks': checks,
         'timestamp': time.time()
-    })
\ No newline at end of file
+    })
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def performance_summary(request):
+    """
+    Rolling per-endpoint request profile of this worker (admin only)
+
+    DELETE clears the collected samples.
+    """
+    if request.method == 'DELETE':
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    return Response({
+        **endpoint_stats.summary(),
+        'timestamp': time.time()
+    })
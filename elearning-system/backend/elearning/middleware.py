@@ -0,0 +1,249 @@
+"""
+Request profiling middleware
+
+Records the query count, SQL time, slowest statement, render time and cache
+hits/misses of sampled requests, emits them as a Server-Timing header and a
+structured log line, and keeps a rolling per-endpoint summary in the worker.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger('elearning.performance')
+
+_current_profile = ContextVar('request_profile', default=None)
+_MISSING = object()
+
+
+class RequestProfile:
+    """Measurements for a single request"""
+    __slots__ = (
+        'started', 'query_count', 'sql_seconds', 'slowest_sql', 'slowest_seconds',
+        'render_started', 'render_seconds', 'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.slowest_sql = None
+        self.slowest_seconds = 0.0
+        self.render_started = None
+        self.render_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Called by connection.execute_wrapper for every statement
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.query_count += 1
+            self.sql_seconds += elapsed
+            if elapsed >= self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_sql = sql
+
+
+class EndpointStats:
+    """
+    Rolling per-endpoint measurements for this worker process
+
+    Only the latest REQUEST_PROFILING_WINDOW samples of each endpoint are kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(self._new_window)
+        self._slowest = {}
+
+    def _new_window(self):
+        return deque(maxlen=getattr(settings, 'REQUEST_PROFILING_WINDOW', 500))
+
+    def record(self, endpoint, total_ms, sql_ms, query_count, render_ms, profile):
+        with self._lock:
+            self._samples[endpoint].append((total_ms, sql_ms, query_count, render_ms))
+            slowest = self._slowest.get(endpoint)
+            if profile.slowest_sql and (slowest is None or profile.slowest_seconds * 1000 >= slowest[0]):
+                self._slowest[endpoint] = (round(profile.slowest_seconds * 1000, 3), profile.slowest_sql[:500])
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._slowest.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            slowest = dict(self._slowest)
+
+        endpoints = {}
+        for endpoint, samples in sorted(snapshot.items()):
+            totals = sorted(sample[0] for sample in samples)
+            count = len(samples)
+            endpoints[endpoint] = {
+                'samples': count,
+                'total_ms': {
+                    'p50': round(totals[int(count * 0.50)], 3),
+                    'p95': round(totals[min(int(count * 0.95), count - 1)], 3),
+                    'max': round(totals[-1], 3),
+                },
+                'sql_ms_mean': round(sum(sample[1] for sample in samples) / count, 3),
+                'queries_mean': round(sum(sample[2] for sample in samples) / count, 2),
+                'queries_max': max(sample[2] for sample in samples),
+                'render_ms_mean': round(sum(sample[3] for sample in samples) / count, 3),
+                'slowest_sql': slowest.get(endpoint),
+            }
+        return {
+            'pid': os.getpid(),
+            'sample_rate': get_sample_rate(),
+            'endpoints': endpoints,
+        }
+
+
+endpoint_stats = EndpointStats()
+
+
+def get_sample_rate():
+    return getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0.0)
+
+
+def _instrument_cache_backend(backend_class):
+    """
+    Wrap get/get_many of a cache backend to count hits and misses of profiled requests
+
+    Extra arguments (version, django-redis' client, ...) are passed through unchanged,
+    and requests that are not profiled go straight to the original methods. Counting is
+    suspended inside the original call, so a get_many built on get (BaseCache) or a
+    subclass calling an instrumented parent counts each key once.
+    """
+    if backend_class.__dict__.get('_profiling_installed', False):
+        return
+
+    original_get = backend_class.get
+    original_get_many = backend_class.get_many
+
+    def call_unprofiled(method, *args, **kwargs):
+        token = _current_profile.set(None)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _current_profile.reset(token)
+
+    def get(self, key, default=None, *args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return original_get(self, key, default, *args, **kwargs)
+        value = call_unprofiled(original_get, self, key, _MISSING, *args, **kwargs)
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return original_get_many(self, keys, *args, **kwargs)
+        keys = list(keys)
+        values = call_unprofiled(original_get_many, self, keys, *args, **kwargs)
+        profile.cache_hits += len(values)
+        profile.cache_misses += len(keys) - len(values)
+        return values
+
+    backend_class.get = get
+    backend_class.get_many = get_many
+    backend_class._profiling_installed = True
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile a sample of requests
+
+    REQUEST_PROFILING_SAMPLE_RATE (0 to 1) of the requests are measured; those
+    get a Server-Timing header and a structured log line.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        for alias in settings.CACHES:
+            _instrument_cache_backend(type(caches[alias]))
+
+    def __call__(self, request):
+        sample_rate = get_sample_rate()
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                request._request_profile = profile
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+
+        self.finish(request, response, profile)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook, so time it with a post-render callback
+        profile = getattr(request, '_request_profile', None)
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+
+            def rendered(response):
+                profile.render_seconds = time.perf_counter() - profile.render_started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, profile):
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        sql_ms = profile.sql_seconds * 1000
+        render_ms = profile.render_seconds * 1000
+        app_ms = max(total_ms - sql_ms - render_ms, 0)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={sql_ms:.2f};desc="{profile.query_count} queries"',
+            f'render;dur={render_ms:.2f}',
+            f'app;dur={app_ms:.2f}',
+            f'cache;desc="{profile.cache_hits} hits, {profile.cache_misses} misses"',
+            f'total;dur={total_ms:.2f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        route = f'/{match.route}' if match is not None else 'unresolved'
+        endpoint = f'{request.method} {route}'
+        endpoint_stats.record(endpoint, total_ms, sql_ms, profile.query_count, render_ms, profile)
+
+        logger.info(json.dumps({
+            'event': 'request_profile',
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'sql_ms': round(sql_ms, 2),
+            'render_ms': round(render_ms, 2),
+            'queries': profile.query_count,
+            'slowest_sql_ms': round(profile.slowest_seconds * 1000, 2),
+            'slowest_sql': profile.slowest_sql[:300] if profile.slowest_sql else None,
+            'cache_hits': profile.cache_hits,
+            'cache_misses': profile.cache_misses,
+        }, ensure_ascii=False))
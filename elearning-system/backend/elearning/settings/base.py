@@ -37,6 +37,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'elearning.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -49,6 +50,26 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'elearning.urls'
 
+# Request profiling (share of requests measured, and samples kept per endpoint).
+# Off unless an environment opts in (production samples 5% by default)
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0'))
+REQUEST_PROFILING_WINDOW = int(os.environ.get('REQUEST_PROFILING_WINDOW', '500'))
+
+# Celery (background jobs). Job progress is stored in the database, so task results are not kept
+CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TIMEZONE = 'Asia/Tokyo'
+
+# Periodic tasks (run by ``celery -A elearning beat``)
+OVERDUE_SWEEP_INTERVAL = int(os.environ.get('OVERDUE_SWEEP_INTERVAL', '300'))
+CELERY_BEAT_SCHEDULE = {
+    'sweep-overdue-assignments': {
+        'task': 'progress.tasks.sweep_overdue_assignments',
+        'schedule': OVERDUE_SWEEP_INTERVAL,
+    },
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
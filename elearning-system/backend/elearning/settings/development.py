@@ -10,6 +10,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['*']
 
+# Run background jobs inline unless a worker is available
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'True') == 'True'
+
 # Database
 DATABASES = {
     'default': {
@@ -30,6 +30,9 @@ CACHES = {
     }
 }
 
+# Celery broker (include the Redis password in the URL, e.g. redis://:password@redis:6379/0)
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or os.environ.get('REDIS_URL', 'redis://redis:6379/0')
+
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -115,6 +118,9 @@ X_FRAME_OPTIONS = 'DENY'
 # Performance settings
 CONN_MAX_AGE = 600
 
+# Profile only a share of the requests so the middleware can stay on
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0.05'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "https://your-domain.com",  # Replace with your domain
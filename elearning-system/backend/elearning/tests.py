@@ -0,0 +1,62 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from .middleware import RequestProfile, _current_profile, _instrument_cache_backend
+
+# As RequestProfilingMiddleware does for the configured backends
+_instrument_cache_backend(LocMemCache)
+
+
+class ClientCache(LocMemCache):
+    """A backend whose get/get_many take an extra keyword, like django-redis' RedisCache"""
+
+    def get(self, key, default=None, version=None, client=None):
+        self.client_seen = client
+        return super().get(key, default, version)
+
+    def get_many(self, keys, version=None, client=None):
+        values = super().get_many(keys, version)
+        self.client_seen = client
+        return values
+
+
+_instrument_cache_backend(ClientCache)
+
+
+class CacheInstrumentationTests(SimpleTestCase):
+    """Cache hit/miss counting of profiled requests"""
+
+    def setUp(self):
+        self.cache = ClientCache('profiling-tests', {})
+        self.cache.set('present', 1)
+        self.profile = RequestProfile()
+        token = _current_profile.set(self.profile)
+        self.addCleanup(_current_profile.reset, token)
+
+    def test_get_counts_hits_and_misses(self):
+        self.assertEqual(self.cache.get('present'), 1)
+        self.assertEqual(self.cache.get('absent', 'fallback'), 'fallback')
+        self.assertEqual((self.profile.cache_hits, self.profile.cache_misses), (1, 1))
+
+    def test_get_many_counts_each_key_once(self):
+        # LocMemCache inherits BaseCache.get_many, which calls self.get per key
+        self.assertEqual(self.cache.get_many(['present', 'absent']), {'present': 1})
+        self.assertEqual((self.profile.cache_hits, self.profile.cache_misses), (1, 1))
+
+    def test_extra_arguments_are_passed_through(self):
+        client = object()
+        self.assertEqual(self.cache.get('present', None, None, client), 1)
+        self.assertIs(self.cache.client_seen, client)
+        self.assertEqual(self.cache.get_many(['present'], client=client), {'present': 1})
+        self.assertIs(self.cache.client_seen, client)
+
+    def test_subclass_of_instrumented_backend_counts_once(self):
+        # ClientCache.get calls the (also instrumented) LocMemCache.get
+        self.cache.get('present')
+        self.cache.get_many(['present', 'absent'])
+        self.assertEqual((self.profile.cache_hits, self.profile.cache_misses), (2, 1))
+
+    def test_requests_without_profile_are_not_counted(self):
+        _current_profile.set(None)
+        self.assertEqual(self.cache.get('present', client=None), 1)
+        self.assertEqual((self.profile.cache_hits, self.profile.cache_misses), (0, 0))
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from .health_check import health_check, health_check_detailed
+from .health_check import health_check, health_check_detailed, performance_summary
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +13,7 @@ urlpatterns = [
     # Health check endpoints
     path('api/health/', health_check, name='health_check'),
     path('api/health/detailed/', health_check_detailed, name='health_check_detailed'),
+    path('api/health/performance/', performance_summary, name='performance_summary'),
 ]
 
 if settings.DEBUG:
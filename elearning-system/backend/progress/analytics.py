@@ -0,0 +1,98 @@
+import hashlib
+from datetime import datetime, time
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from .models import UserAttempt
+from questions.models import Genre
+
+# 部署×ジャンル集計のキャッシュ有効期限（秒）
+DEPARTMENT_MATRIX_TIMEOUT = 10 * 60
+
+# 部署が未設定のユーザーの表示名
+NO_DEPARTMENT = '未設定'
+
+MATRIX_METRICS = ['attempts', 'accuracy', 'average_response_time', 'active_learners']
+
+
+def department_genre_rows(department=None, start_date=None, end_date=None):
+    """部署×ジャンルごとの回答数・正解数・回答時間の合計と件数・学習者数を1回のGROUP BYで集計する"""
+    attempts = UserAttempt.objects.all()
+    if department is not None:
+        attempts = attempts.filter(user__department=department)
+    if start_date:
+        attempts = attempts.filter(attempt_time__gte=timezone.make_aware(datetime.combine(start_date, time.min)))
+    if end_date:
+        attempts = attempts.filter(attempt_time__lte=timezone.make_aware(datetime.combine(end_date, time.max)))
+
+    return attempts.values(
+        department=F('user__department'),
+        genre_id=F('question__genre_id'),
+    ).annotate(
+        attempts=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True)),
+        # 部署名を置き換えた後に行をまとめられるよう、平均ではなく合計と件数で返す
+        response_time_sum=Sum('response_time_seconds'),
+        response_time_count=Count('response_time_seconds'),
+        active_learners=Count('user_id', distinct=True),
+    ).order_by()
+
+
+def pivot_department_genre(rows, genre_names):
+    """
+    集計行を部署×ジャンルの行列に変換する
+
+    pandasのpivotで指標ごとの行列を作り、データのないセルはNoneにする。
+    部署が未設定のユーザーは NO_DEPARTMENT と表示するため、同じ名前の部署があれば1行にまとめる
+    （部署が異なれば学習者も異なるため、学習者数は合計できる）。
+    """
+    frame = pd.DataFrame.from_records(
+        list(rows),
+        columns=[
+            'department', 'genre_id', 'attempts', 'correct',
+            'response_time_sum', 'response_time_count', 'active_learners',
+        ],
+    )
+    frame['department'] = frame['department'].replace('', NO_DEPARTMENT)
+    frame['response_time_sum'] = frame['response_time_sum'].fillna(0)
+    frame = frame.groupby(['department', 'genre_id'], as_index=False).sum()
+    frame['accuracy'] = (frame['correct'] / frame['attempts'] * 100).round(1)
+    frame['average_response_time'] = (
+        frame['response_time_sum'].astype(float) / frame['response_time_count'].where(frame['response_time_count'] > 0)
+    ).round(1)
+
+    departments = sorted(frame['department'].unique())
+    genre_ids = sorted(frame['genre_id'].unique())
+    metrics = {}
+    for metric in MATRIX_METRICS:
+        matrix = frame.pivot(index='department', columns='genre_id', values=metric).reindex(
+            index=departments, columns=genre_ids
+        )
+        matrix = matrix.astype(object).where(matrix.notna(), None)
+        metrics[metric] = [
+            [int(value) if metric in ('attempts', 'active_learners') and value is not None else value
+             for value in row]
+            for row in matrix.values.tolist()
+        ]
+
+    return {
+        'departments': departments,
+        'genres': [{'id': genre_id, 'name': genre_names.get(genre_id, genre_id)} for genre_id in genre_ids],
+        'metrics': metrics,
+    }
+
+
+def get_department_genre_matrix(department=None, start_date=None, end_date=None):
+    """部署×ジャンルの成績行列を返す（条件ごとに DEPARTMENT_MATRIX_TIMEOUT 秒キャッシュ）"""
+    # 部署名には空白などキーに使えない文字が含まれうるためハッシュ化する
+    scope = hashlib.md5(department.encode('utf-8')).hexdigest() if department is not None else 'all'
+    cache_key = f'progress:department_genre_matrix:{scope}:{start_date or ""}:{end_date or ""}'
+    matrix = cache.get(cache_key)
+    if matrix is None:
+        rows = department_genre_rows(department, start_date, end_date)
+        genre_names = dict(Genre.objects.values_list('id', 'name'))
+        matrix = pivot_department_genre(rows, genre_names)
+        matrix['generated_at'] = timezone.now().isoformat()
+        cache.set(cache_key, matrix, DEPARTMENT_MATRIX_TIMEOUT)
+    return matrix
@@ -0,0 +1,135 @@
+import csv
+import io
+import zlib
+from datetime import datetime, time
+from django.utils import timezone
+from .models import UserAttempt, QuizSession
+
+# 種類ごとの (モデル, 日時の列, [(出力する列名, 参照するフィールド)])
+ACTIVITY_EXPORTS = {
+    'attempts': (UserAttempt, 'attempt_time', [
+        ('attempt_id', 'id'),
+        ('attempt_time', 'attempt_time'),
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('department', 'user__department'),
+        ('session_id', 'session_id'),
+        ('question_id', 'question_id'),
+        ('genre_id', 'question__genre_id'),
+        ('genre_name', 'question__genre__name'),
+        ('difficulty', 'question__difficulty'),
+        ('selected_choice_id', 'selected_choice_id'),
+        ('is_correct', 'is_correct'),
+        ('response_time_seconds', 'response_time_seconds'),
+    ]),
+    'sessions': (QuizSession, 'start_time', [
+        ('session_id', 'id'),
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('department', 'user__department'),
+        ('session_type', 'session_type'),
+        ('genre_id', 'genre_id'),
+        ('genre_name', 'genre__name'),
+        ('difficulty', 'difficulty'),
+        ('total_questions', 'total_questions'),
+        ('correct_answers', 'correct_answers'),
+        ('start_time', 'start_time'),
+        ('end_time', 'end_time'),
+        ('is_completed', 'is_completed'),
+    ]),
+}
+
+
+def export_columns(kind):
+    return [column for column, _ in ACTIVITY_EXPORTS[kind][2]]
+
+
+def iter_activity_chunks(kind, department=None, start_date=None, end_date=None, chunk_size=10000):
+    """
+    部署の回答・セッションを部署名・ジャンル付きの行（タプル）のリストとして
+    chunk_size件ずつ返す
+
+    ID順のキーセット（id > 前チャンクの末尾）で区切って読むため、何千万行あっても
+    メモリに載るのは1チャンク分だけになる。
+    """
+    model, time_field, columns = ACTIVITY_EXPORTS[kind]
+    queryset = model.objects.all()
+    if department is not None:
+        queryset = queryset.filter(user__department=department)
+    if start_date:
+        queryset = queryset.filter(**{f'{time_field}__gte': timezone.make_aware(datetime.combine(start_date, time.min))})
+    if end_date:
+        queryset = queryset.filter(**{f'{time_field}__lte': timezone.make_aware(datetime.combine(end_date, time.max))})
+    queryset = queryset.order_by('id').values_list(*[field for _, field in columns])
+
+    last_id = None
+    while True:
+        chunk_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+def gzip_csv_stream(columns, chunks):
+    """行のチャンクをgzip圧縮したCSVのバイト列として順に返す（ヘッダー行を含む）"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip形式
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        data = compressor.compress(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+        if data:
+            yield data
+    data = compressor.compress(buffer.getvalue().encode('utf-8'))
+    yield data + compressor.flush()
+
+
+def _field_type(model, path):
+    """'user__department' のような参照先フィールドの内部型を返す"""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    field = model._meta.get_field(name[:-3] if name.endswith('_id') and name != 'id' else name)
+    if field.is_relation:
+        field = field.target_field
+    return field.get_internal_type()
+
+
+def write_parquet(path, kind, chunks):
+    """
+    行のチャンクをParquetファイルに書き出す（1チャンク = 1行グループ）
+
+    pyarrowは任意の依存パッケージのため、使うときだけ読み込む。
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet output requires pyarrow (pip install pyarrow)')
+
+    arrow_types = {
+        'AutoField': pa.int64(),
+        'BigAutoField': pa.int64(),
+        'IntegerField': pa.int64(),
+        'BooleanField': pa.bool_(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    model, _, columns = ACTIVITY_EXPORTS[kind]
+    schema = pa.schema([
+        (column, arrow_types.get(_field_type(model, field), pa.string()))
+        for column, field in columns
+    ])
+
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pydict({
+                column: [row[index] for row in chunk]
+                for index, column in enumerate(schema.names)
+            }, schema=schema))
@@ -0,0 +1,37 @@
+# backend/progress/management/commands/backfill_assignment_rollups.py
+from django.core.management.base import BaseCommand
+from progress.models import Assignment
+from progress.rollups import rebuild_assignment_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuild per-assignment, per-department completion rollups from existing user assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assignment',
+            type=int,
+            action='append',
+            help='Assignment ID to rebuild (can be repeated). Rebuilds all assignments when omitted'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows per bulk insert'
+        )
+
+    def handle(self, *args, **options):
+        assignments = None
+        if options['assignment']:
+            assignments = Assignment.objects.filter(id__in=options['assignment'])
+            if not assignments.exists():
+                self.stdout.write(
+                    self.style.ERROR('No matching assignments found')
+                )
+                return
+
+        created = rebuild_assignment_rollups(assignments=assignments, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {created} assignment rollup rows')
+        )
@@ -0,0 +1,39 @@
+# backend/progress/management/commands/backfill_daily_rollups.py
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from progress.rollups import rebuild_daily_rollups
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user daily study rollups from existing quiz sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            action='append',
+            help='Username to rebuild (can be repeated). Rebuilds all users when omitted'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows per bulk insert'
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['user']:
+            users = User.objects.filter(username__in=options['user'])
+            if not users.exists():
+                self.stdout.write(
+                    self.style.ERROR('No matching users found')
+                )
+                return
+
+        created = rebuild_daily_rollups(users=users, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {created} daily rollup rows')
+        )
@@ -0,0 +1,330 @@
+# backend/progress/management/commands/benchmark_endpoints.py
+import json
+import platform
+import re
+import subprocess
+import time
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.urls import URLPattern
+from rest_framework.test import APIClient
+from progress import urls as progress_urls
+from progress.models import UserAttempt, QuizSession, Assignment, AssignmentDistributionJob
+from questions import urls as question_urls
+from questions import admin_urls
+from questions.models import Question, Choice
+
+User = get_user_model()
+
+URL_MODULES = [
+    ('/api/progress/', progress_urls, False),
+    ('/api/questions/', question_urls, False),
+    ('/api/admin/', admin_urls, True),
+]
+
+PATH_PARAMETER_PATTERN = re.compile(r'<(?:(\w+):)?(\w+)>')
+
+# 成績管理者として呼び出すエンドポイント
+MANAGER_ENDPOINTS = {
+    'department_export', 'department_matrix', 'assignment_summaries', 'assignment_summary',
+    'assignment_distribute', 'assignment_distribution_job',
+}
+
+# 副作用のあるエンドポイント（問題バンクの更新など）は計測しない
+SKIPPED_ENDPOINTS = {
+    'admin_question_bulk': 'modifies the question bank',
+    'assignment_distribute': 'creates user assignments',
+}
+
+
+def percentile(values, ratio):
+    """最近傍順位法によるパーセンタイル"""
+    ordered = sorted(values)
+    index = max(int(round(ratio * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every endpoint in progress/urls.py, questions/urls.py and questions/admin_urls.py '
+        'and report latency percentiles, query counts and response sizes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per endpoint')
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='Learner to request the endpoints as (defaults to the user with the most attempts)'
+        )
+        parser.add_argument(
+            '--admin-username',
+            type=str,
+            help='Staff user for the admin endpoints (defaults to the first staff user)'
+        )
+        parser.add_argument('--output', type=str, help='Write the results to this JSON file')
+        parser.add_argument('--compare', type=str, help='Compare against a previous JSON result file')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        admin = self.get_admin(options['admin_username'])
+        manager = User.objects.filter(role='manager').exclude(department='').order_by('id').first()
+        self.samples = self.get_samples(user, manager)
+
+        clients = {False: APIClient(), True: APIClient()}
+        clients[False].force_authenticate(user)
+        if admin:
+            clients[True].force_authenticate(admin)
+        manager_client = APIClient()
+        manager_client.force_authenticate(manager)
+
+        results = {}
+        for prefix, module, admin_only in URL_MODULES:
+            for pattern in module.urlpatterns:
+                if not isinstance(pattern, URLPattern):
+                    continue
+                name = pattern.name
+                for method, url, payload in self.get_requests(prefix, pattern):
+                    key = f'{method} {prefix}{pattern.pattern}'
+                    skip_reason = SKIPPED_ENDPOINTS.get(name)
+                    if admin_only and admin is None:
+                        skip_reason = 'no staff user'
+                    elif name in MANAGER_ENDPOINTS and manager is None:
+                        skip_reason = 'no manager with a department'
+                    elif url is None:
+                        skip_reason = skip_reason or 'no sample value for path parameters'
+                    if skip_reason:
+                        results[key] = {'skipped': skip_reason}
+                        self.stdout.write(self.style.WARNING(f'{key}: skipped ({skip_reason})'))
+                        continue
+
+                    client = manager_client if name in MANAGER_ENDPOINTS else clients[admin_only]
+                    results[key] = self.measure(
+                        client, method, url, payload,
+                        options['warmup'], options['iterations']
+                    )
+                    self.write_result(key, results[key])
+
+        report = {'meta': self.get_meta(user, admin, options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User not found: {username}')
+        user = User.objects.annotate(attempt_count=Count('attempts')).order_by('-attempt_count').first()
+        if user is None:
+            raise CommandError('No users found; run generate_synthetic_data first')
+        return user
+
+    def get_admin(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username, is_staff=True)
+            except User.DoesNotExist:
+                raise CommandError(f'Staff user not found: {username}')
+        return User.objects.filter(is_staff=True).order_by('id').first()
+
+    def get_samples(self, user, manager):
+        """パスパラメータとリクエストボディに使う実在のID"""
+        session = QuizSession.objects.filter(user=user).order_by('-start_time').first()
+        question = Question.objects.filter(is_active=True).order_by('id').first()
+        choice = Choice.objects.filter(question=question).order_by('order_index').first() if question else None
+        assignment = Assignment.objects.filter(is_active=True).order_by('-created_at').first()
+        # 成績管理者は自分が作成した配信ジョブのみ参照できる
+        distribution_job = AssignmentDistributionJob.objects.filter(created_by=manager).order_by('-created_at').first()
+        return {
+            'session': session.pk if session else None,
+            'question': question.pk if question else None,
+            'choice': choice.pk if choice else None,
+            'user': user.pk,
+            'assignment': assignment.pk if assignment else None,
+            'distribution_job': distribution_job.pk if distribution_job else None,
+        }
+
+    def get_path_value(self, name, converter, parameter):
+        if name == 'quiz_session_detail':
+            value = self.samples['session']
+        elif name == 'question-detail':
+            value = self.samples['question']
+        elif name == 'admin_user_detail':
+            value = self.samples['user']
+        elif name in ('assignment_summary', 'assignment_distribute'):
+            value = self.samples['assignment']
+        elif name == 'assignment_distribution_job':
+            value = self.samples['distribution_job']
+        else:
+            # ジャンル・問題のIDは文字列のため <int:pk> のルートには当てはまらない
+            return None
+        if value is None or (converter == 'int' and not str(value).isdigit()):
+            return None
+        return value
+
+    def get_requests(self, prefix, pattern):
+        """URLパターンごとに (メソッド, URL, ボディ) を返す。URLを組み立てられない場合はNone"""
+        route = str(pattern.pattern)
+        url = prefix + route
+        for converter, parameter in PATH_PARAMETER_PATTERN.findall(route):
+            value = self.get_path_value(pattern.name, converter, parameter)
+            if value is None:
+                url = None
+                break
+            url = url.replace(f'<{converter}:{parameter}>' if converter else f'<{parameter}>', str(value))
+
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is not None and hasattr(view_class, 'get'):
+            yield 'GET', url, None
+
+        if pattern.name == 'check-answer':
+            yield 'POST', url, {'question_id': self.samples['question'], 'choice_id': self.samples['choice']}
+        elif pattern.name == 'quiz_sessions':
+            yield 'POST', url, self.get_session_payload()
+        elif pattern.name in SKIPPED_ENDPOINTS:
+            yield 'POST', url, None
+
+    def get_session_payload(self):
+        attempts = list(
+            UserAttempt.objects.filter(question__is_active=True).order_by('-id').values(
+                'question_id', 'selected_choice_id', 'is_correct', 'response_time_seconds'
+            )[:10]
+        )
+        genre_id = Question.objects.filter(pk=self.samples['question']).values_list('genre_id', flat=True).first()
+        return {
+            'session_type': 'genre',
+            'genre': genre_id,
+            'total_questions': len(attempts),
+            'answers': [
+                {
+                    'question_id': attempt['question_id'],
+                    'selected_choice_id': attempt['selected_choice_id'],
+                    'is_correct': attempt['is_correct'],
+                    'response_time_seconds': attempt['response_time_seconds'],
+                }
+                for attempt in attempts
+            ],
+        }
+
+    def measure(self, client, method, url, payload, warmup, iterations):
+        query_count = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        latencies = []
+        queries = []
+        sizes = []
+        status_codes = set()
+        for index in range(warmup + iterations):
+            query_count = 0
+            # 書き込みを伴うリクエストは計測ごとにロールバックし、データを変えない
+            with transaction.atomic():
+                with connection.execute_wrapper(count_queries):
+                    started = time.perf_counter()
+                    if method == 'GET':
+                        response = client.get(url)
+                    else:
+                        response = client.post(url, payload, format='json')
+                    # ストリーミングのレスポンスは本文を読み切るまでを計測する
+                    body = response.getvalue()
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if index < warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(query_count)
+            sizes.append(len(body))
+            status_codes.add(response.status_code)
+
+        return {
+            'url': url,
+            'status_codes': sorted(status_codes),
+            'iterations': iterations,
+            'latency_ms': {
+                'min': round(min(latencies), 3),
+                'p50': round(percentile(latencies, 0.50), 3),
+                'p90': round(percentile(latencies, 0.90), 3),
+                'p95': round(percentile(latencies, 0.95), 3),
+                'p99': round(percentile(latencies, 0.99), 3),
+                'max': round(max(latencies), 3),
+                'mean': round(sum(latencies) / len(latencies), 3),
+            },
+            'queries': {'min': min(queries), 'max': max(queries), 'mean': round(sum(queries) / len(queries), 2)},
+            'response_bytes': {'min': min(sizes), 'max': max(sizes)},
+        }
+
+    def write_result(self, key, result):
+        latency = result['latency_ms']
+        line = (
+            f'{key}: p50 {latency["p50"]:.1f}ms  p95 {latency["p95"]:.1f}ms  p99 {latency["p99"]:.1f}ms  '
+            f'queries {result["queries"]["mean"]:g}  bytes {result["response_bytes"]["max"]}  '
+            f'status {",".join(str(code) for code in result["status_codes"])}'
+        )
+        if any(code >= 400 for code in result['status_codes']):
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(line)
+
+    def get_meta(self, user, admin, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        return {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'username': user.username,
+            'admin_username': admin.username if admin else None,
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+            'dataset': {
+                'users': User.objects.count(),
+                'questions': Question.objects.count(),
+                'sessions': QuizSession.objects.count(),
+                'attempts': UserAttempt.objects.count(),
+            },
+        }
+
+    def compare(self, path, results):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        self.stdout.write(f'\nCompared with {path} (commit {baseline["meta"].get("commit")}):')
+        for key, result in results.items():
+            previous = baseline['results'].get(key)
+            if 'skipped' in result or not previous or 'skipped' in previous:
+                continue
+            before = previous['latency_ms']['p50']
+            after = result['latency_ms']['p50']
+            change = (after - before) / before * 100 if before else 0
+            line = (
+                f'{key}: p50 {before:.1f} -> {after:.1f}ms ({change:+.0f}%)  '
+                f'queries {previous["queries"]["mean"]:g} -> {result["queries"]["mean"]:g}'
+            )
+            if change > 20:
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,110 @@
+# backend/progress/management/commands/benchmark_submission.py
+import time
+import random
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+from questions.models import Choice
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Measure quiz session submissions per second (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of submissions to send'
+        )
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=50,
+            help='Number of answers per submission'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed used to pick questions'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        question_count = options['questions']
+
+        choices = list(
+            Choice.objects.filter(question__is_active=True).values_list('question_id', 'id', 'question__genre_id')
+        )
+        choices_by_question = {}
+        for question_id, choice_id, genre_id in choices:
+            choices_by_question.setdefault(question_id, (genre_id, []))[1].append(choice_id)
+
+        if len(choices_by_question) < question_count:
+            self.stdout.write(
+                self.style.ERROR(f'At least {question_count} active questions with choices are required')
+            )
+            return
+
+        question_ids = sorted(choices_by_question)
+
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=f'benchmark-{time.time_ns()}',
+                email='benchmark@example.com',
+                password=None
+            )
+            client = APIClient()
+            client.force_authenticate(user)
+
+            payloads = []
+            for _ in range(options['requests']):
+                picked = rng.sample(question_ids, question_count)
+                payloads.append({
+                    'session_type': 'genre',
+                    'genre': choices_by_question[picked[0]][0],
+                    'total_questions': question_count,
+                    'answers': [
+                        {
+                            'question_id': question_id,
+                            'selected_choice_id': rng.choice(choices_by_question[question_id][1]),
+                            'is_correct': rng.random() < 0.6,
+                            'response_time_seconds': rng.randint(3, 60),
+                        }
+                        for question_id in picked
+                    ],
+                })
+
+            query_count = 0
+
+            def count_queries(execute, sql, params, many, context):
+                nonlocal query_count
+                query_count += 1
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_queries):
+                started = time.perf_counter()
+                for payload in payloads:
+                    response = client.post('/api/progress/sessions/', payload, format='json')
+                    if response.status_code != 201:
+                        self.stdout.write(
+                            self.style.ERROR(f'Submission failed: {response.status_code} {response.content[:200]}')
+                        )
+                        transaction.set_rollback(True)
+                        return
+                elapsed = time.perf_counter() - started
+
+            # 計測用のデータは残さない
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{len(payloads)} submissions x {question_count} answers: '
+                f'{len(payloads) / elapsed:.1f} req/s, '
+                f'{elapsed / len(payloads) * 1000:.2f} ms/req, '
+                f'{query_count / len(payloads):.1f} queries/req'
+            )
+        )
@@ -0,0 +1,101 @@
+# backend/progress/management/commands/check_query_plans.py
+import json
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from rest_framework.test import APIClient
+from progress.query_plans import capture_selects, endpoint_urls, explain
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Capture the query plans of the main progress and question endpoints on the current '
+        'dataset and fail when a full table scan or a filesort appears on a large table '
+        '(the regression check itself runs in progress.tests.QueryPlanTests)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='User to request the endpoints as (defaults to the user with the most attempts)'
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Tables with fewer rows than this are allowed to be scanned'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the captured plans to this JSON file'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        table_rows = self.count_table_rows()
+        min_rows = options['min_rows']
+
+        if max(table_rows.values(), default=0) < min_rows:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'No table has {min_rows} rows; generate a larger dataset for meaningful plans'
+                )
+            )
+
+        def is_large(table):
+            # 行数が分からないテーブル（派生テーブルなど）は大きいものとして扱う
+            return table_rows.get(table, min_rows) >= min_rows
+
+        client = APIClient()
+        client.force_authenticate(user)
+
+        report = []
+        violations = []
+        for url in endpoint_urls(user):
+            statements, response = capture_selects(client, url)
+            if response.status_code >= 400:
+                raise CommandError(f'{url} returned {response.status_code}')
+            for sql, params in statements:
+                try:
+                    plan, problems = explain(sql, params, is_large)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                report.append({'url': url, 'sql': sql, 'plan': plan, 'problems': problems})
+                for problem in problems:
+                    violations.append(f'{url}: {problem}\n    {sql[:300]}')
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+        self.stdout.write(f'Checked {len(report)} statements from {len({r["url"] for r in report})} endpoints')
+
+        if violations:
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(violation))
+            raise CommandError(f'{len(violations)} query plan problem(s) found')
+
+        self.stdout.write(self.style.SUCCESS('No full table scans or filesorts on large tables'))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User not found: {username}')
+        user = User.objects.annotate(attempt_count=Count('attempts')).order_by('-attempt_count').first()
+        if user is None:
+            raise CommandError('No users found')
+        return user
+
+    def count_table_rows(self):
+        return {
+            model._meta.db_table: model.objects.count()
+            for model in apps.get_models()
+            if not model._meta.proxy
+        }
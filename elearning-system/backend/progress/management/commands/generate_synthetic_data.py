@@ -0,0 +1,256 @@
+# backend/progress/management/commands/generate_synthetic_data.py
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Sum, Max
+from django.utils import timezone
+from questions.models import Genre, Question, Choice
+from questions.cache import invalidate_question_bank
+from questions.admin_stats import invalidate_user_stats
+from questions.search import index_questions
+from accounts.search import index_users
+from progress.models import UserAttempt, QuizSession, UserProgress
+from progress.rollups import rebuild_daily_rollups
+from elearning.db import explicit_timestamps
+
+User = get_user_model()
+
+DEPARTMENTS = ['営業部', 'マーケティング部', 'カスタマーサクセス部', '開発部', '管理部', '人事部']
+
+# 問題文の組み立てに使う語（検索のベンチマークで一致件数にばらつきが出るようにする）
+TOPICS = [
+    '個人情報保護', '情報セキュリティ', 'ハラスメント防止', 'インサイダー取引', '下請法', '労働基準法',
+    '著作権', '反社会的勢力', '内部通報制度', '会計処理', 'パスワード管理', '標的型攻撃メール',
+    'テレワーク', 'SNS利用', '品質管理', '経費精算', '輸出管理', '景品表示法',
+]
+LAST_NAMES = [
+    '佐藤', '鈴木', '高橋', '田中', '伊藤', '渡辺', '山本', '中村', '小林', '加藤',
+    '吉田', '山田', '佐々木', '山口', '松本', '井上', '木村', '林', '斎藤', '清水',
+]
+FIRST_NAMES = ['太郎', '花子', '健太', '美咲', '翔太', '陽菜', '大輔', '結衣', '拓也', 'さくら', '直樹', '誠']
+SUBJECTS = ['正しい対応', '適切な手順', '禁止されている行為', '報告先', '注意すべき点', '保存期間', '責任者']
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic dataset (users, questions, sessions and attempts) with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of learners')
+        parser.add_argument('--genres', type=int, default=10, help='Number of genres')
+        parser.add_argument('--questions', type=int, default=5000, help='Number of questions')
+        parser.add_argument('--choices', type=int, default=4, help='Choices per question')
+        parser.add_argument('--sessions', type=int, default=50, help='Quiz sessions per user')
+        parser.add_argument('--answers', type=int, default=10, help='Answers per session')
+        parser.add_argument('--days', type=int, default=180, help='Spread sessions over this many past days')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--prefix', type=str, default='syn', help='Prefix for generated usernames and ids')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        if User.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise CommandError(f'Data with prefix "{self.prefix}" already exists; use another --prefix')
+
+        with transaction.atomic():
+            genres = self.create_genres(options['genres'])
+            # 回答の生成には有効な問題だけを使う
+            active_questions = self.create_questions(genres, options['questions'], options['choices'])
+            users = self.create_users(options['users'])
+
+        attempt_count = 0
+        session_count = 0
+        for offset in range(0, len(users), 100):
+            with transaction.atomic():
+                sessions, attempts = self.create_activity(
+                    users[offset:offset + 100], active_questions,
+                    options['sessions'], options['answers'], options['days']
+                )
+            session_count += sessions
+            attempt_count += attempts
+            self.stdout.write(f'  {min(offset + 100, len(users))}/{len(users)} users: {session_count} sessions, {attempt_count} attempts')
+
+        with transaction.atomic():
+            self.create_progress(users)
+            rebuild_daily_rollups(users=users, batch_size=self.batch_size)
+
+        invalidate_question_bank()
+        invalidate_user_stats()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated {len(users)} users, {len(genres)} genres, '
+                f'{options["questions"]} questions ({len(active_questions)} active), '
+                f'{session_count} sessions and {attempt_count} attempts in {elapsed:.1f}s'
+            )
+        )
+
+    def create_genres(self, count):
+        genres = [
+            Genre(id=f'{self.prefix}{index:03d}'[:10], name=f'合成ジャンル {index + 1}')
+            for index in range(count)
+        ]
+        Genre.objects.bulk_create(genres, batch_size=self.batch_size)
+        return genres
+
+    def create_questions(self, genres, count, choices_per_question):
+        questions = []
+        choices = []
+        for index in range(count):
+            question_id = f'{self.prefix}Q{index:07d}'
+            topic, related = self.rng.sample(TOPICS, 2)
+            subject = self.rng.choice(SUBJECTS)
+            questions.append(Question(
+                id=question_id,
+                genre=self.rng.choice(genres),
+                difficulty=self.rng.choice([1, 1, 2, 2, 2, 3]),
+                body=f'合成問題 {index + 1}: {topic}に関する{subject}として、次のうち正しいものはどれですか。',
+                object=topic,
+                clarification=f'{topic}では{related}との関係にも注意が必要です。{subject}は社内規程を確認してください。',
+                is_active=self.rng.random() > 0.05,
+            ))
+            correct = self.rng.randrange(choices_per_question)
+            for order in range(choices_per_question):
+                choices.append(Choice(
+                    id=f'{question_id}-{order}',
+                    question_id=question_id,
+                    content=f'選択肢 {order + 1}',
+                    is_correct=order == correct,
+                    order_index=order,
+                ))
+
+        Question.objects.bulk_create(questions, batch_size=self.batch_size)
+        Choice.objects.bulk_create(choices, batch_size=self.batch_size)
+        index_questions([question.id for question in questions])
+
+        # 回答の生成用に (問題ID, ジャンルID, 正解の選択肢ID, 不正解の選択肢ID) を保持
+        answer_keys = {}
+        for choice in choices:
+            entry = answer_keys.setdefault(choice.question_id, [None, []])
+            if choice.is_correct:
+                entry[0] = choice.id
+            else:
+                entry[1].append(choice.id)
+        return [
+            (question.id, question.genre_id, answer_keys[question.id][0], answer_keys[question.id][1])
+            for question in questions if question.is_active
+        ]
+
+    def create_users(self, count):
+        password = make_password('password')
+        users = []
+        for index in range(count):
+            last_name = self.rng.choice(LAST_NAMES)
+            first_name = self.rng.choice(FIRST_NAMES)
+            users.append(User(
+                username=f'{self.prefix}_user{index:06d}',
+                email=f'{self.prefix}_user{index:06d}@example.com',
+                password=password,
+                role='manager' if index % 50 == 0 else 'student',
+                first_name=first_name,
+                last_name=last_name,
+                display_name=f'{last_name} {first_name}',
+                department=self.rng.choice(DEPARTMENTS),
+            ))
+        users.append(User(
+            username=f'{self.prefix}_admin',
+            email=f'{self.prefix}_admin@example.com',
+            password=password,
+            role='admin',
+            is_staff=True,
+            display_name='合成管理者',
+        ))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        index_users(User.objects.filter(username__startswith=f'{self.prefix}_').values_list('id', flat=True))
+        return list(User.objects.filter(username__startswith=f'{self.prefix}_user').order_by('id'))
+
+    def create_activity(self, users, questions, sessions_per_user, answers_per_session, days):
+        now = timezone.now()
+        sessions = []
+        answers = []
+        for user in users:
+            # ユーザーごとに得意・不得意があるように正答率をばらつかせる
+            skill = self.rng.uniform(0.3, 0.9)
+            for _ in range(sessions_per_user):
+                start_time = now - timedelta(days=self.rng.uniform(0, days))
+                picked = self.rng.sample(questions, min(answers_per_session, len(questions)))
+                session_answers = []
+                elapsed = 0
+                for question_id, genre_id, correct_id, wrong_ids in picked:
+                    is_correct = self.rng.random() < skill or not wrong_ids
+                    response_time = self.rng.randint(3, 90)
+                    elapsed += response_time
+                    session_answers.append((question_id, correct_id if is_correct else self.rng.choice(wrong_ids),
+                                            is_correct, response_time, start_time + timedelta(seconds=elapsed)))
+                sessions.append(QuizSession(
+                    user=user,
+                    session_type='genre',
+                    genre_id=picked[0][1] if picked else None,
+                    total_questions=len(session_answers),
+                    correct_answers=sum(1 for answer in session_answers if answer[2]),
+                    start_time=start_time,
+                    end_time=start_time + timedelta(seconds=elapsed),
+                    is_completed=True,
+                ))
+                answers.append(session_answers)
+
+        last_id = QuizSession.objects.aggregate(last=Max('id'))['last'] or 0
+        QuizSession.objects.bulk_create(sessions, batch_size=self.batch_size)
+        if sessions and sessions[0].pk is None:
+            # MySQLのbulk_createは主キーを設定しないため、作成したセッションを作成順に読み直してIDを設定する
+            session_ids = list(
+                QuizSession.objects.filter(user__in=users, id__gt=last_id).order_by('id').values_list('id', flat=True)
+            )
+            if len(session_ids) != len(sessions):
+                raise CommandError('Could not read back the IDs of the inserted quiz sessions')
+            for session, session_id in zip(sessions, session_ids):
+                session.pk = session_id
+
+        attempts = [
+            UserAttempt(
+                user_id=session.user_id,
+                session=session,
+                question_id=question_id,
+                selected_choice_id=choice_id,
+                is_correct=is_correct,
+                response_time_seconds=response_time,
+                attempt_time=attempt_time,
+            )
+            for session, session_answers in zip(sessions, answers)
+            for question_id, choice_id, is_correct, response_time, attempt_time in session_answers
+        ]
+        with explicit_timestamps(UserAttempt._meta.get_field('attempt_time')):
+            UserAttempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+        return len(sessions), len(attempts)
+
+    def create_progress(self, users):
+        rows = QuizSession.objects.filter(
+            user__in=users, is_completed=True, genre__isnull=False
+        ).values('user_id', 'genre_id').annotate(
+            total=Sum('total_questions'),
+            correct=Sum('correct_answers'),
+            last=Max('end_time'),
+        ).order_by()
+        progress = [
+            UserProgress(
+                user_id=row['user_id'],
+                genre_id=row['genre_id'],
+                total_attempts=row['total'],
+                correct_attempts=row['correct'],
+                last_study_date=row['last'],
+                created_at=row['last'],
+            )
+            for row in rows
+        ]
+        last_study_date = UserProgress._meta.get_field('last_study_date')
+        created_at = UserProgress._meta.get_field('created_at')
+        with explicit_timestamps(last_study_date, created_at):
+            UserProgress.objects.bulk_create(progress, batch_size=self.batch_size)
@@ -0,0 +1,35 @@
+# backend/progress/management/commands/resume_assignment_distributions.py
+from django.core.management.base import BaseCommand
+from progress.models import AssignmentDistributionJob
+from progress.tasks import requeue_distribution
+
+class Command(BaseCommand):
+    help = 'Re-enqueue failed assignment distribution jobs; each job resumes after its last processed user'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job',
+            type=int,
+            action='append',
+            help='Distribution job ID to resume (can be repeated). Resumes all matching jobs when omitted'
+        )
+        parser.add_argument(
+            '--include-running',
+            action='store_true',
+            help='Also re-enqueue pending and running jobs (only when no worker is processing them, e.g. after a lost message)'
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['failed']
+        if options['include_running']:
+            statuses += ['pending', 'running']
+
+        jobs = AssignmentDistributionJob.objects.filter(status__in=statuses)
+        if options['job']:
+            jobs = jobs.filter(id__in=options['job'])
+
+        resumed = [job_id for job_id in jobs.order_by('id').values_list('id', flat=True) if requeue_distribution(job_id, statuses)]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Re-enqueued {len(resumed)} distribution jobs' + (f': {resumed}' if resumed else ''))
+        )
@@ -0,0 +1,27 @@
+# backend/progress/management/commands/sweep_overdue_assignments.py
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from progress.models import OverdueSweep
+from progress.tasks import sweep_overdue_assignments, OVERDUE_CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = 'Mark open user assignments overdue for assignments whose due date passed since the last sweep'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=OVERDUE_CHUNK_SIZE,
+            help='Number of user assignments updated per statement'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        sweep = OverdueSweep.objects.get(id=sweep_overdue_assignments(options['chunk_size']))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Marked {sweep.updated} user assignments overdue across {sweep.assignments} assignments '
+                f'(due up to {timezone.localtime(sweep.swept_until):%Y-%m-%d %H:%M:%S}) in {time.perf_counter() - started:.2f}s'
+            )
+        )
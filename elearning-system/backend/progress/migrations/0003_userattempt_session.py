@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_attempts_to_sessions(apps, schema_editor):
+    """既存の回答を、同じユーザーの開始〜終了時刻内のセッションに紐付ける"""
+    QuizSession = apps.get_model('progress', 'QuizSession')
+    UserAttempt = apps.get_model('progress', 'UserAttempt')
+
+    sessions = QuizSession.objects.filter(
+        end_time__isnull=False
+    ).order_by('start_time').values_list('id', 'user_id', 'start_time', 'end_time')
+
+    for session_id, user_id, start_time, end_time in sessions.iterator():
+        UserAttempt.objects.filter(
+            user_id=user_id,
+            session__isnull=True,
+            attempt_time__range=(start_time, end_time)
+        ).update(session_id=session_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0002_daily_study_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userattempt',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='progress.quizsession'),
+        ),
+        migrations.RunPython(link_attempts_to_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0003_userattempt_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quizsession',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
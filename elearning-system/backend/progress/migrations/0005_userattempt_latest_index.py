@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0004_quizsession_start_time_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['user', 'question', 'attempt_time'], name='progress_attempt_user_q_time'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0005_userattempt_latest_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['user', 'attempt_time', 'id'], name='progress_attempt_user_time_id'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0006_userattempt_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='userattempt',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(fields=['user', 'is_completed', 'start_time'], name='progress_session_user_done'),
+        ),
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(fields=['user', 'start_time'], name='progress_session_user_start'),
+        ),
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['user', 'is_correct', 'question', 'attempt_time'], name='progress_attempt_user_correct'),
+        ),
+        migrations.AddIndex(
+            model_name='userprogress',
+            index=models.Index(fields=['user', 'last_study_date'], name='progress_progress_user_date'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0009_assignment_distribution_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('swept_until', models.DateTimeField(db_index=True)),
+                ('assignments', models.IntegerField(default=0)),
+                ('updated', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['due_date'], name='progress_assignment_due'),
+        ),
+        migrations.AddIndex(
+            model_name='userassignment',
+            index=models.Index(fields=['assignment', 'status'], name='progress_uassign_status'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def copy_user_departments(apps, schema_editor):
+    """既存のユーザー課題に現在のユーザーの部署を設定する"""
+    UserAssignment = apps.get_model('progress', 'UserAssignment')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserAssignment.objects.update(
+        department=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('department')[:1])
+    )
+
+
+def build_assignment_rollups(apps, schema_editor):
+    """既存のユーザー課題から課題別ロールアップと得点ごとの人数を作る（以降はユーザー課題の変更時に加算更新される）"""
+    UserAssignment = apps.get_model('progress', 'UserAssignment')
+    AssignmentRollup = apps.get_model('progress', 'AssignmentRollup')
+    AssignmentScoreCount = apps.get_model('progress', 'AssignmentScoreCount')
+
+    rows = UserAssignment.objects.values('assignment_id', 'department').annotate(
+        assigned_count=Count('id', filter=Q(status='assigned')),
+        in_progress_count=Count('id', filter=Q(status='in_progress')),
+        completed_count=Count('id', filter=Q(status='completed')),
+        overdue_count=Count('id', filter=Q(status='overdue')),
+        scored_count=Count('score'),
+        score_sum=Coalesce(Sum('score'), 0),
+    ).order_by()
+    AssignmentRollup.objects.bulk_create([AssignmentRollup(**row) for row in rows], batch_size=1000)
+
+    histogram = UserAssignment.objects.filter(score__isnull=False).values(
+        'assignment_id', 'department', 'score'
+    ).annotate(count=Count('id')).order_by()
+    AssignmentScoreCount.objects.bulk_create([AssignmentScoreCount(**row) for row in histogram], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('progress', '0010_overdue_sweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userassignment',
+            name='department',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(copy_user_departments, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='AssignmentScoreCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('score', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_counts', to='progress.assignment')),
+            ],
+            options={
+                'unique_together': {('assignment', 'department', 'score')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AssignmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('assigned_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('overdue_count', models.IntegerField(default=0)),
+                ('scored_count', models.IntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='progress.assignment')),
+            ],
+            options={
+                'unique_together': {('assignment', 'department')},
+            },
+        ),
+        migrations.RunPython(build_assignment_rollups, migrations.RunPython.noop),
+    ]
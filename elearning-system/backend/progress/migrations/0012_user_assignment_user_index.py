@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0011_assignment_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userassignment',
+            index=models.Index(fields=['user', 'assigned_at'], name='progress_uassign_user_date'),
+        ),
+    ]
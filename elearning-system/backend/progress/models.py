@@ -1,11 +1,13 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from questions.models import Question, Choice, Genre
 
 User = get_user_model()
 
 class UserAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempts')
+    session = models.ForeignKey('QuizSession', on_delete=models.SET_NULL, null=True, blank=True, related_name='attempts')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
     is_correct = models.BooleanField()
@@ -13,7 +15,16 @@ class UserAttempt(models.Model):
     response_time_seconds = models.IntegerField(null=True, blank=True)  # 回答にかかった時間
 
     class Meta:
-        ordering = ['-attempt_time']
+        indexes = [
+            # 不正解の問題の抽出用（インデックスのみで問題IDまで読める）
+            models.Index(fields=['user', 'is_correct', 'question', 'attempt_time'], name='progress_attempt_user_correct'),
+            # 問題ごとの最新の回答の取得用
+            models.Index(fields=['user', 'question', 'attempt_time'], name='progress_attempt_user_q_time'),
+            # 回答履歴のカーソルページング用
+            models.Index(fields=['user', 'attempt_time', 'id'], name='progress_attempt_user_time_id'),
+            # 全ユーザーを対象にした期間指定の集計用
+            models.Index(fields=['attempt_time'], name='progress_attempt_time'),
+        ]
 
     def __str__(self):
         result = "正解" if self.is_correct else "不正解"
@@ -33,10 +44,18 @@ class QuizSession(models.Model):
     difficulty = models.IntegerField(null=True, blank=True)
     total_questions = models.IntegerField()
     correct_answers = models.IntegerField(default=0)
-    start_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(null=True, blank=True)
     is_completed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # 完了済みセッションの集計・期間での取得用
+            models.Index(fields=['user', 'is_completed', 'start_time'], name='progress_session_user_done'),
+            # セッション一覧（新しい順）のページング用
+            models.Index(fields=['user', 'start_time'], name='progress_session_user_start'),
+        ]
+
     @property
     def score_percentage(self):
         if self.total_questions == 0:
@@ -56,6 +75,10 @@ class UserProgress(models.Model):
 
     class Meta:
         unique_together = ['user', 'genre']
+        indexes = [
+            # 最終学習日順の一覧用
+            models.Index(fields=['user', 'last_study_date'], name='progress_progress_user_date'),
+        ]
 
     @property
     def accuracy_rate(self):
@@ -78,6 +101,12 @@ class Assignment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # 期限切れの判定（前回の判定以降に期限を過ぎた課題の範囲検索）用
+            models.Index(fields=['due_date'], name='progress_assignment_due'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -96,9 +125,112 @@ class UserAssignment(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     score = models.IntegerField(null=True, blank=True)
+    department = models.CharField(max_length=100, blank=True)  # 配信時のユーザーの部署（部署別の集計用）
 
     class Meta:
         unique_together = ['assignment', 'user']
+        indexes = [
+            # 課題ごとの状態別の抽出（期限切れへの更新）用
+            models.Index(fields=['assignment', 'status'], name='progress_uassign_status'),
+            # 自分の課題一覧（配信日時の新しい順）用
+            models.Index(fields=['user', 'assigned_at'], name='progress_uassign_user_date'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.assignment.title} - {self.get_status_display()}"
+
+class AssignmentDistributionJob(models.Model):
+    """課題の一括配信（対象ユーザーにUserAssignmentをバックグラウンドで一定件数ずつ作成する）"""
+    STATUS_CHOICES = [
+        ('pending', '待機中'),
+        ('running', '実行中'),
+        ('completed', '完了'),
+        ('failed', '失敗'),
+    ]
+
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='distribution_jobs')
+    # 対象ユーザーの条件（roles・departmentsに一致するユーザーと、user_idsで指定したユーザー）
+    roles = models.JSONField(default=list)
+    departments = models.JSONField(default=list)
+    user_ids = models.JSONField(default=list)
+    scope_department = models.CharField(max_length=100, blank=True)  # 成績管理者の配信は自部署に限定する
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)  # 処理済みの対象ユーザー数
+    created = models.IntegerField(default=0)  # 新たに配信した数（配信済みのユーザーは数えない）
+    last_user_id = models.BigIntegerField(default=0)  # 処理済みの最大のユーザーID（再実行時はここから再開する）
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='distribution_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def progress(self):
+        if self.total == 0:
+            return 100.0
+        return round(min(self.processed / self.total, 1) * 100, 1)
+
+    def __str__(self):
+        return f"{self.assignment.title} - {self.get_status_display()} ({self.processed}/{self.total})"
+
+class AssignmentRollup(models.Model):
+    """課題別・部署別の状態ごとの件数と得点（UserAssignmentの変更時に加算更新）"""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='rollups')
+    department = models.CharField(max_length=100, blank=True)
+    assigned_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    overdue_count = models.IntegerField(default=0)
+    scored_count = models.IntegerField(default=0)  # 得点のあるユーザー課題数
+    score_sum = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['assignment', 'department']
+
+    def __str__(self):
+        return f"{self.assignment.title} - {self.department or '部署なし'}"
+
+class AssignmentScoreCount(models.Model):
+    """課題別・部署別の得点ごとの人数（得点の中央値の計算用）"""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='score_counts')
+    department = models.CharField(max_length=100, blank=True)
+    score = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['assignment', 'department', 'score']
+
+    def __str__(self):
+        return f"{self.assignment.title} - {self.department or '部署なし'} - {self.score}点: {self.count}人"
+
+class OverdueSweep(models.Model):
+    """期限切れ判定の実行記録（swept_until までに期限を過ぎた課題を判定済み）"""
+    swept_until = models.DateTimeField(db_index=True)
+    assignments = models.IntegerField(default=0)  # 判定した課題数
+    updated = models.IntegerField(default=0)  # 期限切れにしたユーザー課題数
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.swept_until} - {self.updated}件"
+
+class DailyStudyRollup(models.Model):
+    """ユーザー別・日別の学習実績（セッション送信時に加算更新）"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    sessions_count = models.IntegerField(default=0)
+    questions_count = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    study_seconds = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.sessions_count}セッション"
@@ -0,0 +1,30 @@
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+
+
+class IsManager(BasePermission):
+    """成績管理者（role=manager）または管理者（is_staff）のみ許可"""
+    message = '成績管理者のみ利用できます'
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.role == 'manager' or user.is_staff))
+
+
+def get_managed_department(request):
+    """
+    集計・エクスポートの対象部署を返す
+
+    成績管理者は自分の部署に限定する。管理者は department パラメータで指定でき、
+    指定しない場合は None（全部署）を返す。
+    """
+    user = request.user
+    if user.is_staff:
+        return request.query_params.get('department') or None
+    if not user.department:
+        raise PermissionDenied('部署が設定されていません')
+    department = request.query_params.get('department')
+    if department and department != user.department:
+        raise PermissionDenied('他の部署のデータは参照できません')
+    return user.department
+
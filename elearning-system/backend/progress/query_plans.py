@@ -0,0 +1,158 @@
+import json
+import re
+from django.db import connection
+from questions.models import Question
+from .models import QuizSession
+
+# Djangoが付けるテーブル別名（U0, T3 など）を実テーブル名に戻すためのパターン
+TABLE_ALIAS_PATTERN = re.compile(r'[`"](\w+)[`"]\s+(?:AS\s+)?[`"]?([UT]\d+)[`"]?', re.IGNORECASE)
+
+# 実行計画を確認する学習者向けのエンドポイント
+ENDPOINTS = [
+    '/api/progress/sessions/',
+    '/api/progress/progress/',
+    '/api/progress/statistics/',
+    '/api/progress/genre-performance/',
+    '/api/progress/weekly-progress/',
+    '/api/progress/daily-activity/',
+    '/api/progress/attempts/',
+    '/api/progress/attempts/?is_correct=false',
+    '/api/progress/assignments/',
+    '/api/progress/user-assignments/',
+    '/api/progress/incorrect-questions/',
+    '/api/questions/genres/',
+    '/api/questions/questions/',
+    '/api/questions/questions/random/',
+]
+
+
+def endpoint_urls(user):
+    """実行計画を確認するURL（セッション・問題の詳細など、データに応じたものを含む）"""
+    urls = list(ENDPOINTS)
+
+    session = QuizSession.objects.filter(user=user).order_by('-start_time').first()
+    if session:
+        urls.append(f'/api/progress/sessions/{session.pk}/')
+
+    question = Question.objects.filter(is_active=True).first()
+    if question:
+        urls += [
+            f'/api/questions/questions/{question.pk}/',
+            f'/api/questions/questions/?genre={question.genre_id}&difficulty={question.difficulty}',
+            f'/api/progress/attempts/?genre={question.genre_id}',
+        ]
+    return urls
+
+
+def capture_selects(client, url):
+    """
+    URLへのリクエストで実行されたSELECT文 [(sql, params)] とレスポンスを返す
+
+    同じSQLは1回だけ記録する。
+    """
+    statements = {}
+
+    def capture(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            statements.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        response = client.get(url)
+    return list(statements.items()), response
+
+
+def resolve_table(name, sql):
+    aliases = {alias.upper(): table for table, alias in TABLE_ALIAS_PATTERN.findall(sql)}
+    return aliases.get(name.upper(), name)
+
+
+def has_limit(sql):
+    # 並び替えが問題になるのはLIMIT付きの一覧（インデックス順で読めば先頭だけで済む）の場合
+    return re.search(r'\bLIMIT \d+\s*$', sql) is not None
+
+
+def explain(sql, params, is_large):
+    """
+    SQLの実行計画と、大きなテーブルの全件走査・LIMIT付きの並び替えの一覧を返す
+
+    is_largeはテーブル名を受け取り、確認の対象にするかを返す関数。
+    """
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == 'mysql':
+            return _explain_mysql(cursor, sql, params, is_large)
+        if vendor == 'postgresql':
+            return _explain_postgresql(cursor, sql, params, is_large)
+        if vendor == 'sqlite':
+            return _explain_sqlite(cursor, sql, params, is_large)
+    raise ValueError(f'Unsupported database backend: {vendor}')
+
+
+def _explain_mysql(cursor, sql, params, is_large):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    columns = [column[0] for column in cursor.description]
+    plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    problems = []
+    for row in plan:
+        table = resolve_table(row.get('table') or '', sql)
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL' and is_large(table):
+            problems.append(f'full table scan on {table}')
+        if 'Using filesort' in extra and row.get('select_type') in ('SIMPLE', 'PRIMARY') \
+                and has_limit(sql) and is_large(table):
+            problems.append(f'filesort on {table}')
+    return plan, problems
+
+
+def _explain_postgresql(cursor, sql, params, is_large):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    problems = []
+
+    def relations(node):
+        if node.get('Relation Name'):
+            yield node['Relation Name']
+        for child in node.get('Plans', []):
+            yield from relations(child)
+
+    def walk(node, parent=None):
+        table = node.get('Relation Name')
+        if node['Node Type'] == 'Seq Scan' and is_large(table):
+            problems.append(f'sequential scan on {table}')
+        if node['Node Type'] == 'Sort' and parent is not None and parent['Node Type'] == 'Limit':
+            for sorted_table in relations(node):
+                if is_large(sorted_table):
+                    problems.append(f'sort of {sorted_table} rows')
+                    break
+        for child in node.get('Plans', []):
+            walk(child, node)
+
+    walk(plan[0]['Plan'])
+    return plan, problems
+
+
+def _explain_sqlite(cursor, sql, params, is_large):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    rows = cursor.fetchall()
+    plan = [row[-1] for row in rows]
+
+    problems = []
+    main_table = None
+    for node_id, parent, _, detail in rows:
+        match = re.match(r'(SCAN|SEARCH) (?:TABLE )?(\S+)', detail)
+        if match:
+            table = resolve_table(match.group(2), sql)
+            if parent == 0 and main_table is None:
+                main_table = table
+            if match.group(1) == 'SCAN' and 'USING' not in detail and is_large(table):
+                problems.append(f'full table scan on {table}')
+        # サブクエリ内の並び替えは対象外（parentが0のものがメインクエリ）
+        if detail == 'USE TEMP B-TREE FOR ORDER BY' and parent == 0 and has_limit(sql) \
+                and main_table and is_large(main_table):
+            problems.append(f'filesort on {main_table}')
+    return plan, problems
@@ -0,0 +1,272 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import (
+    QuizSession, UserProgress, DailyStudyRollup, UserAssignment, AssignmentRollup, AssignmentScoreCount
+)
+from .statistics import session_duration
+
+# ユーザー課題の状態と、課題別ロールアップの件数の列
+ASSIGNMENT_STATUS_COUNTS = {
+    'assigned': 'assigned_count',
+    'in_progress': 'in_progress_count',
+    'completed': 'completed_count',
+    'overdue': 'overdue_count',
+}
+
+
+def session_study_seconds(session):
+    """セッションの学習時間（秒）"""
+    if not session.end_time or not session.start_time:
+        return 0
+    return max(0, round((session.end_time - session.start_time).total_seconds()))
+
+
+def record_session_progress(session):
+    """
+    完了したセッションの結果をジャンル別の進捗に加算する
+
+    読み込んだ値を書き戻すのではなくF式で加算するため、複数タブから
+    同時に送信されても更新が失われない。
+    """
+    if not session.genre_id:
+        return
+
+    with transaction.atomic():
+        progress, created = UserProgress.objects.get_or_create(user_id=session.user_id, genre_id=session.genre_id)
+        UserProgress.objects.filter(pk=progress.pk).update(
+            total_attempts=F('total_attempts') + session.total_questions,
+            correct_attempts=F('correct_attempts') + session.correct_answers,
+            last_study_date=timezone.now()
+        )
+
+
+def record_session_rollup(session):
+    """
+    完了したセッションの実績を日別ロールアップに加算する
+
+    行の取得・作成後にF式で加算するため、同時に送信されたセッションの
+    実績が失われることはない。
+    """
+    date = timezone.localdate(session.start_time)
+
+    with transaction.atomic():
+        rollup, created = DailyStudyRollup.objects.get_or_create(user_id=session.user_id, date=date)
+        DailyStudyRollup.objects.filter(pk=rollup.pk).update(
+            sessions_count=F('sessions_count') + 1,
+            questions_count=F('questions_count') + session.total_questions,
+            correct_answers=F('correct_answers') + session.correct_answers,
+            study_seconds=F('study_seconds') + session_study_seconds(session),
+            updated_at=timezone.now()
+        )
+
+
+def daily_rollups(user, start_date, end_date):
+    """期間内の日別ロールアップを日付をキーにした辞書で返す（1クエリ）"""
+    rollups = DailyStudyRollup.objects.filter(
+        user=user,
+        date__range=[start_date, end_date]
+    )
+    return {rollup.date: rollup for rollup in rollups}
+
+
+def rebuild_daily_rollups(users=None, batch_size=1000):
+    """
+    QuizSessionから日別ロールアップを再集計する
+
+    usersを指定した場合はそのユーザーの分だけを作り直す。
+    作成したロールアップの件数を返す。
+    """
+    sessions = QuizSession.objects.filter(is_completed=True)
+    rollups = DailyStudyRollup.objects.all()
+    if users is not None:
+        sessions = sessions.filter(user__in=users)
+        rollups = rollups.filter(user__in=users)
+
+    # 日付はstart_time__dateと同じく現在のタイムゾーンで切り出す
+    rows = sessions.annotate(
+        date=TruncDate('start_time')
+    ).values('user_id', 'date').annotate(
+        sessions_count=Count('id'),
+        questions_count=Coalesce(Sum('total_questions'), 0),
+        correct_answers=Coalesce(Sum('correct_answers'), 0),
+        study_time=Sum(session_duration()),
+    ).order_by('user_id', 'date')
+
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+
+        batch = []
+        for row in rows.iterator():
+            study_time = row['study_time']
+            batch.append(DailyStudyRollup(
+                user_id=row['user_id'],
+                date=row['date'],
+                sessions_count=row['sessions_count'],
+                questions_count=row['questions_count'],
+                correct_answers=row['correct_answers'],
+                study_seconds=max(0, round(study_time.total_seconds())) if study_time else 0,
+            ))
+            if len(batch) >= batch_size:
+                DailyStudyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            DailyStudyRollup.objects.bulk_create(batch)
+            created += len(batch)
+
+    return created
+
+
+def _apply_deltas(model, key_fields, deltas, **values):
+    """
+    キーごとの列の増減をF式で反映する
+
+    増やす列があるときだけ行を作成する。減らすだけのときに作成しないのは、
+    課題の削除でユーザー課題と集計行がまとめて削除される途中に行を作り直さないため。
+    """
+    for key, fields in deltas.items():
+        fields = {name: delta for name, delta in fields.items() if delta}
+        if not fields:
+            continue
+        lookup = dict(zip(key_fields, key))
+        if any(delta > 0 for delta in fields.values()):
+            model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(
+            **{name: F(name) + delta for name, delta in fields.items()}, **values
+        )
+
+
+def record_assignment_changes(removed=(), added=()):
+    """
+    ユーザー課題の変更を課題別ロールアップに反映する
+
+    removed・addedは変更前・変更後の (assignment_id, department, status, score)。
+    状態や得点の変更は変更前を除いて変更後を加える。キーごとにまとめてF式で加算するため、
+    一括配信・一括更新でも更新するのは課題×部署の行数だけになる。
+    """
+    rollups = defaultdict(Counter)
+    scores = defaultdict(Counter)
+    for sign, rows in ((-1, removed), (1, added)):
+        for assignment_id, department, status, score in rows:
+            key = (assignment_id, department)
+            rollups[key][ASSIGNMENT_STATUS_COUNTS[status]] += sign
+            if score is not None:
+                rollups[key]['scored_count'] += sign
+                rollups[key]['score_sum'] += sign * score
+                scores[(assignment_id, department, score)]['count'] += sign
+
+    with transaction.atomic():
+        _apply_deltas(AssignmentRollup, ('assignment_id', 'department'), rollups, updated_at=timezone.now())
+        _apply_deltas(AssignmentScoreCount, ('assignment_id', 'department', 'score'), scores)
+
+
+def median_score(histogram):
+    """得点ごとの人数 {score: count} から中央値を求める"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    middle = ((total - 1) // 2, total // 2)
+    values = []
+    seen = 0
+    for score, count in sorted(histogram.items()):
+        values.extend(score for position in middle if seen <= position < seen + count)
+        seen += count
+    return sum(values) / 2
+
+
+def _summarize(rollups, histogram):
+    counts = {status: sum(getattr(rollup, field) for rollup in rollups) for status, field in ASSIGNMENT_STATUS_COUNTS.items()}
+    total = sum(counts.values())
+    scored = sum(rollup.scored_count for rollup in rollups)
+    score_sum = sum(rollup.score_sum for rollup in rollups)
+    median = median_score(histogram)
+    return {
+        'total': total,
+        'status_counts': counts,
+        'completion_rate': round(counts['completed'] / total * 100, 1) if total else 0,
+        'scored': scored,
+        'average_score': round(score_sum / scored, 1) if scored else None,
+        'median_score': median,
+    }
+
+
+def assignment_summaries(assignment_ids, department=None):
+    """
+    課題ごとの進捗の集計（全体と部署別）を課題IDをキーにした辞書で返す
+
+    課題別ロールアップと得点ごとの人数だけを読むため、ユーザー課題の件数によらず2クエリで済む。
+    departmentを指定するとその部署に限定する。
+    """
+    rollups = AssignmentRollup.objects.filter(assignment_id__in=assignment_ids)
+    score_counts = AssignmentScoreCount.objects.filter(assignment_id__in=assignment_ids, count__gt=0)
+    if department is not None:
+        rollups = rollups.filter(department=department)
+        score_counts = score_counts.filter(department=department)
+
+    histograms = defaultdict(Counter)
+    for assignment_id, department_name, score, count in score_counts.values_list(
+        'assignment_id', 'department', 'score', 'count'
+    ):
+        histograms[(assignment_id, department_name)][score] += count
+
+    grouped = defaultdict(list)
+    for rollup in rollups.order_by('department'):
+        # 削除などで0件になった部署の行は内訳に含めない
+        if any(getattr(rollup, field) for field in ASSIGNMENT_STATUS_COUNTS.values()):
+            grouped[rollup.assignment_id].append(rollup)
+
+    summaries = {}
+    for assignment_id in assignment_ids:
+        department_rollups = grouped[assignment_id]
+        department_histograms = [histograms[(assignment_id, rollup.department)] for rollup in department_rollups]
+        summaries[assignment_id] = {
+            **_summarize(department_rollups, sum(department_histograms, Counter())),
+            'departments': [
+                {'department': rollup.department, **_summarize([rollup], histogram)}
+                for rollup, histogram in zip(department_rollups, department_histograms)
+            ],
+        }
+    return summaries
+
+
+def rebuild_assignment_rollups(assignments=None, batch_size=1000):
+    """
+    UserAssignmentから課題別ロールアップを再集計する
+
+    assignmentsを指定した場合はその課題の分だけを作り直す。
+    作成したロールアップの件数を返す。
+    """
+    user_assignments = UserAssignment.objects.all()
+    rollups = AssignmentRollup.objects.all()
+    score_counts = AssignmentScoreCount.objects.all()
+    if assignments is not None:
+        user_assignments = user_assignments.filter(assignment__in=assignments)
+        rollups = rollups.filter(assignment__in=assignments)
+        score_counts = score_counts.filter(assignment__in=assignments)
+
+    rows = user_assignments.values('assignment_id', 'department').annotate(
+        **{field: Count('id', filter=Q(status=status)) for status, field in ASSIGNMENT_STATUS_COUNTS.items()},
+        scored_count=Count('score'),
+        score_sum=Coalesce(Sum('score'), 0),
+    ).order_by()
+    histogram = user_assignments.filter(score__isnull=False).values(
+        'assignment_id', 'department', 'score'
+    ).annotate(count=Count('id')).order_by()
+
+    with transaction.atomic():
+        rollups.delete()
+        score_counts.delete()
+        created = AssignmentRollup.objects.bulk_create(
+            [AssignmentRollup(**row) for row in rows], batch_size=batch_size
+        )
+        AssignmentScoreCount.objects.bulk_create(
+            [AssignmentScoreCount(**row) for row in histogram], batch_size=batch_size
+        )
+
+    return len(created)
@@ -1,8 +1,11 @@
 from rest_framework import serializers
-from django.db.models import Count, Avg, Sum, Q
+from django.db.models import Count, Avg, Sum, Q, OuterRef, Subquery, Prefetch
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from .models import UserAttempt, QuizSession, UserProgress, Assignment, UserAssignment
+from .models import UserAttempt, QuizSession, UserProgress, Assignment, UserAssignment, AssignmentDistributionJob
+from .rollups import record_session_progress, record_session_rollup
+from questions.models import Choice
 from questions.serializers import GenreSerializer, QuestionSerializer
 from accounts.serializers import UserSerializer
 
@@ -19,7 +22,20 @@ class UserAttemptSerializer(serializers.ModelSerializer):
                  'correct_choice_text', 'is_correct', 'attempt_time', 'response_time_seconds',
                  'genre_name']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """問題・ジャンル・選択肢・正解の選択肢を1回のクエリで読み込む"""
+        correct_choice = Choice.objects.filter(
+            question=OuterRef('question'),
+            is_correct=True
+        ).order_by('order_index').values('content')[:1]
+        return queryset.select_related('question__genre', 'selected_choice').annotate(
+            correct_choice_content=Subquery(correct_choice)
+        )
+
     def get_correct_choice_text(self, obj):
+        if hasattr(obj, 'correct_choice_content'):
+            return obj.correct_choice_content
         correct_choice = obj.question.choices.filter(is_correct=True).first()
         return correct_choice.content if correct_choice else None
 
@@ -28,7 +44,7 @@ class QuizSessionSerializer(serializers.ModelSerializer):
     genre_name = serializers.CharField(source='genre.name', read_only=True)
     score_percentage = serializers.ReadOnlyField()
     duration_minutes = serializers.SerializerMethodField()
-    attempts = UserAttemptSerializer(many=True, read_only=True, source='user.attempts')
+    attempts = UserAttemptSerializer(many=True, read_only=True)
 
     class Meta:
         model = QuizSession
@@ -36,6 +52,16 @@ class QuizSessionSerializer(serializers.ModelSerializer):
                  'total_questions', 'correct_answers', 'score_percentage',
                  'start_time', 'end_time', 'is_completed', 'duration_minutes', 'attempts']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """セッションごとの回答を1回のprefetchでまとめて読み込む"""
+        attempts = UserAttemptSerializer.setup_eager_loading(
+            UserAttempt.objects.order_by('-attempt_time', '-id')
+        )
+        return queryset.select_related('genre').prefetch_related(
+            Prefetch('attempts', queryset=attempts)
+        )
+
     def get_duration_minutes(self, obj):
         if obj.end_time and obj.start_time:
             duration = obj.end_time - obj.start_time
@@ -53,51 +79,42 @@ class QuizSessionCreateSerializer(serializers.ModelSerializer):
         model = QuizSession
         fields = ['session_type', 'genre', 'difficulty', 'total_questions', 'answers']
 
+    @transaction.atomic
     def create(self, validated_data):
         answers_data = validated_data.pop('answers')
         user = self.context['request'].user
+        now = timezone.now()
+        
+        correct_count = sum(1 for answer_data in answers_data if answer_data['is_correct'])
         
-        # クイズセッションを作成
+        # クイズセッションを結果込みで作成（INSERT 1回）
         quiz_session = QuizSession.objects.create(
             user=user,
+            correct_answers=correct_count,
+            start_time=now,
+            end_time=now,
+            is_completed=True,
             **validated_data
         )
         
-        correct_count = 0
-        
-        # 各回答を処理
-        for answer_data in answers_data:
-            attempt = UserAttempt.objects.create(
+        # 回答を一括登録
+        UserAttempt.objects.bulk_create([
+            UserAttempt(
                 user=user,
+                session=quiz_session,
                 question_id=answer_data['question_id'],
                 selected_choice_id=answer_data['selected_choice_id'],
                 is_correct=answer_data['is_correct'],
                 response_time_seconds=answer_data.get('response_time_seconds')
             )
-            
-            if attempt.is_correct:
-                correct_count += 1
-        
-        # セッション結果を更新
-        quiz_session.correct_answers = correct_count
-        quiz_session.end_time = timezone.now()
-        quiz_session.is_completed = True
-        quiz_session.save()
+            for answer_data in answers_data
+        ], batch_size=500)
         
         # ユーザー進捗を更新
-        if quiz_session.genre:
-            progress, created = UserProgress.objects.get_or_create(
-                user=user,
-                genre=quiz_session.genre,
-                defaults={
-                    'total_attempts': validated_data['total_questions'],
-                    'correct_attempts': correct_count
-                }
-            )
-            if not created:
-                progress.total_attempts += validated_data['total_questions']
-                progress.correct_attempts += correct_count
-                progress.save()
+        record_session_progress(quiz_session)
+        
+        # 日別ロールアップを更新
+        record_session_rollup(quiz_session)
         
         return quiz_session
 
@@ -169,4 +186,26 @@ class UserAssignmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAssignment
         fields = ['id', 'assignment', 'status', 'assigned_at', 'started_at', 
-                 'completed_at', 'score']
\ No newline at end of file
+                 'completed_at', 'score']
+
+
+class AssignmentDistributionJobSerializer(serializers.ModelSerializer):
+    """課題一括配信ジョブのシリアライザー"""
+    assignment_title = serializers.CharField(source='assignment.title', read_only=True)
+    progress = serializers.ReadOnlyField()
+    message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AssignmentDistributionJob
+        fields = [
+            'id', 'assignment', 'assignment_title', 'roles', 'departments', 'user_ids',
+            'status', 'total', 'processed', 'created', 'progress', 'message', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_message(self, obj):
+        if obj.status == 'completed':
+            return f'{obj.created}人に課題を配信しました（配信済み{obj.processed - obj.created}人）'
+        if obj.status == 'failed':
+            return f'課題の配信に失敗しました（{obj.processed}/{obj.total}人処理済み）'
+        return f'課題の配信を{obj.get_status_display()}です（{obj.processed}/{obj.total}人）'
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Model, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Assignment, UserAssignment
+from .rollups import record_assignment_changes
+
+User = get_user_model()
+
+
+def _rollup_row(user_assignment):
+    return (user_assignment.assignment_id, user_assignment.department, user_assignment.status, user_assignment.score)
+
+
+@receiver(pre_save, sender=UserAssignment)
+def remember_previous_assignment(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._rollup_previous = None
+        if not instance.department:
+            instance.department = User.objects.filter(pk=instance.user_id).values_list('department', flat=True).first() or ''
+        return
+    # 変更前の状態・得点を読んでおき、保存後にロールアップから差し引く
+    instance._rollup_previous = UserAssignment.objects.filter(pk=instance.pk).values_list(
+        'assignment_id', 'department', 'status', 'score'
+    ).first()
+
+
+@receiver(post_save, sender=UserAssignment)
+def rollup_saved_assignment(sender, instance, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    record_assignment_changes(removed=[previous] if previous else [], added=[_rollup_row(instance)])
+
+
+def _origin_model(origin):
+    if isinstance(origin, Model):
+        return type(origin)
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return None
+
+
+@receiver(post_delete, sender=UserAssignment)
+def rollup_deleted_assignment(sender, instance, origin=None, **kwargs):
+    # 課題の削除では課題別ロールアップも一緒に削除されるため、差し引く必要はない
+    if _origin_model(origin) is Assignment:
+        return
+
+    # ユーザーの削除などでまとめて削除された行は、削除（1回のdelete()）ごとに集めて
+    # コミット後に1回で差し引く（1行ごとにロールアップを更新しない）
+    if origin is None:
+        record_assignment_changes(removed=[_rollup_row(instance)])
+        return
+    pending = origin.__dict__.get('_rollup_removed')
+    if pending is None:
+        pending = origin.__dict__['_rollup_removed'] = []
+        transaction.on_commit(
+            lambda: record_assignment_changes(removed=origin.__dict__.pop('_rollup_removed', []))
+        )
+    pending.append(_rollup_row(instance))
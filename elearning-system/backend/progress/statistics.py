@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import QuizSession, UserProgress
+from questions.models import Genre
+
+User = get_user_model()
+
+
+def session_duration(prefix=''):
+    """セッションの所要時間（end_time - start_time）をDB側で計算する式"""
+    return ExpressionWrapper(
+        F(f'{prefix}end_time') - F(f'{prefix}start_time'),
+        output_field=DurationField()
+    )
+
+
+def duration_minutes(duration):
+    """DBで集計した所要時間（timedelta）を分単位に変換"""
+    if duration is None:
+        return 0
+    return duration.total_seconds() / 60
+
+
+def study_statistics_summary(user):
+    """
+    学習統計の主要な数値を1回のクエリで取得する
+
+    完了済みセッションの件数・問題数・正解数・平均点・学習時間の合計と、
+    最も多く学習したジャンルのIDをユーザー行への集計としてまとめて計算する。
+    """
+    completed = Q(quiz_sessions__is_completed=True)
+    finished = completed & Q(quiz_sessions__end_time__isnull=False)
+
+    # お気に入りジャンル（最も多く学習したジャンル）
+    favorite_genre = QuizSession.objects.filter(
+        user=OuterRef('pk'),
+        is_completed=True
+    ).values('genre').annotate(
+        count=Count('id')
+    ).order_by('-count').values('genre')[:1]
+
+    return User.objects.filter(pk=user.pk).values('pk').annotate(
+        total_sessions=Count('quiz_sessions', filter=completed),
+        total_questions=Coalesce(Sum('quiz_sessions__total_questions', filter=completed), 0),
+        correct_answers=Coalesce(Sum('quiz_sessions__correct_answers', filter=completed), 0),
+        average_score=Avg('quiz_sessions__correct_answers', filter=completed),
+        total_study_time=Sum(session_duration('quiz_sessions__'), filter=finished),
+        favorite_genre_id=Subquery(favorite_genre),
+    ).get()
+
+
+def genre_session_summaries(user):
+    """
+    完了済みセッションをジャンル単位で1回のGROUP BYで集計する
+
+    ジャンルIDをキーに、セッション数・最高点・平均点・学習時間・最終受験日時を返す。
+    """
+    rows = QuizSession.objects.filter(
+        user=user,
+        is_completed=True,
+        genre__isnull=False
+    ).values('genre_id').annotate(
+        sessions_count=Count('id'),
+        best_score=Max('correct_answers'),
+        average_score=Avg('correct_answers'),
+        total_time=Sum(session_duration()),
+        last_attempt=Max('start_time'),
+    ).order_by()
+
+    return {row['genre_id']: row for row in rows}
+
+
+def user_progress_with_genres(user, *ordering):
+    """
+    ジャンルと問題数をまとめて読み込んだユーザー進捗の一覧を返す（1クエリ）
+
+    問題数はジャンルに設定しておき、GenreSerializerでジャンルごとにCOUNTさせない。
+    """
+    progress_rows = list(
+        UserProgress.objects.filter(user=user).select_related('genre').annotate(
+            genre_question_count=Count('genre__questions')
+        ).order_by(*ordering)
+    )
+    for progress in progress_rows:
+        progress.genre.question_count = progress.genre_question_count
+    return progress_rows
+
+
+def genre_with_question_count(genre_id):
+    """問題数を集計済みのジャンルを取得する"""
+    return Genre.objects.filter(id=genre_id).annotate(question_count=Count('questions')).first()
@@ -0,0 +1,207 @@
+import logging
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Assignment, AssignmentDistributionJob, OverdueSweep, UserAssignment
+from .rollups import record_assignment_changes
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# 1トランザクションで配信するユーザー数
+DISTRIBUTION_BATCH_SIZE = 1000
+
+# 期限切れの判定で1回のUPDATEで更新するユーザー課題数
+OVERDUE_CHUNK_SIZE = 1000
+
+# 期限切れにする状態（完了・期限切れ済みは対象外）
+OPEN_STATUSES = ['assigned', 'in_progress']
+
+
+def distribution_targets(roles=(), departments=(), user_ids=(), scope_department=''):
+    """
+    配信対象のユーザー（有効なユーザーのみ）
+
+    roles・departmentsは指定したものどうしをANDで組み合わせ、user_idsで指定したユーザーを加える。
+    scope_departmentを指定すると、すべての対象をその部署のユーザーに限定する。
+    """
+    condition = Q()
+    if roles or departments:
+        selector = Q()
+        if roles:
+            selector &= Q(role__in=roles)
+        if departments:
+            selector &= Q(department__in=departments)
+        condition |= selector
+    if user_ids:
+        condition |= Q(id__in=user_ids)
+    if not condition:
+        return User.objects.none()
+
+    queryset = User.objects.filter(condition, is_active=True)
+    if scope_department:
+        queryset = queryset.filter(department=scope_department)
+    return queryset
+
+
+def job_targets(job):
+    return distribution_targets(job.roles, job.departments, job.user_ids, job.scope_department)
+
+
+def distribute_batch(assignment, users):
+    """
+    1バッチ分のユーザー [(user_id, department)] に課題を配信し、新たに作成した数を返す
+
+    配信済みのユーザーは読み飛ばし、課題別ロールアップには作成した分だけを加算する。
+    同じ課題の配信が同時に動いても作成した分を正しく数えられるよう、課題の行をロックしてから確認する。
+    作成は (assignment, user) の一意制約で重複を防ぐ（ignore_conflicts）。
+    期限を過ぎた課題は期限切れの判定の対象にならないため、期限切れとして作成する。
+    """
+    list(Assignment.objects.select_for_update().filter(pk=assignment.pk).values_list('pk', flat=True))
+    existing = set(
+        UserAssignment.objects.filter(
+            assignment=assignment, user_id__in=[user_id for user_id, _ in users]
+        ).values_list('user_id', flat=True)
+    )
+    is_overdue = assignment.due_date is not None and assignment.due_date <= timezone.now()
+    user_assignments = [
+        UserAssignment(
+            assignment=assignment,
+            user_id=user_id,
+            department=department,
+            status='overdue' if is_overdue else 'assigned',
+        )
+        for user_id, department in users if user_id not in existing
+    ]
+    UserAssignment.objects.bulk_create(user_assignments, ignore_conflicts=True)
+    record_assignment_changes(added=[
+        (assignment.id, user_assignment.department, user_assignment.status, None)
+        for user_assignment in user_assignments
+    ])
+    return len(user_assignments)
+
+
+@shared_task(acks_late=True)
+def distribute_assignment(job_id, batch_size=DISTRIBUTION_BATCH_SIZE):
+    """
+    課題をbatch_size人ずつ配信する
+
+    対象ユーザーをIDのキーセットで読み、バッチごとに処理済みの最大IDを保存するため、
+    ワーカーが途中で止まっても再実行すれば続きから再開する。
+    失敗したジョブはrequeue_distributionで再投入する。
+    """
+    job = AssignmentDistributionJob.objects.get(id=job_id)
+    if job.status == 'completed':
+        return
+
+    job.status = 'running'
+    job.started_at = job.started_at or timezone.now()
+    job.error = ''
+    job.save(update_fields=['status', 'started_at', 'error'])
+
+    targets = job_targets(job).order_by('id')
+    try:
+        while True:
+            users = list(targets.filter(id__gt=job.last_user_id).values_list('id', 'department')[:batch_size])
+            if not users:
+                break
+            with transaction.atomic():
+                job.created += distribute_batch(job.assignment, users)
+                job.processed += len(users)
+                job.last_user_id = users[-1][0]
+                job.save(update_fields=['created', 'processed', 'last_user_id'])
+        # 配信中に対象が増減した場合も、完了時の進捗は100%にする
+        job.total = job.processed
+        job.status = 'completed'
+    except Exception as exc:
+        logger.exception('Assignment distribution job %s failed', job_id)
+        job.status = 'failed'
+        job.error = str(exc)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['total', 'status', 'error', 'finished_at'])
+
+
+def requeue_distribution(job_id, statuses=('failed',)):
+    """
+    配信ジョブを再投入し、再投入したかを返す
+
+    ジョブがstatusesのいずれかのときだけ待機中に戻し、コミット後に実行する。
+    保存済みのlast_user_idの続きから配信し、配信済みのユーザーは読み飛ばす。
+    """
+    requeued = AssignmentDistributionJob.objects.filter(pk=job_id, status__in=statuses).update(
+        status='pending', error='', finished_at=None
+    )
+    if requeued:
+        transaction.on_commit(lambda: distribute_assignment.delay(job_id))
+    return bool(requeued)
+
+
+def mark_overdue(assignment_ids, chunk_size=OVERDUE_CHUNK_SIZE):
+    """
+    課題の未完了のユーザー課題を期限切れにし、更新した数を返す
+
+    (assignment, status) のインデックスで対象のIDをchunk_size件ずつ読み、
+    IDを指定したUPDATEで更新する（1回のUPDATEで大量の行をロックしない）。
+    更新した行の変更前の状態は課題別ロールアップに反映する。
+
+    先に課題の行をロックし、配信中のバッチ（課題の行をロックしてから期限切れかを判定する）の
+    コミットを待ってから読み込む。期限前に始まったバッチが作成した行も更新の対象になる。
+    """
+    with transaction.atomic():
+        list(Assignment.objects.select_for_update().filter(id__in=assignment_ids).values_list('pk', flat=True))
+
+    updated = 0
+    last_id = 0
+    while True:
+        chunk = list(
+            UserAssignment.objects.filter(
+                assignment_id__in=assignment_ids, status__in=OPEN_STATUSES, id__gt=last_id
+            ).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return updated
+        with transaction.atomic():
+            # 読み込みと更新の間に完了したものは更新しない
+            rows = list(
+                UserAssignment.objects.select_for_update().filter(id__in=chunk, status__in=OPEN_STATUSES).values_list(
+                    'id', 'assignment_id', 'department', 'status', 'score'
+                )
+            )
+            updated += UserAssignment.objects.filter(id__in=[row[0] for row in rows]).update(status='overdue')
+            record_assignment_changes(
+                removed=[row[1:] for row in rows],
+                added=[(*row[1:3], 'overdue', row[4]) for row in rows],
+            )
+        last_id = chunk[-1]
+
+
+@shared_task
+def sweep_overdue_assignments(chunk_size=OVERDUE_CHUNK_SIZE):
+    """
+    期限を過ぎた課題の未完了のユーザー課題を期限切れにする（定期実行）
+
+    前回の実行で判定済みの時刻（OverdueSweep.swept_until）から現在までに
+    期限を過ぎた課題だけをdue_dateのインデックスの範囲検索で取り出す。
+    途中で失敗した場合は記録を残さないため、次回は同じ範囲をもう一度判定する。
+    """
+    started_at = timezone.now()
+    last_sweep = OverdueSweep.objects.order_by('-swept_until').first()
+    assignments = Assignment.objects.filter(due_date__lte=started_at)
+    if last_sweep:
+        assignments = assignments.filter(due_date__gt=last_sweep.swept_until)
+    assignment_ids = list(assignments.values_list('id', flat=True))
+
+    updated = mark_overdue(assignment_ids, chunk_size) if assignment_ids else 0
+    sweep = OverdueSweep.objects.create(
+        swept_until=started_at,
+        assignments=len(assignment_ids),
+        updated=updated,
+        started_at=started_at,
+    )
+    if updated:
+        logger.info('Marked %s user assignments overdue across %s assignments', updated, len(assignment_ids))
+    return sweep.id
@@ -0,0 +1,448 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from questions.models import Choice, Genre, Question
+from .models import (
+    Assignment, AssignmentDistributionJob, AssignmentRollup, AssignmentScoreCount, OverdueSweep, QuizSession, UserAssignment, UserAttempt, UserProgress
+)
+from .query_plans import capture_selects, endpoint_urls, explain
+from .rollups import ASSIGNMENT_STATUS_COUNTS, median_score, rebuild_assignment_rollups
+from .tasks import distribute_assignment, sweep_overdue_assignments
+
+User = get_user_model()
+
+
+class StudyStatisticsViewTests(TestCase):
+    """学習統計APIのクエリ数と集計値"""
+
+    # 基本統計・お気に入りジャンル・ジャンル別進捗・最近のセッション・その回答（一括読み込み）
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.genres = [Genre.objects.create(id=f'g{index:02d}', name=f'ジャンル{index}') for index in range(3)]
+        for index, genre in enumerate(cls.genres):
+            for number in range(index + 1):
+                question = Question.objects.create(
+                    id=f'Q{index}{number:03d}', genre=genre, difficulty=1, body=f'問題 {number}'
+                )
+                for order in range(2):
+                    Choice.objects.create(
+                        id=f'{question.id}-{order}', question=question, content=f'選択肢 {order}',
+                        is_correct=order == 0, order_index=order,
+                    )
+
+        cls.user = User.objects.create_user(username='learner', password='password')
+        cls.other = User.objects.create_user(username='other', password='password')
+        now = timezone.now()
+        # (ユーザー, ジャンル, 問題数, 正解数, 所要分, 完了済みか)
+        sessions = [
+            (cls.user, cls.genres[0], 10, 7, 12, True),
+            (cls.user, cls.genres[0], 10, 9, 8, True),
+            (cls.user, cls.genres[1], 5, 2, 5, True),
+            (cls.user, cls.genres[2], 10, 10, 30, False),
+            (cls.other, cls.genres[1], 20, 20, 60, True),
+        ]
+        for offset, (user, genre, total, correct, minutes, completed) in enumerate(sessions):
+            cls.create_session(user, genre, total, correct, now - timedelta(days=offset + 1), minutes, completed)
+        for user, genre in [(cls.user, cls.genres[0]), (cls.user, cls.genres[1]), (cls.other, cls.genres[1])]:
+            UserProgress.objects.create(user=user, genre=genre, total_attempts=10, correct_attempts=5, last_study_date=now)
+
+    @classmethod
+    def create_session(cls, user, genre, total, correct, start_time, minutes, completed=True):
+        """セッションと、そのジャンルの問題への回答を作成する"""
+        session = QuizSession.objects.create(
+            user=user,
+            session_type='genre',
+            genre=genre,
+            total_questions=total,
+            correct_answers=correct,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=minutes),
+            is_completed=completed,
+        )
+        for question in genre.questions.all():
+            UserAttempt.objects.create(
+                user=user,
+                session=session,
+                question=question,
+                selected_choice_id=f'{question.id}-0',
+                is_correct=True,
+                response_time_seconds=10,
+            )
+        return session
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_statistics_query_budget(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse('study_statistics'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_statistics_query_budget_does_not_grow_with_sessions(self):
+        for offset in range(10):
+            self.create_session(self.user, self.genres[2], 10, 5, timezone.now() - timedelta(hours=offset + 1), 10)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse('study_statistics'))
+        self.assertEqual(response.json()['total_sessions'], 13)
+
+    def test_statistics_match_direct_computation(self):
+        response = self.client.get(reverse('study_statistics'))
+        data = response.json()
+
+        completed = list(QuizSession.objects.filter(user=self.user, is_completed=True))
+        total_questions = sum(session.total_questions for session in completed)
+        correct_answers = sum(session.correct_answers for session in completed)
+        study_minutes = sum((session.end_time - session.start_time).total_seconds() for session in completed) / 60
+
+        self.assertEqual(data['total_sessions'], len(completed))
+        self.assertEqual(data['total_questions'], total_questions)
+        self.assertEqual(data['correct_answers'], correct_answers)
+        self.assertEqual(data['accuracy_rate'], round(correct_answers / total_questions * 100, 1))
+        self.assertEqual(data['average_score'], round(correct_answers / len(completed), 1))
+        self.assertEqual(data['total_study_time'], round(study_minutes))
+        self.assertEqual(data['favorite_genre']['id'], self.genres[0].id)
+        self.assertEqual(data['favorite_genre']['question_count'], 1)
+        self.assertEqual(len(data['recent_sessions']), len(completed))
+        self.assertEqual(len(data['genre_performance']), 2)
+
+    def test_statistics_without_sessions(self):
+        self.client.force_authenticate(User.objects.create_user(username='new', password='password'))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('study_statistics'))
+        self.assertEqual(response.json()['total_sessions'], 0)
+
+
+class AssignmentRollupTests(TestCase):
+    """ユーザー課題の変更で加算更新した課題別ロールアップが、再集計と一致すること"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(username='manager', password='password', role='manager')
+        cls.users = [
+            User.objects.create_user(username=f'user{index}', password='password', department=department)
+            for index, department in enumerate(['営業部', '営業部', '開発部', '開発部', ''])
+        ]
+        cls.assignments = [
+            Assignment.objects.create(title=f'課題{index}', created_by=cls.manager) for index in range(2)
+        ]
+        for assignment in cls.assignments:
+            for user in cls.users:
+                UserAssignment.objects.create(assignment=assignment, user=user)
+
+    def user_assignment(self, assignment_index, user_index):
+        return UserAssignment.objects.get(
+            assignment=self.assignments[assignment_index], user=self.users[user_index]
+        )
+
+    def complete(self, user_assignment, score):
+        user_assignment.status = 'completed'
+        user_assignment.score = score
+        user_assignment.save()
+
+    def snapshot(self):
+        count_fields = list(ASSIGNMENT_STATUS_COUNTS.values())
+        rollups = sorted(
+            row for row in AssignmentRollup.objects.values_list(
+                'assignment_id', 'department', *count_fields, 'scored_count', 'score_sum'
+            )
+            # 削除で0件になった行は再集計では作られない
+            if any(row[2:2 + len(count_fields)])
+        )
+        score_counts = sorted(
+            AssignmentScoreCount.objects.filter(count__gt=0).values_list('assignment_id', 'department', 'score', 'count')
+        )
+        return rollups, score_counts
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        self.assertTrue(incremental[0])
+        rebuild_assignment_rollups()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_initial_distribution(self):
+        rollup = AssignmentRollup.objects.get(assignment=self.assignments[0], department='営業部')
+        self.assertEqual(rollup.assigned_count, 2)
+        self.assertMatchesRebuild()
+
+    def test_status_and_score_updates(self):
+        started = self.user_assignment(0, 0)
+        started.status = 'in_progress'
+        started.save()
+        self.complete(self.user_assignment(0, 1), 80)
+        self.complete(self.user_assignment(0, 2), 60)
+        rescored = self.user_assignment(0, 2)
+        rescored.score = 90
+        rescored.save()
+        self.complete(self.user_assignment(1, 4), 70)
+
+        rollup = AssignmentRollup.objects.get(assignment=self.assignments[0], department='開発部')
+        self.assertEqual((rollup.completed_count, rollup.scored_count, rollup.score_sum), (1, 1, 90))
+        self.assertMatchesRebuild()
+
+    def test_single_delete(self):
+        self.complete(self.user_assignment(0, 0), 80)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_assignment(0, 0).delete()
+        self.assertMatchesRebuild()
+
+    def test_user_delete(self):
+        self.complete(self.user_assignment(0, 2), 50)
+        self.complete(self.user_assignment(1, 2), 100)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[2].delete()
+        self.assertMatchesRebuild()
+
+    def test_queryset_delete(self):
+        self.complete(self.user_assignment(0, 0), 40)
+        self.complete(self.user_assignment(0, 3), 40)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserAssignment.objects.filter(assignment=self.assignments[0], user__in=self.users[:4]).delete()
+        self.assertMatchesRebuild()
+
+    def test_assignment_delete(self):
+        self.complete(self.user_assignment(0, 1), 75)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assignments[0].delete()
+        # 課題の削除では課題別ロールアップも一緒に削除されるため、差し引かない
+        self.assertEqual(callbacks, [])
+        self.assertFalse(AssignmentRollup.objects.filter(assignment_id=self.assignments[0].id).exists())
+        self.assertMatchesRebuild()
+
+    def test_overdue_sweep(self):
+        self.complete(self.user_assignment(0, 0), 90)
+        started = self.user_assignment(0, 1)
+        started.status = 'in_progress'
+        started.save()
+        Assignment.objects.filter(pk=self.assignments[0].pk).update(due_date=timezone.now() - timedelta(hours=1))
+        sweep_overdue_assignments()
+
+        overdue = sum(AssignmentRollup.objects.filter(assignment=self.assignments[0]).values_list('overdue_count', flat=True))
+        self.assertEqual(overdue, 4)
+        self.assertMatchesRebuild()
+
+    def test_median_score(self):
+        self.assertIsNone(median_score({}))
+        self.assertEqual(median_score({70: 1, 80: 1, 90: 1}), 80)
+        self.assertEqual(median_score({60: 2, 90: 1}), 60)
+        self.assertEqual(median_score({70: 1, 80: 1, 90: 1, 100: 1}), 85)
+        self.assertEqual(median_score({50: 1, 70: 2, 90: 1}), 70)
+        self.assertEqual(median_score({40: 2, 100: 2}), 70)
+
+
+class OverdueSweepTests(TestCase):
+    """期限切れの判定は前回の判定以降に期限を過ぎた課題だけを対象にすること"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(username='manager', password='password', role='manager')
+        cls.users = [User.objects.create_user(username=f'user{index}', password='password') for index in range(3)]
+
+    def create_assignment(self, due_date, statuses=('assigned', 'in_progress', 'completed')):
+        assignment = Assignment.objects.create(title='課題', created_by=self.manager, due_date=due_date)
+        for user, status in zip(self.users, statuses):
+            UserAssignment.objects.create(assignment=assignment, user=user, status=status)
+        return assignment
+
+    def statuses(self, assignment):
+        return sorted(UserAssignment.objects.filter(assignment=assignment).values_list('status', flat=True))
+
+    def test_sweep_marks_open_assignments_and_skips_completed(self):
+        assignment = self.create_assignment(timezone.now() - timedelta(hours=1))
+        upcoming = self.create_assignment(timezone.now() + timedelta(days=1))
+
+        sweep = OverdueSweep.objects.get(id=sweep_overdue_assignments())
+        self.assertEqual((sweep.assignments, sweep.updated), (1, 2))
+        self.assertEqual(self.statuses(assignment), ['completed', 'overdue', 'overdue'])
+        self.assertEqual(self.statuses(upcoming), ['assigned', 'completed', 'in_progress'])
+
+    def test_rerun_selects_nothing(self):
+        self.create_assignment(timezone.now() - timedelta(hours=1))
+        sweep_overdue_assignments()
+
+        # 前回の判定・範囲検索・判定の記録だけで、ユーザー課題は読まない
+        with self.assertNumQueries(3):
+            sweep_id = sweep_overdue_assignments()
+        sweep = OverdueSweep.objects.get(id=sweep_id)
+        self.assertEqual((sweep.assignments, sweep.updated), (0, 0))
+
+    def test_newly_due_assignment_is_picked_up(self):
+        self.create_assignment(timezone.now() - timedelta(hours=1))
+        first = OverdueSweep.objects.get(id=sweep_overdue_assignments())
+        assignment = self.create_assignment(first.swept_until + timedelta(microseconds=1))
+
+        sweep = OverdueSweep.objects.get(id=sweep_overdue_assignments())
+        self.assertEqual((sweep.assignments, sweep.updated), (1, 2))
+        self.assertGreater(sweep.swept_until, first.swept_until)
+        self.assertEqual(self.statuses(assignment), ['completed', 'overdue', 'overdue'])
+
+
+class AssignmentDistributionResumeTests(TestCase):
+    """失敗した配信ジョブは保存済みのlast_user_idの続きから再開し、配信済みのユーザーを読み飛ばすこと"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(
+            username='manager', password='password', role='manager', department='営業部'
+        )
+        cls.users = [
+            User.objects.create_user(username=f'user{index}', password='password', department='営業部')
+            for index in range(6)
+        ]
+        cls.assignment = Assignment.objects.create(title='課題', created_by=cls.manager)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        # ワーカーを使わずにその場で実行する
+        patcher = mock.patch.object(distribute_assignment, 'delay', side_effect=distribute_assignment)
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_job(self, distributed, status='failed'):
+        """先頭からdistributed人まで配信済みで止まったジョブ"""
+        for user in self.users[:distributed]:
+            UserAssignment.objects.create(assignment=self.assignment, user=user)
+        return AssignmentDistributionJob.objects.create(
+            assignment=self.assignment,
+            roles=['student'],
+            scope_department='営業部',
+            status=status,
+            total=len(self.users),
+            processed=distributed,
+            created=distributed,
+            last_user_id=self.users[distributed - 1].id if distributed else 0,
+            error='worker lost' if status == 'failed' else '',
+            created_by=self.manager,
+        )
+
+    def resume(self, job):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('assignment_distribution_job', args=[job.id]))
+
+    def test_resume_from_saved_last_user_id(self):
+        job = self.create_job(3)
+        response = self.resume(job)
+
+        self.assertEqual(response.status_code, 202)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('completed', ''))
+        # 最初から配信し直した場合は processed が 9 になる
+        self.assertEqual((job.created, job.processed, job.total), (6, 6, 6))
+        self.assertEqual(UserAssignment.objects.filter(assignment=self.assignment).count(), 6)
+
+    def test_rerun_skips_existing_pairs(self):
+        job = self.create_job(6)
+        AssignmentDistributionJob.objects.filter(pk=job.pk).update(processed=0, created=0, last_user_id=0)
+        self.resume(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created, job.processed), ('completed', 0, 6))
+        rollup = AssignmentRollup.objects.get(assignment=self.assignment, department='営業部')
+        self.assertEqual(rollup.assigned_count, 6)
+
+    def test_resume_rejects_jobs_that_have_not_failed(self):
+        job = self.create_job(3, status='running')
+        response = self.resume(job)
+
+        self.assertEqual(response.status_code, 409)
+        self.delay.assert_not_called()
+
+    def test_command_resumes_failed_jobs(self):
+        failed = self.create_job(2)
+        running = AssignmentDistributionJob.objects.create(
+            assignment=self.assignment, roles=['student'], status='running', created_by=self.manager
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('resume_assignment_distributions', stdout=StringIO())
+
+        failed.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((failed.status, failed.created, failed.processed), ('completed', 6, 6))
+        self.assertEqual(running.status, 'running')
+
+
+class QueryPlanTests(TestCase):
+    """学習者向けのエンドポイントが複合インデックスを使い、大きなテーブルを全件走査・並び替えしないこと"""
+
+    # ユーザー数・回答数に比例して増えるテーブル
+    LARGE_TABLES = {
+        'progress_userattempt', 'progress_quizsession', 'progress_userprogress',
+        'progress_dailystudyrollup', 'progress_userassignment',
+    }
+
+    # (テーブル, インデックス名, 列)
+    INDEXES = [
+        ('progress_quizsession', 'progress_session_user_done', ['user_id', 'is_completed', 'start_time']),
+        ('progress_quizsession', 'progress_session_user_start', ['user_id', 'start_time']),
+        ('progress_userattempt', 'progress_attempt_user_correct', ['user_id', 'is_correct', 'question_id', 'attempt_time']),
+        ('progress_userprogress', 'progress_progress_user_date', ['user_id', 'last_study_date']),
+        ('progress_userassignment', 'progress_uassign_user_date', ['user_id', 'assigned_at']),
+        ('questions_question', 'questions_active_genre_diff', ['is_active', 'genre_id', 'difficulty']),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(id='g01', name='ジャンル')
+        cls.user = User.objects.create_user(username='learner', password='password')
+        manager = User.objects.create_user(username='manager', password='password', role='manager')
+        now = timezone.now()
+        for number in range(3):
+            question = Question.objects.create(id=f'Q{number:05d}', genre=genre, difficulty=1, body=f'問題 {number}')
+            for order in range(2):
+                Choice.objects.create(
+                    id=f'{question.id}-{order}', question=question, content=f'選択肢 {order}',
+                    is_correct=order == 0, order_index=order,
+                )
+        for offset in range(3):
+            session = QuizSession.objects.create(
+                user=cls.user, session_type='genre', genre=genre, total_questions=3, correct_answers=offset,
+                start_time=now - timedelta(days=offset), end_time=now - timedelta(days=offset) + timedelta(minutes=5),
+                is_completed=True,
+            )
+            for number in range(3):
+                UserAttempt.objects.create(
+                    user=cls.user, session=session, question_id=f'Q{number:05d}',
+                    selected_choice_id=f'Q{number:05d}-{int(number < offset)}', is_correct=number < offset,
+                    response_time_seconds=10,
+                )
+        UserProgress.objects.create(user=cls.user, genre=genre, total_attempts=9, correct_attempts=3, last_study_date=now)
+        UserAssignment.objects.create(
+            assignment=Assignment.objects.create(title='課題', created_by=manager), user=cls.user
+        )
+
+    def test_composite_indexes_exist(self):
+        with connection.cursor() as cursor:
+            for table, name, columns in self.INDEXES:
+                constraints = connection.introspection.get_constraints(cursor, table)
+                self.assertIn(name, constraints, table)
+                self.assertEqual(constraints[name]['columns'], columns, name)
+
+    @skipUnless(
+        connection.vendor == 'sqlite',
+        'MySQL/PostgreSQL choose plans from table statistics, so the small test dataset is scanned; '
+        'run check_query_plans on a generated dataset instead'
+    )
+    def test_endpoint_plans_use_indexes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        violations = []
+        for url in endpoint_urls(self.user):
+            statements, response = capture_selects(client, url)
+            self.assertLess(response.status_code, 400, url)
+            for sql, params in statements:
+                _, problems = explain(sql, params, self.LARGE_TABLES.__contains__)
+                violations += [f'{url}: {problem}: {sql[:200]}' for problem in problems]
+        self.assertEqual(violations, [])
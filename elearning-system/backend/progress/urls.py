@@ -3,7 +3,9 @@ from .views import (
     QuizSessionListCreateView, QuizSessionDetailView, UserProgressListView,
     StudyStatisticsView, GenrePerformanceView, WeeklyProgressView,
     DailyActivityView, UserAttemptListView, AssignmentListView,
-    UserAssignmentListView, IncorrectQuestionsView
+    UserAssignmentListView, IncorrectQuestionsView, DepartmentActivityExportView,
+    DepartmentGenreMatrixView, AssignmentDistributeView, AssignmentDistributionJobView,
+    AssignmentSummaryListView, AssignmentSummaryView
 )
 
 urlpatterns = [
@@ -16,6 +18,12 @@ urlpatterns = [
     path('daily-activity/', DailyActivityView.as_view(), name='daily_activity'),
     path('attempts/', UserAttemptListView.as_view(), name='user_attempts'),
     path('assignments/', AssignmentListView.as_view(), name='assignments'),
+    path('assignments/summary/', AssignmentSummaryListView.as_view(), name='assignment_summaries'),
+    path('assignments/<int:pk>/summary/', AssignmentSummaryView.as_view(), name='assignment_summary'),
+    path('assignments/<int:pk>/distribute/', AssignmentDistributeView.as_view(), name='assignment_distribute'),
+    path('assignment-distributions/<int:pk>/', AssignmentDistributionJobView.as_view(), name='assignment_distribution_job'),
     path('user-assignments/', UserAssignmentListView.as_view(), name='user_assignments'),
     path('incorrect-questions/', IncorrectQuestionsView.as_view(), name='incorrect_questions'),
+    path('department-matrix/', DepartmentGenreMatrixView.as_view(), name='department_matrix'),
+    path('department-export/', DepartmentActivityExportView.as_view(), name='department_export'),
 ]
\ No newline at end of file
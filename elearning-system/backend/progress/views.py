@@ -2,17 +2,37 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Avg, Sum, Q, Max
+from rest_framework.exceptions import ValidationError, PermissionDenied
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Sum, Q, OuterRef, Subquery
 from django.utils import timezone
-from datetime import timedelta, datetime
-from .models import UserAttempt, QuizSession, UserProgress, Assignment, UserAssignment
+from datetime import timedelta, datetime, date
+import random
+from .models import (
+    UserAttempt, QuizSession, UserProgress, Assignment, UserAssignment, DailyStudyRollup,
+    AssignmentDistributionJob
+)
 from .serializers import (
     UserAttemptSerializer, QuizSessionSerializer, QuizSessionCreateSerializer,
     UserProgressSerializer, StudyStatisticsSerializer, GenrePerformanceSerializer,
     WeeklyProgressSerializer, DailyActivitySerializer, AssignmentSerializer,
-    UserAssignmentSerializer
+    UserAssignmentSerializer, AssignmentDistributionJobSerializer
+)
+from .statistics import (
+    study_statistics_summary, genre_session_summaries, user_progress_with_genres,
+    genre_with_question_count, duration_minutes
 )
-from questions.models import Genre, Question
+from .rollups import daily_rollups, assignment_summaries
+from .pagination import KeysetPagination
+from .permissions import IsManager, get_managed_department
+from .exports import ACTIVITY_EXPORTS, export_columns, iter_activity_chunks, gzip_csv_stream
+from .analytics import get_department_genre_matrix
+from .tasks import distribute_assignment, distribution_targets, requeue_distribution
+from questions.models import Question
+
+User = get_user_model()
 
 
 class QuizSessionListCreateView(generics.ListCreateAPIView):
@@ -27,7 +47,10 @@ class QuizSessionListCreateView(generics.ListCreateAPIView):
         return QuizSessionSerializer
     
     def get_queryset(self):
-        return QuizSession.objects.filter(user=self.request.user).order_by('-start_time')
+        queryset = QuizSession.objects.filter(user=self.request.user).order_by('-start_time')
+        if self.request.method == 'GET':
+            queryset = QuizSessionSerializer.setup_eager_loading(queryset)
+        return queryset
 
 
 class QuizSessionDetailView(generics.RetrieveAPIView):
@@ -38,7 +61,9 @@ class QuizSessionDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return QuizSession.objects.filter(user=self.request.user)
+        return QuizSessionSerializer.setup_eager_loading(
+            QuizSession.objects.filter(user=self.request.user)
+        )
 
 
 class UserProgressListView(generics.ListAPIView):
@@ -61,9 +86,9 @@ class StudyStatisticsView(APIView):
     def get(self, request):
         user = request.user
         
-        # 基本統計
-        sessions = QuizSession.objects.filter(user=user, is_completed=True)
-        total_sessions = sessions.count()
+        # 基本統計（1回のクエリで集計）
+        summary = study_statistics_summary(user)
+        total_sessions = summary['total_sessions']
         
         if total_sessions == 0:
             return Response({
@@ -78,36 +103,26 @@ class StudyStatisticsView(APIView):
                 'genre_performance': []
             })
         
-        total_questions = sessions.aggregate(Sum('total_questions'))['total_questions__sum'] or 0
-        correct_answers = sessions.aggregate(Sum('correct_answers'))['correct_answers__sum'] or 0
+        total_questions = summary['total_questions']
+        correct_answers = summary['correct_answers']
         accuracy_rate = round((correct_answers / total_questions) * 100, 1) if total_questions > 0 else 0
-        average_score = sessions.aggregate(Avg('correct_answers'))['correct_answers__avg'] or 0
+        average_score = summary['average_score'] or 0
         
         # 学習時間計算（分単位）
-        completed_sessions = sessions.filter(end_time__isnull=False)
-        total_study_time = 0
-        for session in completed_sessions:
-            if session.end_time and session.start_time:
-                duration = session.end_time - session.start_time
-                total_study_time += duration.total_seconds() / 60
+        total_study_time = duration_minutes(summary['total_study_time'])
         
         # お気に入りジャンル（最も多く学習したジャンル）
-        favorite_genre_data = sessions.values('genre__id', 'genre__name').annotate(
-            count=Count('id')
-        ).order_by('-count').first()
-        
         favorite_genre = None
-        if favorite_genre_data and favorite_genre_data['genre__id']:
-            try:
-                favorite_genre = Genre.objects.get(id=favorite_genre_data['genre__id'])
-            except Genre.DoesNotExist:
-                pass
+        if summary['favorite_genre_id']:
+            favorite_genre = genre_with_question_count(summary['favorite_genre_id'])
         
         # 最近のセッション（5件）
-        recent_sessions = sessions.order_by('-start_time')[:5]
+        recent_sessions = QuizSessionSerializer.setup_eager_loading(
+            QuizSession.objects.filter(user=user, is_completed=True)
+        ).order_by('-start_time')[:5]
         
         # ジャンル別パフォーマンス
-        genre_performance = UserProgress.objects.filter(user=user).order_by('-last_study_date')
+        genre_performance = user_progress_with_genres(user, '-last_study_date')
         
         data = {
             'total_sessions': total_sessions,
@@ -134,39 +149,24 @@ class GenrePerformanceView(APIView):
     def get(self, request):
         user = request.user
         
-        # ジャンル別の統計を計算
+        # ジャンル別の統計を1回のGROUP BYで計算し、進捗とメモリ上で結合
+        summaries = genre_session_summaries(user)
         performance_data = []
         
-        for progress in UserProgress.objects.filter(user=user):
-            sessions = QuizSession.objects.filter(
-                user=user, 
-                genre=progress.genre, 
-                is_completed=True
-            )
+        for progress in user_progress_with_genres(user):
+            summary = summaries.get(progress.genre_id)
             
-            if sessions.exists():
-                best_score = sessions.aggregate(Max('correct_answers'))['correct_answers__max'] or 0
-                avg_score = sessions.aggregate(Avg('correct_answers'))['correct_answers__avg'] or 0
-                
-                # 学習時間計算
-                total_time = 0
-                for session in sessions.filter(end_time__isnull=False):
-                    if session.end_time and session.start_time:
-                        duration = session.end_time - session.start_time
-                        total_time += duration.total_seconds() / 60
-                
-                last_attempt = sessions.order_by('-start_time').first().start_time
-                
+            if summary:
                 performance_data.append({
                     'genre': progress.genre,
-                    'sessions_count': sessions.count(),
+                    'sessions_count': summary['sessions_count'],
                     'questions_count': progress.total_attempts,
                     'correct_answers': progress.correct_attempts,
                     'accuracy_rate': progress.accuracy_rate,
-                    'average_score': round(avg_score, 1),
-                    'best_score': best_score,
-                    'total_time': round(total_time),
-                    'last_attempt': last_attempt
+                    'average_score': round(summary['average_score'] or 0, 1),
+                    'best_score': summary['best_score'] or 0,
+                    'total_time': round(duration_minutes(summary['total_time'])),
+                    'last_attempt': summary['last_attempt']
                 })
         
         serializer = GenrePerformanceSerializer(performance_data, many=True)
@@ -186,29 +186,24 @@ class WeeklyProgressView(APIView):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(weeks=8)
         
+        # 日別ロールアップを1回の範囲クエリで取得して週ごとに集計
+        rollups = daily_rollups(user, start_date, end_date)
+        
         weekly_data = []
         current_date = start_date
         
         while current_date <= end_date:
             week_end = current_date + timedelta(days=6)
+            week_rollups = [
+                rollup for date, rollup in rollups.items()
+                if current_date <= date <= week_end
+            ]
             
-            sessions = QuizSession.objects.filter(
-                user=user,
-                is_completed=True,
-                start_time__date__range=[current_date, week_end]
-            )
-            
-            sessions_count = sessions.count()
-            questions_count = sessions.aggregate(Sum('total_questions'))['total_questions__sum'] or 0
-            correct_answers = sessions.aggregate(Sum('correct_answers'))['correct_answers__sum'] or 0
+            sessions_count = sum(rollup.sessions_count for rollup in week_rollups)
+            questions_count = sum(rollup.questions_count for rollup in week_rollups)
+            correct_answers = sum(rollup.correct_answers for rollup in week_rollups)
             accuracy_rate = round((correct_answers / questions_count) * 100, 1) if questions_count > 0 else 0
-            
-            # 学習時間計算
-            total_time = 0
-            for session in sessions.filter(end_time__isnull=False):
-                if session.end_time and session.start_time:
-                    duration = session.end_time - session.start_time
-                    total_time += duration.total_seconds() / 60
+            total_time = sum(rollup.study_seconds for rollup in week_rollups) / 60
             
             weekly_data.append({
                 'week_start': current_date,
@@ -238,31 +233,20 @@ class DailyActivityView(APIView):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=30)
         
+        # 日別ロールアップを1回の範囲クエリで取得
+        rollups = daily_rollups(user, start_date, end_date)
+        
         daily_data = []
         current_date = start_date
         
         while current_date <= end_date:
-            sessions = QuizSession.objects.filter(
-                user=user,
-                is_completed=True,
-                start_time__date=current_date
-            )
-            
-            sessions_count = sessions.count()
-            questions_count = sessions.aggregate(Sum('total_questions'))['total_questions__sum'] or 0
-            
-            # 学習時間計算
-            study_time = 0
-            for session in sessions.filter(end_time__isnull=False):
-                if session.end_time and session.start_time:
-                    duration = session.end_time - session.start_time
-                    study_time += duration.total_seconds() / 60
+            rollup = rollups.get(current_date)
             
             daily_data.append({
                 'date': current_date,
-                'sessions_count': sessions_count,
-                'questions_count': questions_count,
-                'study_time': round(study_time)
+                'sessions_count': rollup.sessions_count if rollup else 0,
+                'questions_count': rollup.questions_count if rollup else 0,
+                'study_time': round(rollup.study_seconds / 60) if rollup else 0
             })
             
             current_date += timedelta(days=1)
@@ -274,12 +258,17 @@ class DailyActivityView(APIView):
 class UserAttemptListView(generics.ListAPIView):
     """
     ユーザー回答履歴一覧取得API
+    (attempt_time, id) のカーソルでページングする
+    - total=estimate: 概算の件数（estimated_count）を含める
     """
     serializer_class = UserAttemptSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        queryset = UserAttempt.objects.filter(user=self.request.user).order_by('-attempt_time')
+        queryset = UserAttemptSerializer.setup_eager_loading(
+            UserAttempt.objects.filter(user=self.request.user)
+        )
         
         # フィルタリング
         genre = self.request.query_params.get('genre')
@@ -291,6 +280,27 @@ class UserAttemptListView(generics.ListAPIView):
             queryset = queryset.filter(is_correct=is_correct.lower() == 'true')
         
         return queryset
+    
+    def get_estimated_count(self):
+        """回答件数の概算（日別ロールアップ・ジャンル別進捗から求め、COUNT(*)を避ける）"""
+        user = self.request.user
+        genre = self.request.query_params.get('genre')
+        is_correct = self.request.query_params.get('is_correct')
+        
+        if genre:
+            totals = UserProgress.objects.filter(user=user, genre_id=genre).aggregate(
+                total=Sum('total_attempts'), correct=Sum('correct_attempts')
+            )
+        else:
+            totals = DailyStudyRollup.objects.filter(user=user).aggregate(
+                total=Sum('questions_count'), correct=Sum('correct_answers')
+            )
+        
+        total = totals['total'] or 0
+        correct = totals['correct'] or 0
+        if is_correct is None:
+            return total
+        return correct if is_correct.lower() == 'true' else total - correct
 
 
 class AssignmentListView(generics.ListAPIView):
@@ -302,6 +312,55 @@ class AssignmentListView(generics.ListAPIView):
     queryset = Assignment.objects.filter(is_active=True).order_by('-created_at')
 
 
+def _assignment_summary(assignment, summary):
+    return {
+        'assignment': assignment.id,
+        'title': assignment.title,
+        'due_date': assignment.due_date,
+        **summary,
+    }
+
+
+class AssignmentSummaryListView(generics.ListAPIView):
+    """
+    課題の進捗集計一覧API（成績管理者用）
+    有効な課題ごとに状態別の件数・完了率・平均点・得点の中央値を全体と部署別で返す
+    - department: 対象部署（管理者のみ指定可。省略時は全部署）
+    """
+    permission_classes = [IsManager]
+    queryset = Assignment.objects.filter(is_active=True).order_by('-created_at')
+    
+    def list(self, request, *args, **kwargs):
+        department = get_managed_department(request)
+        page = self.paginate_queryset(self.get_queryset())
+        # ページ内の課題の集計は加算更新しているロールアップから2クエリで読む
+        summaries = assignment_summaries([assignment.id for assignment in page], department)
+        return self.get_paginated_response([
+            _assignment_summary(assignment, summaries[assignment.id]) for assignment in page
+        ])
+
+
+class AssignmentSummaryView(APIView):
+    """
+    課題の進捗集計API（成績管理者用）
+    状態別の件数・完了率・平均点・得点の中央値を全体と部署別で返す
+    - department: 対象部署（管理者のみ指定可。省略時は全部署）
+    """
+    permission_classes = [IsManager]
+    
+    def get(self, request, pk):
+        try:
+            assignment = Assignment.objects.get(pk=pk)
+        except Assignment.DoesNotExist:
+            return Response(
+                {'error': '課題が見つかりません'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        department = get_managed_department(request)
+        summary = assignment_summaries([assignment.id], department)[assignment.id]
+        return Response(_assignment_summary(assignment, summary))
+
+
 class UserAssignmentListView(generics.ListAPIView):
     """
     ユーザー課題一覧取得API
@@ -313,6 +372,108 @@ class UserAssignmentListView(generics.ListAPIView):
         return UserAssignment.objects.filter(user=self.request.user).order_by('-assigned_at')
 
 
+def _string_list(data, name):
+    """リクエストの文字列のリストを取り出す（重複は除く）"""
+    values = data.get(name) or []
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValidationError({'error': f'{name}は文字列のリストで指定してください'})
+    return list(dict.fromkeys(values))
+
+
+class AssignmentDistributeView(APIView):
+    """
+    課題一括配信API（成績管理者用）
+    対象ユーザーへの配信をバックグラウンドのジョブとして一定人数ずつ実行し、ジョブの状態を返す
+    - roles: 対象のロール
+    - departments: 対象の部署（rolesと組み合わせた場合は両方に一致するユーザー）
+    - user_ids: 個別に指定するユーザーID
+    成績管理者は自部署のユーザーにのみ配信できる。
+    """
+    permission_classes = [IsManager]
+    
+    def post(self, request, pk):
+        try:
+            assignment = Assignment.objects.get(pk=pk, is_active=True)
+        except Assignment.DoesNotExist:
+            return Response(
+                {'error': '課題が見つかりません'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        roles = _string_list(request.data, 'roles')
+        departments = _string_list(request.data, 'departments')
+        user_ids = request.data.get('user_ids') or []
+        if not isinstance(user_ids, list) or not all(
+            isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids
+        ):
+            return Response(
+                {'error': 'user_idsは整数のリストで指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (roles or departments or user_ids):
+            return Response(
+                {'error': 'roles、departments、user_idsのいずれかを指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if set(roles) - set(dict(User.ROLE_CHOICES)):
+            return Response(
+                {'error': '無効なロールです'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        scope_department = ''
+        if not request.user.is_staff:
+            if not request.user.department:
+                raise PermissionDenied('部署が設定されていません')
+            if set(departments) - {request.user.department}:
+                raise PermissionDenied('他の部署には配信できません')
+            scope_department = request.user.department
+        
+        user_ids = list(dict.fromkeys(user_ids))
+        job = AssignmentDistributionJob.objects.create(
+            assignment=assignment,
+            roles=roles,
+            departments=departments,
+            user_ids=user_ids,
+            scope_department=scope_department,
+            total=distribution_targets(roles, departments, user_ids, scope_department).count(),
+            created_by=request.user,
+        )
+        transaction.on_commit(lambda: distribute_assignment.delay(job.id))
+        
+        # ワーカーを使わない設定（CELERY_TASK_ALWAYS_EAGER）ではここで完了している
+        job.refresh_from_db()
+        return Response(AssignmentDistributionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AssignmentDistributionJobView(generics.RetrieveAPIView):
+    """
+    課題一括配信ジョブの進捗取得・再開API（成績管理者用）
+    POSTで失敗したジョブを処理済みのユーザーの続きから再開する
+    """
+    serializer_class = AssignmentDistributionJobSerializer
+    permission_classes = [IsManager]
+    
+    def get_queryset(self):
+        queryset = AssignmentDistributionJob.objects.select_related('assignment')
+        # 成績管理者は自分が作成したジョブのみ参照できる
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+    
+    def post(self, request, pk):
+        job = self.get_object()
+        if not requeue_distribution(job.id):
+            return Response(
+                {'error': '失敗したジョブのみ再開できます'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        # ワーカーを使わない設定（CELERY_TASK_ALWAYS_EAGER）ではここで完了している
+        job.refresh_from_db()
+        return Response(AssignmentDistributionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
 class IncorrectQuestionsView(APIView):
     """
     間違った問題のみ取得API
@@ -324,40 +485,100 @@ class IncorrectQuestionsView(APIView):
         limit = int(request.query_params.get('limit', 10))
         genre = request.query_params.get('genre')
         
-        # 間違った問題を取得（最新の回答を基準）
-        incorrect_attempts = UserAttempt.objects.filter(
+        # 問題ごとの最新の回答（(user, question, attempt_time)の複合インデックスで1件だけ読む）
+        latest_attempt = UserAttempt.objects.filter(
             user=user,
-            is_correct=False
-        ).values('question_id').annotate(
-            latest_attempt=Max('attempt_time')
-        ).values('question_id', 'latest_attempt')
-        
-        # 最新の回答が間違いの問題IDを取得
-        incorrect_question_ids = []
-        for attempt in incorrect_attempts:
-            latest_attempt = UserAttempt.objects.filter(
-                user=user,
-                question_id=attempt['question_id'],
-                attempt_time=attempt['latest_attempt']
-            ).first()
-            if latest_attempt and not latest_attempt.is_correct:
-                incorrect_question_ids.append(attempt['question_id'])
-        
-        # 問題を取得
+            question=OuterRef('pk')
+        ).order_by('-attempt_time', '-id').values('is_correct')[:1]
+        
+        # 最新の回答が不正解のままの問題IDを1回のクエリで取得
         questions_queryset = Question.objects.filter(
-            id__in=incorrect_question_ids,
-            is_active=True
-        )
+            is_active=True,
+            id__in=UserAttempt.objects.filter(user=user, is_correct=False).values('question_id')
+        ).annotate(
+            latest_is_correct=Subquery(latest_attempt)
+        ).filter(latest_is_correct=False)
         
         # ジャンルフィルター
         if genre:
             questions_queryset = questions_queryset.filter(genre_id=genre)
         
-        # ランダムに並び替えて制限
-        questions = questions_queryset.order_by('?')[:limit]
+        incorrect_question_ids = list(questions_queryset.order_by().values_list('id', flat=True))
+        
+        # テーブル全体を並び替えずにIDからランダムに抽出
+        selected_ids = random.sample(incorrect_question_ids, min(max(limit, 0), len(incorrect_question_ids)))
+        questions = Question.objects.filter(id__in=selected_ids).select_related(
+            'genre', 'author_user'
+        ).prefetch_related('choices')
+        questions = sorted(questions, key=lambda question: selected_ids.index(question.id))
         
         # QuestionSerializerを使用してシリアライズ
         from questions.serializers import QuestionSerializer
         serializer = QuestionSerializer(questions, many=True)
         
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+def parse_date_range(request):
+    """start_date / end_date（YYYY-MM-DD）を解釈する"""
+    dates = []
+    for name in ('start_date', 'end_date'):
+        value = request.query_params.get(name)
+        try:
+            dates.append(date.fromisoformat(value) if value else None)
+        except ValueError:
+            raise ValidationError({'error': f'{name}はYYYY-MM-DD形式で指定してください'})
+    if dates[0] and dates[1] and dates[0] > dates[1]:
+        raise ValidationError({'error': 'start_dateにはend_date以前の日付を指定してください'})
+    return dates
+
+
+class DepartmentActivityExportView(APIView):
+    """
+    部署の学習データエクスポートAPI（成績管理者用）
+    自部署の回答またはセッションを部署・ジャンル付きのgzip圧縮CSVでストリーミング出力する
+    - kind: attempts（デフォルト）または sessions
+    - start_date, end_date: 期間（YYYY-MM-DD）
+    - department: 対象部署（管理者のみ指定可）
+    """
+    permission_classes = [IsManager]
+    
+    def get(self, request):
+        kind = request.query_params.get('kind', 'attempts')
+        if kind not in ACTIVITY_EXPORTS:
+            return Response(
+                {'error': 'kindはattemptsまたはsessionsを指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        department = get_managed_department(request)
+        start_date, end_date = parse_date_range(request)
+        
+        chunks = iter_activity_chunks(kind, department, start_date, end_date)
+        response = StreamingHttpResponse(
+            gzip_csv_stream(export_columns(kind), chunks),
+            content_type='application/gzip'
+        )
+        filename = f'{kind}-{timezone.localtime():%Y%m%d%H%M%S}.csv.gz'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class DepartmentGenreMatrixView(APIView):
+    """
+    部署×ジャンルの成績集計API（成績管理者用）
+    回答数・正答率・平均回答時間・学習者数を部署×ジャンルの行列で返す
+    - start_date, end_date: 期間（YYYY-MM-DD）
+    - department: 対象部署（管理者のみ指定可。省略時は全部署）
+    """
+    permission_classes = [IsManager]
+    
+    def get(self, request):
+        department = get_managed_department(request)
+        start_date, end_date = parse_date_range(request)
+        
+        matrix = get_department_genre_matrix(department, start_date, end_date)
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            **matrix,
+        })
@@ -0,0 +1,146 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Genre, Question
+from .cache import question_bank_version
+
+User = get_user_model()
+
+# カウンターの有効期限（秒）。シグナルを経由しない更新があっても、この時間で作り直される
+ADMIN_STATS_TIMEOUT = 60 * 60
+
+# 日別登録者数を返す最大日数
+MAX_SIGNUP_DAYS = 365
+
+USER_COUNTERS = ['total_users', 'active_users']
+QUESTION_COUNTERS = ['total_questions', 'active_questions']
+GENRE_COUNTERS = ['total_genres']
+
+
+def counter_key(name):
+    """
+    カウンターのキャッシュキー
+
+    問題・ジャンルの件数は問題バンクのバージョンごとに持つため、一括更新などで
+    問題バンクが無効化されると自動的に数え直される。
+    """
+    if name in USER_COUNTERS:
+        return f'admin_stats:{name}'
+    return f'admin_stats:{name}:{question_bank_version()}'
+
+
+def signup_key(day):
+    return f'admin_stats:signups:{day.isoformat()}'
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+# カウンターの更新は保存したトランザクションのコミット後に行う。
+# ロールバックされた登録・削除でカウンターがずれたままにならないようにするため。
+
+def increment(name, delta=1):
+    """カウンターを増減する（キャッシュにない場合は次回の取得時に数え直す）"""
+    transaction.on_commit(lambda: _incr(counter_key(name), delta))
+
+
+def increment_signups(day, delta=1):
+    transaction.on_commit(lambda: _incr(signup_key(day), delta))
+
+
+def invalidate(*names):
+    transaction.on_commit(lambda: cache.delete_many([counter_key(name) for name in names]))
+
+
+def invalidate_user_stats():
+    """シグナルを経由しないユーザーの一括登録・更新の後に呼び出す"""
+    def delete():
+        cache.delete_many([counter_key(name) for name in USER_COUNTERS])
+        today = timezone.localdate()
+        cache.delete_many([signup_key(today - timedelta(days=offset)) for offset in range(MAX_SIGNUP_DAYS)])
+
+    transaction.on_commit(delete)
+
+
+def _count_users():
+    return User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+    )
+
+
+def _count_questions():
+    return Question.objects.aggregate(
+        total_questions=Count('id'),
+        active_questions=Count('id', filter=Q(is_active=True)),
+    )
+
+
+def _count_genres():
+    return Genre.objects.aggregate(total_genres=Count('id'))
+
+
+COUNTER_GROUPS = [
+    (USER_COUNTERS, _count_users),
+    (QUESTION_COUNTERS, _count_questions),
+    (GENRE_COUNTERS, _count_genres),
+]
+
+
+def daily_signups(days):
+    """
+    直近days日（今日を含む）の日別登録者数
+
+    日ごとの件数をキャッシュに持ち、欠けている日があれば期間全体を1回のGROUP BYで数え直す。
+    """
+    today = timezone.localdate()
+    dates = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    keys = [signup_key(day) for day in dates]
+    cached = cache.get_many(keys)
+
+    if len(cached) < len(keys):
+        counts = dict(
+            User.objects.filter(
+                date_joined__date__gte=dates[0]
+            ).annotate(
+                day=TruncDate('date_joined')
+            ).values('day').annotate(count=Count('id')).values_list('day', 'count').order_by()
+        )
+        cached = {signup_key(day): counts.get(day, 0) for day in dates}
+        cache.set_many(cached, ADMIN_STATS_TIMEOUT)
+
+    return [{'date': day, 'count': cached[signup_key(day)]} for day in dates]
+
+
+def get_admin_stats(days=30):
+    """
+    管理画面の統計情報を返す
+
+    件数はキャッシュ上のカウンターから読み、シグナルで増減させる。キャッシュにない
+    カウンターだけをテーブルごとに1回の集計で数え直す。
+    """
+    keys = {name: counter_key(name) for counters, _ in COUNTER_GROUPS for name in counters}
+    cached = cache.get_many(keys.values())
+
+    stats = {}
+    for counters, count in COUNTER_GROUPS:
+        if all(keys[name] in cached for name in counters):
+            stats.update({name: cached[keys[name]] for name in counters})
+            continue
+        values = count()
+        cache.set_many({keys[name]: values[name] for name in counters}, ADMIN_STATS_TIMEOUT)
+        stats.update(values)
+
+    signups = daily_signups(max(days, 7))
+    # 過去7日（今日を含む）の登録者数
+    stats['recent_users'] = sum(entry['count'] for entry in signups[-7:])
+    stats['daily_signups'] = signups[-days:]
+    return stats
@@ -1,9 +1,9 @@
 from django.urls import path
 from .admin_views import (
     AdminGenreListCreateView, AdminGenreDetailView,
-    AdminQuestionListCreateView, AdminQuestionDetailView,
+    AdminQuestionListCreateView, AdminQuestionDetailView, AdminQuestionExportView,
     AdminUserListView, AdminUserDetailView,
-    AdminStatsView, AdminQuestionBulkActionView
+    AdminStatsView, AdminQuestionBulkActionView, AdminQuestionBulkJobView
 )
 
 urlpatterns = [
@@ -13,8 +13,10 @@ urlpatterns = [
     
     # 問題管理
     path('questions/', AdminQuestionListCreateView.as_view(), name='admin_questions'),
+    path('questions/export/', AdminQuestionExportView.as_view(), name='admin_question_export'),
     path('questions/<int:pk>/', AdminQuestionDetailView.as_view(), name='admin_question_detail'),
     path('questions/bulk-action/', AdminQuestionBulkActionView.as_view(), name='admin_question_bulk'),
+    path('questions/bulk-action/<int:pk>/', AdminQuestionBulkJobView.as_view(), name='admin_question_bulk_job'),
     
     # ユーザー管理
     path('users/', AdminUserListView.as_view(), name='admin_users'),
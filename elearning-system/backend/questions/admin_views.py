@@ -3,10 +3,20 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Q
-from .models import Genre, Question, Choice
-from .serializers import GenreSerializer, QuestionSerializer, ChoiceSerializer
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import Genre, Question, Choice, BulkActionJob
+from .serializers import GenreSerializer, QuestionSerializer, ChoiceSerializer, BulkActionJobSerializer
+from .cache import invalidate_question_bank
+from .catalog import get_genre_catalog
+from .admin_stats import get_admin_stats, MAX_SIGNUP_DAYS
+from .exports import iter_questions, stream_csv, stream_ndjson
+from .search import filter_by_search, rank_questions, question_highlights
+from .tasks import run_bulk_action
 from accounts.serializers import UserSerializer
+from accounts.search import search_users
 
 User = get_user_model()
 
@@ -19,6 +29,18 @@ class AdminGenreListCreateView(generics.ListCreateAPIView):
     serializer_class = GenreSerializer
     permission_classes = [IsAdminUser]
 
+    def list(self, request, *args, **kwargs):
+        # 公開用と同じキャッシュ済みのジャンル一覧を名前順で返す
+        catalog = sorted(get_genre_catalog(), key=lambda genre: genre['name'])
+        page = self.paginate_queryset(catalog)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(catalog)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_question_bank()
+
 
 class AdminGenreDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -28,38 +50,111 @@ class AdminGenreDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = GenreSerializer
     permission_classes = [IsAdminUser]
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_question_bank()
+
+    def perform_destroy(self, instance):
+        # ジャンル削除で問題も削除されるため、問題バンクのキャッシュを無効化
+        super().perform_destroy(instance)
+        invalidate_question_bank()
+
+
+def filter_questions(queryset, params, search=True):
+    """
+    管理画面の問題一覧・エクスポート共通の絞り込み
+
+    search=Falseのときは検索語での絞り込みを行わない（一覧で関連度順に並べる場合）。
+    """
+    genre = params.get('genre')
+    if genre:
+        queryset = queryset.filter(genre_id=genre)
+    
+    difficulty = params.get('difficulty')
+    if difficulty:
+        queryset = queryset.filter(difficulty=difficulty)
+    
+    query = params.get('search') if search else None
+    if query:
+        # 問題文・対象・解説のbigram索引で絞り込む
+        queryset = filter_by_search(queryset, query)
+    
+    is_active = params.get('is_active')
+    if is_active is not None:
+        queryset = queryset.filter(is_active=is_active.lower() == 'true')
+    
+    return queryset
+
 
 class AdminQuestionListCreateView(generics.ListCreateAPIView):
     """
     管理者用問題一覧取得・作成API
+    
+    searchを指定すると関連度順に並べ、一致した部分の抜粋をhighlightsとして返す。
     """
     serializer_class = QuestionSerializer
     permission_classes = [IsAdminUser]
     
     def get_queryset(self):
-        queryset = Question.objects.all().order_by('-created_at')
-        
-        # フィルタリング
-        genre = self.request.query_params.get('genre')
-        if genre:
-            queryset = queryset.filter(genre_id=genre)
-        
-        difficulty = self.request.query_params.get('difficulty')
-        if difficulty:
-            queryset = queryset.filter(difficulty=difficulty)
-        
-        search = self.request.query_params.get('search')
+        return filter_questions(Question.objects.all().order_by('-created_at'), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get('search')
+        question_ids = None
         if search:
-            queryset = queryset.filter(
-                Q(body__icontains=search) | 
-                Q(object__icontains=search)
+            question_ids = rank_questions(
+                search, filter_questions(Question.objects.all(), request.query_params, search=False)
+            )
+        if question_ids is None:
+            return super().list(request, *args, **kwargs)
+
+        # 関連度順のIDをページに分け、表示するページの問題だけを読み込む
+        page = self.paginate_queryset(question_ids)
+        questions = Question.objects.in_bulk(page if page is not None else question_ids)
+        serializer = self.get_serializer(
+            [questions[question_id] for question_id in (page if page is not None else question_ids)
+             if question_id in questions],
+            many=True
+        )
+        data = serializer.data
+        for question in data:
+            question['highlights'] = question_highlights(question, search)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_question_bank()
+
+
+class AdminQuestionExportView(APIView):
+    """
+    管理者用問題エクスポートAPI
+    
+    問題一覧と同じ条件（genre, difficulty, search, is_active）で絞り込んだ問題を
+    選択肢付きでストリーミング出力する。
+    - file_format: csv（デフォルト）または ndjson
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv').lower()
+        if file_format not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'file_formatはcsvまたはndjsonを指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        is_active = self.request.query_params.get('is_active')
-        if is_active is not None:
-            queryset = queryset.filter(is_active=is_active.lower() == 'true')
+        questions = iter_questions(filter_questions(Question.objects.all(), request.query_params))
+        if file_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(questions), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(questions), content_type='application/x-ndjson')
         
-        return queryset
+        filename = f'questions-{timezone.localtime():%Y%m%d%H%M%S}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 
 class AdminQuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -70,6 +165,14 @@ class AdminQuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = QuestionSerializer
     permission_classes = [IsAdminUser]
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_question_bank()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_question_bank()
+
 
 class AdminUserListView(generics.ListAPIView):
     """
@@ -81,16 +184,7 @@ class AdminUserListView(generics.ListAPIView):
     def get_queryset(self):
         queryset = User.objects.all().order_by('-date_joined')
         
-        # フィルタリング
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) | 
-                Q(email__icontains=search) | 
-                Q(first_name__icontains=search) | 
-                Q(last_name__icontains=search)
-            )
-        
+        # フィルタリング（searchはlistで索引から検索する）
         is_active = self.request.query_params.get('is_active')
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
@@ -101,6 +195,40 @@ class AdminUserListView(generics.ListAPIView):
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get('search')
+        if not search:
+            return super().list(request, *args, **kwargs)
+
+        user_ids = search_users(search, self.get_queryset())
+        if user_ids is None:
+            # 索引で絞り込めない検索語（多くのユーザーに共通する語など）や、語の途中にだけ
+            # 一致して索引では見つからない検索語は部分一致で検索する
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                Q(username__icontains=search) | 
+                Q(email__icontains=search) | 
+                Q(first_name__icontains=search) | 
+                Q(last_name__icontains=search) |
+                Q(display_name__icontains=search) |
+                Q(department__icontains=search)
+            )
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page if page is not None else queryset, many=True)
+            if page is not None:
+                return self.get_paginated_response(serializer.data)
+            return Response(serializer.data)
+
+        # 一致度順のIDをページに分け、表示するページのユーザーだけを読み込む
+        page = self.paginate_queryset(user_ids)
+        user_ids = page if page is not None else user_ids
+        users = User.objects.in_bulk(user_ids)
+        serializer = self.get_serializer(
+            [users[user_id] for user_id in user_ids if user_id in users], many=True
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 
 class AdminUserDetailView(generics.RetrieveUpdateAPIView):
     """
@@ -118,32 +246,24 @@ class AdminStatsView(APIView):
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        total_questions = Question.objects.count()
-        active_questions = Question.objects.filter(is_active=True).count()
-        total_genres = Genre.objects.count()
-        
-        # 最近登録されたユーザー（過去7日）
-        from django.utils import timezone
-        from datetime import timedelta
-        recent_users = User.objects.filter(
-            date_joined__gte=timezone.now() - timedelta(days=7)
-        ).count()
-        
-        return Response({
-            'total_users': total_users,
-            'active_users': active_users,
-            'recent_users': recent_users,
-            'total_questions': total_questions,
-            'active_questions': active_questions,
-            'total_genres': total_genres,
-        })
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'daysは整数で指定してください'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= MAX_SIGNUP_DAYS:
+            return Response(
+                {'error': f'daysは1〜{MAX_SIGNUP_DAYS}の範囲で指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(get_admin_stats(days))
 
 
 class AdminQuestionBulkActionView(APIView):
     """
     管理者用問題一括操作API
+
+    操作はバックグラウンドのジョブとして一定件数ずつ実行し、ジョブの状態を返す。
     """
     permission_classes = [IsAdminUser]
     
@@ -157,22 +277,37 @@ class AdminQuestionBulkActionView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        questions = Question.objects.filter(id__in=question_ids)
-        
-        if action == 'activate':
-            questions.update(is_active=True)
-            message = f'{questions.count()}件の問題を有効化しました'
-        elif action == 'deactivate':
-            questions.update(is_active=False)
-            message = f'{questions.count()}件の問題を無効化しました'
-        elif action == 'delete':
-            count = questions.count()
-            questions.delete()
-            message = f'{count}件の問題を削除しました'
-        else:
+        if action not in dict(BulkActionJob.ACTION_CHOICES):
             return Response(
                 {'error': '無効なアクションです'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        return Response({'message': message})
\ No newline at end of file
+        if not isinstance(question_ids, list):
+            return Response(
+                {'error': '問題IDはリストで指定してください'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # 重複を除き、指定された順に処理する
+        question_ids = list(dict.fromkeys(str(question_id) for question_id in question_ids))
+        job = BulkActionJob.objects.create(
+            action=action,
+            question_ids=question_ids,
+            total=len(question_ids),
+            created_by=request.user,
+        )
+        transaction.on_commit(lambda: run_bulk_action.delay(job.id))
+        
+        # ワーカーを使わない設定（CELERY_TASK_ALWAYS_EAGER）ではここで完了している
+        job.refresh_from_db()
+        return Response(BulkActionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AdminQuestionBulkJobView(generics.RetrieveAPIView):
+    """
+    管理者用問題一括操作ジョブの進捗取得API
+    """
+    queryset = BulkActionJob.objects.all()
+    serializer_class = BulkActionJobSerializer
+    permission_classes = [IsAdminUser]
\ No newline at end of file
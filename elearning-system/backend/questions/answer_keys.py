@@ -0,0 +1,64 @@
+from .models import Question, Choice
+from .cache import WorkerCache
+
+
+class AnswerKey:
+    """
+    解答チェック用の正解表
+
+    問題IDごとに (選択肢IDのタプル, 正解の選択肢IDのタプル, 解説の開始位置, 解説の終了位置)
+    を保持する。解説は1つの文字列に連結し、位置だけを持たせてメモリを節約する。
+    """
+    __slots__ = ('version', '_entries', '_clarifications')
+
+    def __init__(self, version, entries, clarifications):
+        self.version = version
+        self._entries = entries
+        self._clarifications = clarifications
+
+    @classmethod
+    def load(cls, version):
+        """有効な問題の正解表をDBから構築する（2クエリ）"""
+        clarifications = []
+        offsets = {}
+        position = 0
+        questions = Question.objects.filter(is_active=True).order_by().values_list('id', 'clarification')
+        for question_id, clarification in questions.iterator():
+            offsets[question_id] = (position, position + len(clarification))
+            clarifications.append(clarification)
+            position += len(clarification)
+
+        choice_ids = {}
+        correct_ids = {}
+        choices = Choice.objects.filter(
+            question__is_active=True
+        ).order_by('question_id', 'order_index').values_list('question_id', 'id', 'is_correct')
+        for question_id, choice_id, is_correct in choices.iterator():
+            choice_ids.setdefault(question_id, []).append(choice_id)
+            if is_correct:
+                correct_ids.setdefault(question_id, []).append(choice_id)
+
+        entries = {
+            question_id: (
+                tuple(choice_ids.get(question_id, ())),
+                tuple(correct_ids.get(question_id, ())),
+                start,
+                end,
+            )
+            for question_id, (start, end) in offsets.items()
+        }
+        return cls(version, entries, ''.join(clarifications))
+
+    def get(self, question_id):
+        return self._entries.get(question_id)
+
+    def clarification(self, entry):
+        return self._clarifications[entry[2]:entry[3]]
+
+
+_answer_keys = WorkerCache(AnswerKey.load)
+
+
+def get_answer_key():
+    """ワーカー内の正解表を返す（問題バンクの更新時のみ読み直す）"""
+    return _answer_keys.get()
@@ -0,0 +1,47 @@
+import threading
+import time
+from django.core.cache import cache
+
+# 問題バンクの更新ごとに変わるバージョン。ワーカー内キャッシュの整合性確認に使う
+QUESTION_BANK_VERSION_KEY = 'questions:bank_version'
+
+
+def question_bank_version():
+    """現在の問題バンクのバージョンを取得する"""
+    version = cache.get(QUESTION_BANK_VERSION_KEY)
+    if version is None:
+        cache.add(QUESTION_BANK_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(QUESTION_BANK_VERSION_KEY)
+    if version is None:
+        # キャッシュが使えない場合は毎回読み直させる
+        return time.time_ns()
+    return version
+
+
+def invalidate_question_bank():
+    """問題・選択肢・ジャンルの変更後に呼び出し、各ワーカーのキャッシュを無効化する"""
+    cache.set(QUESTION_BANK_VERSION_KEY, time.time_ns(), None)
+
+
+class WorkerCache:
+    """
+    問題バンクのバージョンに合わせて読み直すワーカー内キャッシュ
+
+    loaderはバージョンを受け取り、キャッシュする値を返す関数。
+    バージョンが変わっていなければDBにはアクセスしない。
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._version = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = question_bank_version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._value = self._loader(version)
+                    self._version = version
+        return self._value
@@ -0,0 +1,28 @@
+from django.core.cache import cache
+from django.db.models import Count
+from .models import Genre
+from .serializers import GenreSerializer
+from .cache import question_bank_version
+
+# ジャンル一覧のキャッシュ有効期限（秒）。更新時はバージョンの変更で無効化される
+GENRE_CATALOG_TIMEOUT = 60 * 60
+
+
+def genre_catalog_queryset():
+    """問題数を1回のクエリで集計したジャンル一覧"""
+    return Genre.objects.annotate(question_count=Count('questions')).order_by('id')
+
+
+def get_genre_catalog():
+    """
+    シリアライズ済みのジャンル一覧を返す
+
+    問題バンクのバージョンごとにキャッシュするため、ジャンル・問題の変更後は
+    次の呼び出しで作り直される。
+    """
+    cache_key = f'questions:genre_catalog:{question_bank_version()}'
+    catalog = cache.get(cache_key)
+    if catalog is None:
+        catalog = [dict(genre) for genre in GenreSerializer(genre_catalog_queryset(), many=True).data]
+        cache.set(cache_key, catalog, GENRE_CATALOG_TIMEOUT)
+    return catalog
@@ -0,0 +1,74 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Choice
+
+QUESTION_EXPORT_COLUMNS = [
+    'id', 'genre_id', 'genre_name', 'difficulty', 'point_weight', 'time_weight',
+    'body', 'object', 'clarification', 'is_active', 'created_at', 'updated_at',
+]
+
+
+def iter_questions(queryset, chunk_size=1000):
+    """
+    問題を選択肢付きの辞書として1件ずつ返す
+
+    ID順のキーセット（id > 前チャンクの末尾）でchunk_size件ずつ読み、チャンクごとに
+    選択肢を1クエリでまとめて取得する。MySQLのドライバは結果セット全体を
+    メモリに読み込むため、iterator()ではなくLIMIT付きのクエリで区切る。
+    """
+    fields = [column if column != 'genre_name' else 'genre__name' for column in QUESTION_EXPORT_COLUMNS]
+    queryset = queryset.order_by('id').values_list(*fields)
+    last_id = None
+    while True:
+        chunk_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+
+        choices = {}
+        for question_id, choice_id, content, is_correct, order_index in Choice.objects.filter(
+            question_id__in=[row[0] for row in chunk]
+        ).order_by('question_id', 'order_index', 'id').values_list(
+            'question_id', 'id', 'content', 'is_correct', 'order_index'
+        ):
+            choices.setdefault(question_id, []).append({
+                'id': choice_id,
+                'content': content,
+                'is_correct': is_correct,
+                'order_index': order_index,
+            })
+
+        for row in chunk:
+            question = dict(zip(QUESTION_EXPORT_COLUMNS, row))
+            question['choices'] = choices.get(question['id'], [])
+            yield question
+
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+class _Echo:
+    """csv.writerが書いた1行をそのまま返す疑似バッファ"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(questions):
+    """問題1件を1行とするCSV（選択肢はJSON文字列の列）"""
+    writer = csv.writer(_Echo())
+    # Excelで文字化けしないようBOMを付ける
+    yield '\ufeff' + writer.writerow(QUESTION_EXPORT_COLUMNS + ['choices'])
+    for question in questions:
+        yield writer.writerow(
+            [question[column] for column in QUESTION_EXPORT_COLUMNS]
+            + [json.dumps(question['choices'], ensure_ascii=False)]
+        )
+
+
+def stream_ndjson(questions):
+    """問題1件を1行のJSONとするNDJSON"""
+    for question in questions:
+        yield json.dumps(question, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,115 @@
+# backend/questions/management/commands/benchmark_question_search.py
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from questions.models import Question
+from questions.search import rank_questions
+
+PAGE_SIZE = 20
+
+
+def percentile(values, ratio):
+    """最近傍順位法によるパーセンタイル"""
+    ordered = sorted(values)
+    index = max(int(round(ratio * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def icontains_search(query):
+    """従来の検索（部分一致。1ページ目と件数）"""
+    queryset = Question.objects.filter(
+        Q(body__icontains=query) | Q(object__icontains=query) | Q(clarification__icontains=query)
+    )
+    return queryset.count(), list(queryset.order_by('-created_at').values_list('id', flat=True)[:PAGE_SIZE])
+
+
+def index_search(query):
+    """bigram索引による検索（関連度順の1ページ目と件数）"""
+    ranked = rank_questions(query) or []
+    page = Question.objects.in_bulk(ranked[:PAGE_SIZE])
+    return len(ranked), [question_id for question_id in ranked[:PAGE_SIZE] if question_id in page]
+
+
+class Command(BaseCommand):
+    help = 'Compare admin question search latency: icontains scan vs the bigram index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            type=str,
+            action='append',
+            help='Search term to measure (can be repeated). Sampled from question text when omitted'
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=20,
+            help='Number of search terms to sample from question text'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per search term and method'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed used to sample search terms'
+        )
+
+    def handle(self, *args, **options):
+        queries = options['query'] or self.sample_queries(options['samples'], random.Random(options['seed']))
+        if not queries:
+            raise CommandError('No questions found to sample search terms from')
+
+        timings = {'icontains': [], 'index': []}
+        missing = 0
+        self.stdout.write(f'{"query":<20} {"icontains ms":>12} {"index ms":>10} {"matches":>9} {"indexed":>9}')
+        for query in queries:
+            row = {}
+            for name, search in (('icontains', icontains_search), ('index', index_search)):
+                durations = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    count, _ = search(query)
+                    durations.append((time.perf_counter() - started) * 1000)
+                timings[name].extend(durations)
+                row[name] = (min(durations), count)
+            # bigramの一致は部分一致を必ず含む（索引の件数が少なければ索引が古い）
+            if row['index'][1] < row['icontains'][1]:
+                missing += 1
+            self.stdout.write(
+                f'{query:<20} {row["icontains"][0]:>12.2f} {row["index"][0]:>10.2f} '
+                f'{row["icontains"][1]:>9} {row["index"][1]:>9}'
+            )
+
+        for name, values in timings.items():
+            self.stdout.write(
+                f'{name:<10} p50 {percentile(values, 0.5):.2f}ms  p95 {percentile(values, 0.95):.2f}ms'
+            )
+        if missing:
+            self.stdout.write(
+                self.style.WARNING(f'{missing} queries matched fewer questions via the index; run rebuild_search_index')
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Measured {len(queries)} queries'))
+
+    def sample_queries(self, count, rng):
+        """問題文の語から2〜6文字の部分文字列を検索語として抜き出す"""
+        ids = list(Question.objects.values_list('id', flat=True))
+        queries = []
+        for question_id in rng.sample(ids, min(count, len(ids))):
+            words = [
+                word for word in Question.objects.filter(id=question_id).values_list('body', flat=True)[0].split()
+                if len(word) >= 2
+            ]
+            if not words:
+                continue
+            text = rng.choice(words)
+            length = rng.randint(2, min(6, len(text)))
+            start = rng.randrange(len(text) - length + 1)
+            queries.append(text[start:start + length])
+        return queries
@@ -0,0 +1,55 @@
+# backend/questions/management/commands/export_bank.py
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from questions.snapshot import SnapshotError, export_snapshot, parse_since, read_manifest
+
+
+class Command(BaseCommand):
+    help = 'Export genres, questions and choices to a compressed columnar snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Snapshot path (defaults to question-bank-<timestamp>.zip)'
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only export questions updated at or after this ISO datetime'
+        )
+        parser.add_argument(
+            '--since-snapshot',
+            type=str,
+            help='Only export questions updated since the watermark of this earlier snapshot'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or f'question-bank-{timezone.localtime():%Y%m%d%H%M%S}.zip'
+
+        try:
+            since = None
+            if options['since']:
+                since = parse_since(options['since'])
+            elif options['since_snapshot']:
+                watermark = read_manifest(options['since_snapshot'])['watermark']
+                if watermark is None:
+                    raise CommandError(f'{options["since_snapshot"]} has no watermark')
+                since = parse_since(watermark)
+
+            started = time.perf_counter()
+            manifest = export_snapshot(output, since=since)
+        except SnapshotError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        counts = ', '.join(f'{table}: {info["rows"]}' for table, info in manifest['tables'].items())
+        kind = f'incremental snapshot since {manifest["since"]}' if since else 'full snapshot'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Wrote {kind} to {output} ({os.path.getsize(output) / 1024:.0f} KiB) in {elapsed:.2f}s\n'
+                f'{counts}\nwatermark: {manifest["watermark"]}'
+            )
+        )
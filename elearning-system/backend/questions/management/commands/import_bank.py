@@ -0,0 +1,57 @@
+# backend/questions/management/commands/import_bank.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from questions.cache import invalidate_question_bank
+from questions.snapshot import SnapshotError, import_snapshot, parse_since, read_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Load genres, questions and choices from a snapshot written by export_bank'
+
+    def add_arguments(self, parser):
+        parser.add_argument('snapshot', type=str, help='Snapshot path')
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only apply questions updated at or after this ISO datetime'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows per bulk insert'
+        )
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Check the format and checksums without writing'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            since = parse_since(options['since']) if options['since'] else None
+            manifest, tables = read_snapshot(options['snapshot'])
+        except SnapshotError as e:
+            raise CommandError(str(e))
+
+        counts = ', '.join(f'{table}: {info["rows"]}' for table, info in manifest['tables'].items())
+        self.stdout.write(f'Snapshot created at {manifest["created_at"]} (checksums OK): {counts}')
+        if options['verify_only']:
+            return
+
+        try:
+            stats = import_snapshot(tables, since=since, batch_size=options['batch_size'])
+        finally:
+            invalidate_question_bank()
+        elapsed = time.perf_counter() - started
+
+        summary = ', '.join(
+            f'{table}: {created} created, {updated} updated'
+            for table, (created, updated) in ((table, stats[table]) for table in ('genres', 'questions', 'choices'))
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported snapshot in {elapsed:.2f}s\n{summary}, {stats["choices_removed"]} choices removed'
+            )
+        )
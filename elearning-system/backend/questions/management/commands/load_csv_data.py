@@ -1,13 +1,29 @@
 # backend/management/commands/load_csv_data.py
 import os
+import time
 import pandas as pd
 from django.core.management.base import BaseCommand
-from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from questions.models import Genre, Question, Choice
+from questions.cache import invalidate_question_bank
+from questions.search import index_questions
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+GENRE_NAMES = {
+    'g02': 'WOVN基礎知識',
+    'g03': 'ビジネス知識',
+    'g04': 'セールス知識',
+    'g05': 'マーケティング知識',
+    'g06': 'テクニカル知識',
+}
+
+QUESTION_FIELDS = ['genre_id', 'difficulty', 'point_weight', 'time_weight', 'body', 'object', 'clarification']
+CHOICE_FIELDS = ['question_id', 'content', 'is_correct', 'order_index']
+
+
 class Command(BaseCommand):
     help = 'Load questions and answers from CSV file'
 
@@ -18,114 +34,213 @@ class Command(BaseCommand):
             default='data/Cleaned_Questions_table___Answers_table______.csv',
             help='Path to CSV file'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of CSV rows read and written per batch'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be created, updated or removed without writing'
+        )
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
-        
+        self.dry_run = options['dry_run']
+
         if not os.path.exists(csv_file):
             self.stdout.write(
                 self.style.ERROR(f'CSV file not found: {csv_file}')
             )
             return
 
+        self.known_genres = set(Genre.objects.values_list('id', flat=True))
+        # 取り込み済みの問題ごとの選択肢ID（同じ問題の行が離れて出てきても選択肢を消さないため）
+        self.seen_choices = {}
+        self.seen_questions = set()
+        self.stats = dict.fromkeys([
+            'genres_created', 'questions_created', 'questions_updated', 'questions_unchanged',
+            'choices_created', 'choices_updated', 'choices_removed',
+        ], 0)
+
+        started = time.perf_counter()
+        rows_read = 0
         try:
-            # CSVファイルを読み込み
-            df = pd.read_csv(csv_file)
-            self.stdout.write(f'CSV file loaded: {len(df)} rows')
-            
-            # データの前処理
-            df = df.dropna(subset=['question_id', 'content'])
-            df = df[df['deleted_x'] == 0]  # 削除されていないデータのみ
-            df = df[df['deleted_y'] == 0]
-            
-            # ジャンルの作成
-            self.create_genres(df)
-            
-            # 問題と選択肢の作成
-            self.create_questions_and_choices(df)
-            
+            # 全体を1トランザクションにし、途中で失敗した場合は何も反映しない
+            with transaction.atomic():
+                for chunk in pd.read_csv(csv_file, chunksize=options['chunk_size']):
+                    rows_read += len(chunk)
+                    self.load_chunk(self.clean(chunk))
+
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'  {rows_read} rows, {len(self.seen_questions)} questions '
+                        f'({rows_read / elapsed:.0f} rows/s)'
+                    )
+
+                self.remove_stale_choices()
+
+                if self.dry_run:
+                    transaction.set_rollback(True)
+
+            elapsed = time.perf_counter() - started
+            summary = ', '.join(f'{key.replace("_", " ")}: {value}' for key, value in self.stats.items())
             self.stdout.write(
-                self.style.SUCCESS('Successfully loaded CSV data')
+                self.style.SUCCESS(
+                    f'{"Dry run finished" if self.dry_run else "Successfully loaded CSV data"} '
+                    f'in {elapsed:.2f}s ({rows_read / elapsed if elapsed else 0:.0f} rows/s)\n{summary}'
+                )
             )
-            
+
         except Exception as e:
             self.stdout.write(
-                self.style.ERROR(f'Error loading CSV: {str(e)}')
+                self.style.ERROR(f'Error loading CSV (no changes were saved): {str(e)}')
             )
+        finally:
+            if not self.dry_run:
+                # 各ワーカーの問題キャッシュを無効化
+                invalidate_question_bank()
 
-    def create_genres(self, df):
-        """ジャンルの作成"""
-        genre_mapping = {
-            'g02': 'WOVN基礎知識',
-            'g03': 'ビジネス知識',
-            'g04': 'セールス知識',
-            'g05': 'マーケティング知識',
-            'g06': 'テクニカル知識',
-        }
-        
-        unique_genres = df['genre_id'].unique()
-        
-        for genre_id in unique_genres:
-            if pd.notna(genre_id):
-                genre_name = genre_mapping.get(genre_id, f'ジャンル {genre_id}')
-                genre, created = Genre.objects.get_or_create(
-                    id=genre_id,
-                    defaults={'name': genre_name}
+    def clean(self, chunk):
+        """データの前処理"""
+        chunk = chunk.dropna(subset=['question_id', 'content'])
+        chunk = chunk[chunk['deleted_x'] == 0]  # 削除されていないデータのみ
+        chunk = chunk[chunk['deleted_y'] == 0]
+        return chunk
+
+    def load_chunk(self, chunk):
+        """1チャンク分のジャンル・問題・選択肢を一括で登録・更新する"""
+        self.create_genres(chunk)
+
+        questions = {}
+        choices = {}
+        for row in chunk.itertuples(index=False):
+            question_id = row.question_id
+            # 問題の基本情報は最初に出てきた行から取得
+            if question_id not in questions and question_id not in self.seen_questions:
+                questions[question_id] = Question(
+                    id=question_id,
+                    genre_id=row.genre_id,
+                    difficulty=int(row.difficulty) if pd.notna(row.difficulty) else 1,
+                    point_weight=int(row.point_weight) if pd.notna(row.point_weight) else 1,
+                    time_weight=int(row.time_weight) if pd.notna(row.time_weight) else 1,
+                    body=row.body if pd.notna(row.body) else '',
+                    object=row.object if pd.notna(row.object) else '',
+                    clarification=row.clarification if pd.notna(row.clarification) else '',
                 )
-                if created:
-                    self.stdout.write(f'Created genre: {genre_id} - {genre_name}')
-
-    def create_questions_and_choices(self, df):
-        """問題と選択肢の作成"""
-        # 問題IDでグループ化
-        question_groups = df.groupby('question_id')
-        
-        questions_created = 0
-        choices_created = 0
-        
-        for question_id, group in question_groups:
-            if pd.isna(question_id):
+            if pd.isna(row.id_y):
                 continue
-                
-            # 問題の基本情報（最初の行から取得）
-            first_row = group.iloc[0]
-            
-            # 問題の作成
-            question, created = Question.objects.get_or_create(
-                id=question_id,
-                defaults={
-                    'genre_id': first_row['genre_id'],
-                    'difficulty': int(first_row['difficulty']) if pd.notna(first_row['difficulty']) else 1,
-                    'point_weight': int(first_row['point_weight']) if pd.notna(first_row['point_weight']) else 1,
-                    'time_weight': int(first_row['time_weight']) if pd.notna(first_row['time_weight']) else 1,
-                    'body': first_row['body'] if pd.notna(first_row['body']) else '',
-                    'object': first_row['object'] if pd.notna(first_row['object']) else '',
-                    'clarification': first_row['clarification'] if pd.notna(first_row['clarification']) else '',
-                }
-            )
-            
-            if created:
-                questions_created += 1
-                self.stdout.write(f'Created question: {question_id}')
-            
-            # 既存の選択肢を削除（重複を避けるため）
-            if not created:
-                question.choices.all().delete()
-            
-            # 選択肢の作成
-            for index, row in group.iterrows():
-                if pd.notna(row['content']) and pd.notna(row['id_y']):
-                    choice = Choice.objects.create(
-                        id=row['id_y'],
-                        question=question,
-                        content=row['content'],
-                        is_correct=bool(row['is_answer']),
-                        order_index=index % len(group)  # 順序を設定
-                    )
-                    choices_created += 1
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Created {questions_created} questions and {choices_created} choices'
+
+            seen = self.seen_choices.setdefault(question_id, set())
+            if row.id_y in seen or row.id_y in choices:
+                continue
+            choices[row.id_y] = Choice(
+                id=row.id_y,
+                question_id=question_id,
+                content=row.content,
+                is_correct=bool(row.is_answer),
+                order_index=len(seen)  # 問題内での出現順
             )
-        )
+            seen.add(row.id_y)
+
+        self.upsert_questions(list(questions.values()))
+        self.upsert_choices(list(choices.values()))
+        self.seen_questions.update(questions)
+
+    def create_genres(self, chunk):
+        """ジャンルの作成"""
+        new_genres = [
+            Genre(id=genre_id, name=GENRE_NAMES.get(genre_id, f'ジャンル {genre_id}'))
+            for genre_id in chunk['genre_id'].dropna().unique()
+            if genre_id not in self.known_genres
+        ]
+        for genre in new_genres:
+            self.report('create genre', genre.id, genre.name)
+        if new_genres and not self.dry_run:
+            Genre.objects.bulk_create(new_genres)
+        self.known_genres.update(genre.id for genre in new_genres)
+        self.stats['genres_created'] += len(new_genres)
+
+    def upsert_questions(self, questions):
+        existing = Question.objects.in_bulk([question.id for question in questions])
+        now = timezone.now()
+
+        to_create = []
+        to_update = []
+        for question in questions:
+            current = existing.get(question.id)
+            if current is None:
+                to_create.append(question)
+                self.report('create question', question.id)
+                continue
+            changed = [field for field in QUESTION_FIELDS if getattr(current, field) != getattr(question, field)]
+            if not changed:
+                self.stats['questions_unchanged'] += 1
+                continue
+            for field in changed:
+                setattr(current, field, getattr(question, field))
+            # bulk_update では auto_now が働かないため更新日時を明示する
+            current.updated_at = now
+            to_update.append(current)
+            self.report('update question', question.id, ', '.join(changed))
+
+        if not self.dry_run:
+            Question.objects.bulk_create(to_create)
+            Question.objects.bulk_update(to_update, QUESTION_FIELDS + ['updated_at'], batch_size=500)
+            # 一括登録・更新ではシグナルが送られないため、検索索引をここで更新する
+            index_questions([question.id for question in to_create + to_update])
+        self.stats['questions_created'] += len(to_create)
+        self.stats['questions_updated'] += len(to_update)
+
+    def upsert_choices(self, choices):
+        existing = Choice.objects.in_bulk([choice.id for choice in choices])
+
+        to_create = []
+        to_update = []
+        for choice in choices:
+            current = existing.get(choice.id)
+            if current is None:
+                to_create.append(choice)
+                self.report('create choice', choice.id, f'question {choice.question_id}')
+                continue
+            changed = [field for field in CHOICE_FIELDS if getattr(current, field) != getattr(choice, field)]
+            if changed:
+                for field in changed:
+                    setattr(current, field, getattr(choice, field))
+                to_update.append(current)
+                self.report('update choice', choice.id, ', '.join(changed))
+
+        if not self.dry_run:
+            Choice.objects.bulk_create(to_create)
+            Choice.objects.bulk_update(to_update, CHOICE_FIELDS, batch_size=500)
+        self.stats['choices_created'] += len(to_create)
+        self.stats['choices_updated'] += len(to_update)
+
+    def remove_stale_choices(self, batch_size=1000):
+        """
+        CSVに含まれなくなった選択肢を削除
+
+        1つの問題の行がチャンクをまたぐことがあるため、全行を読み終えてからまとめて判定する。
+        """
+        seen_ids = set().union(*self.seen_choices.values())
+        question_ids = list(self.seen_questions)
+        for offset in range(0, len(question_ids), batch_size):
+            stale = [
+                (choice_id, question_id)
+                for choice_id, question_id in Choice.objects.filter(
+                    question_id__in=question_ids[offset:offset + batch_size]
+                ).values_list('id', 'question_id')
+                if choice_id not in seen_ids
+            ]
+            for choice_id, question_id in stale:
+                self.report('remove choice', choice_id, f'question {question_id}')
+            if stale and not self.dry_run:
+                Choice.objects.filter(id__in=[choice_id for choice_id, _ in stale]).delete()
+            self.stats['choices_removed'] += len(stale)
+
+    def report(self, action, object_id, detail=''):
+        # 差分の明細はドライラン時のみ出力する
+        if self.dry_run:
+            self.stdout.write(f'    {action}: {object_id}' + (f' ({detail})' if detail else ''))
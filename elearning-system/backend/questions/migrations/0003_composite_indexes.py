@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_alter_choice_id_alter_question_object'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['is_active', 'genre', 'difficulty'], name='questions_active_genre_diff'),
+        ),
+    ]
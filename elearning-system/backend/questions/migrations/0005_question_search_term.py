@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:57
+
+import unicodedata
+from collections import Counter
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 索引を作った時点の設定（questions.search と同じ値。以降の変更の影響を受けないようここに固定する）
+FIELD_WEIGHTS = {'body': 3, 'object': 2, 'clarification': 1}
+GRAM_SHIFT = 21
+BATCH_SIZE = 500
+
+
+def question_terms(texts):
+    """問題1件分の {bigramのコード: 重み}（questions.search.question_terms と同じ規則）"""
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for word in unicodedata.normalize('NFKC', texts[field] or '').casefold().split():
+            for gram in [word[index:index + 2] for index in range(len(word) - 1)] + [word[-1]]:
+                code = ord(gram[0]) << GRAM_SHIFT
+                if len(gram) == 2:
+                    code |= ord(gram[1])
+                weights[code] += weight
+    return weights
+
+
+def build_search_index(apps, schema_editor):
+    """既存の問題の索引を作る（以降は保存時のシグナルと一括登録の処理で更新される）"""
+    Question = apps.get_model('questions', 'Question')
+    QuestionSearchTerm = apps.get_model('questions', 'QuestionSearchTerm')
+
+    terms = []
+    for question in Question.objects.order_by('id').values('id', *FIELD_WEIGHTS).iterator(chunk_size=BATCH_SIZE):
+        terms.extend(
+            QuestionSearchTerm(gram=gram, question_id=question['id'], weight=weight)
+            for gram, weight in question_terms(question).items()
+        )
+        if len(terms) >= BATCH_SIZE * 50:
+            QuestionSearchTerm.objects.bulk_create(terms, batch_size=1000)
+            terms = []
+    QuestionSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_bulk_action_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.BigIntegerField()),
+                ('weight', models.IntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='questions.question')),
+            ],
+            options={
+                'unique_together': {('gram', 'question')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -35,6 +35,10 @@ class Question(models.Model):
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            # 出題対象（有効な問題）のジャンル・難易度での絞り込み用
+            models.Index(fields=['is_active', 'genre', 'difficulty'], name='questions_active_genre_diff'),
+        ]
 
     def __str__(self):
         return f"{self.id} - {self.body[:50]}..."
@@ -53,3 +57,55 @@ class Choice(models.Model):
     def __str__(self):
         marker = "◯" if self.is_correct else "×"
         return f"{self.question.id} - {self.content[:30]}... {marker}"
+
+class BulkActionJob(models.Model):
+    """管理画面の問題一括操作（バックグラウンドで一定件数ずつ処理する）"""
+    ACTION_CHOICES = [
+        ('activate', '有効化'),
+        ('deactivate', '無効化'),
+        ('delete', '削除'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', '待機中'),
+        ('running', '実行中'),
+        ('completed', '完了'),
+        ('failed', '失敗'),
+    ]
+
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    question_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)  # 処理済みの問題ID数（再実行時はここから再開する）
+    affected = models.IntegerField(default=0)  # 実際に更新・削除した問題数
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='bulk_action_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def progress(self):
+        if self.total == 0:
+            return 100.0
+        return round(self.processed / self.total * 100, 1)
+
+    def __str__(self):
+        return f"{self.get_action_display()} - {self.get_status_display()} ({self.processed}/{self.total})"
+
+class QuestionSearchTerm(models.Model):
+    """
+    問題文・対象・解説の文字bigram転置インデックス（1行 = あるbigramを含む1問題）
+
+    bigramは2文字のコードポイントを1つの整数にまとめて持つ（questions.search.gram_code）。
+    文字列のままだとMySQLの照合順序で「は」と「ば」などが同一視されるため。
+    """
+    gram = models.BigIntegerField()
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.IntegerField()  # フィールドの重み × 出現回数
+
+    class Meta:
+        unique_together = ['gram', 'question']
@@ -0,0 +1,74 @@
+import random
+from array import array
+from bisect import bisect_right
+from .models import Question
+from .cache import WorkerCache
+
+
+class QuestionPool:
+    """
+    ランダム出題用の問題IDインデックス
+
+    有効な問題のIDをID順のタプルで1つだけ保持し、(ジャンルID, 難易度) ごとに
+    そのタプル内の位置を配列で持つ。抽出はDBにアクセスせず、取得件数kに比例する
+    計算量で行う。
+    """
+    __slots__ = ('version', '_ids', '_buckets')
+
+    def __init__(self, version, ids, buckets):
+        self.version = version
+        self._ids = ids
+        self._buckets = buckets
+
+    @classmethod
+    def load(cls, version):
+        """有効な問題IDを読み込んでインデックスを構築する（1クエリ）"""
+        ids = []
+        buckets = {}
+        questions = Question.objects.filter(is_active=True).order_by('id').values_list('id', 'genre_id', 'difficulty')
+        for position, (question_id, genre_id, difficulty) in enumerate(questions.iterator()):
+            ids.append(question_id)
+            buckets.setdefault((genre_id, difficulty), array('I')).append(position)
+        return cls(version, tuple(ids), buckets)
+
+    def _select(self, genres=None, difficulties=None):
+        # 抽出結果を再現できるよう、対象バケットはキー順に並べる
+        return [
+            self._buckets[key] for key in sorted(self._buckets)
+            if (not genres or key[0] in genres) and (not difficulties or key[1] in difficulties)
+        ]
+
+    def count(self, genres=None, difficulties=None):
+        return sum(len(bucket) for bucket in self._select(genres, difficulties))
+
+    def sample(self, count, genres=None, difficulties=None, seed=None):
+        """
+        条件に合う問題IDを重複なくcount件抽出する
+
+        genres・difficultiesは複数指定でき、指定したものの和集合から抽出する。
+        seedを指定すると、問題バンクが同じ間は同じ結果になる。
+        """
+        buckets = self._select(genres, difficulties)
+
+        offsets = []
+        total = 0
+        for bucket in buckets:
+            offsets.append(total)
+            total += len(bucket)
+
+        rng = random.Random(seed) if seed is not None else random
+        positions = rng.sample(range(total), min(max(count, 0), total))
+
+        selected_ids = []
+        for position in positions:
+            index = bisect_right(offsets, position) - 1
+            selected_ids.append(self._ids[buckets[index][position - offsets[index]]])
+        return selected_ids
+
+
+_question_pools = WorkerCache(QuestionPool.load)
+
+
+def get_question_pool():
+    """ワーカー内の問題IDインデックスを返す（問題バンクの更新時のみ読み直す）"""
+    return _question_pools.get()
@@ -0,0 +1,260 @@
+import html
+import math
+import unicodedata
+from collections import Counter
+from functools import reduce
+from operator import add, or_
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, Value, When
+from .models import Question, QuestionSearchTerm
+from .cache import WorkerCache
+
+# 索引するフィールドと重み（問題文での一致を解説での一致より高く評価する）
+FIELD_WEIGHTS = {'body': 3, 'object': 2, 'clarification': 1}
+
+# 抜粋の長さ（文字数）と、最初の一致より前に含める文字数
+SNIPPET_LENGTH = 120
+SNIPPET_CONTEXT = 30
+
+# Unicodeのコードポイントは21ビットに収まるため、2文字を1つの整数にまとめられる
+GRAM_SHIFT = 21
+
+# 索引の作り直しで1回に読み込む問題数
+INDEX_BATCH_SIZE = 500
+
+question_count = WorkerCache(lambda version: Question.objects.count())
+
+
+def normalize(text):
+    """全角・半角と大文字・小文字の違いを吸収する"""
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def gram_code(gram):
+    """1〜2文字を索引用の整数にする（1文字は2文字目が0のbigramとして扱う）"""
+    code = ord(gram[0]) << GRAM_SHIFT
+    if len(gram) == 2:
+        code |= ord(gram[1])
+    return code
+
+
+def text_grams(text):
+    """
+    文字列のbigramを返す
+
+    日本語は単語で区切れないため、空白で区切った語ごとに2文字ずつずらして切り出す。
+    1文字の検索語でも前方一致で引けるよう、各語の末尾の1文字も含める。
+    """
+    grams = []
+    for word in normalize(text).split():
+        grams.extend(word[index:index + 2] for index in range(len(word) - 1))
+        grams.append(word[-1])
+    return grams
+
+
+def question_terms(question_id, texts):
+    """問題1件分の索引行 (gram, question_id, weight)。重みはフィールドの重み × 出現回数の合計"""
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for gram in text_grams(texts.get(field) or ''):
+            weights[gram_code(gram)] += weight
+    return [(gram, question_id, weight) for gram, weight in weights.items()]
+
+
+def _insert_terms(rows):
+    """
+    索引行をexecutemanyで一括INSERTする
+
+    1問題あたり数十〜数百行になるため、モデルのインスタンスを作るbulk_createは使わない。
+    """
+    if not rows:
+        return
+    meta = QuestionSearchTerm._meta
+    sql = 'INSERT INTO {} ({}) VALUES (%s, %s, %s)'.format(
+        connection.ops.quote_name(meta.db_table),
+        ', '.join(connection.ops.quote_name(meta.get_field(name).column) for name in ('gram', 'question', 'weight')),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def index_questions(question_ids, batch_size=INDEX_BATCH_SIZE):
+    """
+    問題の索引を作り直す
+
+    保存時はシグナルから呼ばれる。bulk_createやupdate()はシグナルを送らないため、
+    一括登録・更新の後は変更した問題のIDを渡して呼び出す。
+    """
+    question_ids = list(question_ids)
+    indexed = 0
+    for offset in range(0, len(question_ids), batch_size):
+        batch = question_ids[offset:offset + batch_size]
+        terms = []
+        for question_id, *texts in Question.objects.filter(id__in=batch).values_list('id', *FIELD_WEIGHTS):
+            terms.extend(question_terms(question_id, dict(zip(FIELD_WEIGHTS, texts))))
+        with transaction.atomic():
+            QuestionSearchTerm.objects.filter(question_id__in=batch).delete()
+            _insert_terms(terms)
+        indexed += len(batch)
+    return indexed
+
+
+def rebuild_index(batch_size=INDEX_BATCH_SIZE):
+    """全問題の索引を作り直す（IDのキーセットでbatch_size件ずつ）"""
+    indexed = 0
+    last_id = None
+    while True:
+        queryset = Question.objects.order_by('id')
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        batch = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return indexed
+        indexed += index_questions(batch, batch_size)
+        last_id = batch[-1]
+
+
+def _query_conditions(query):
+    """
+    検索語から索引行の条件を作る
+
+    2文字以上の語はbigramの完全一致、1文字の語はその文字で始まるbigramの範囲を条件にする。
+    ((種類, コード), 条件) のリストを返す。
+    """
+    conditions = {}
+    for word in normalize(query).split():
+        if len(word) == 1:
+            code = gram_code(word)
+            conditions[('prefix', code)] = Q(gram__gte=code, gram__lt=code + (1 << GRAM_SHIFT))
+            continue
+        for index in range(len(word) - 1):
+            code = gram_code(word[index:index + 2])
+            conditions[('gram', code)] = Q(gram=code)
+    return list(conditions.items())
+
+
+def search_postings(query):
+    """
+    検索語のbigramをすべて含む問題の (question_id, score) を返すクエリセット
+
+    スコアは bigramごとの重み × IDF の合計。検索に使える文字がなければNoneを返す。
+    """
+    conditions = _query_conditions(query)
+    if not conditions:
+        return None
+
+    # 完全一致のbigramは1問題1行のため、範囲（1文字の語）のときだけDISTINCTで数える
+    frequencies = QuestionSearchTerm.objects.filter(reduce(or_, [condition for _, condition in conditions])).aggregate(**{
+        f'df{index}': Count('question_id', distinct=kind == 'prefix', filter=condition)
+        for index, ((kind, _), condition) in enumerate(conditions)
+    })
+    frequencies = [frequencies[f'df{index}'] for index in range(len(conditions))]
+    conditions = [condition for _, condition in conditions]
+    if not all(frequencies):
+        # 1つでも含む問題のないbigramがあれば一致はない
+        return QuestionSearchTerm.objects.none().values('question_id').annotate(score=Value(0.0))
+
+    total = max(question_count.get(), 1)
+    terms = sorted(
+        ((frequency, condition, math.log(1 + total / frequency)) for frequency, condition in zip(frequencies, conditions)),
+        key=lambda term: term[0],
+    )
+    # すべての問題に含まれるbigramは絞り込みに役立たないため、他のbigramがあれば照合から外す
+    if terms[0][0] < total:
+        terms = [term for term in terms if term[0] < total]
+
+    postings = QuestionSearchTerm.objects.filter(reduce(or_, [condition for _, condition, _ in terms]))
+    if terms[0][0] * 2 <= terms[-1][0]:
+        # 出現数に偏りがあれば、最も少ないbigramを含む問題を候補にして他のbigramは候補の中だけで照合する
+        postings = postings.filter(
+            question_id__in=QuestionSearchTerm.objects.filter(terms[0][1]).values('question_id')
+        )
+    return postings.values('question_id').annotate(
+        matched=reduce(add, [Max(Case(When(condition, then=1), default=0)) for _, condition, _ in terms]),
+        score=Sum(Case(
+            *[When(condition, then=F('weight') * Value(idf)) for _, condition, idf in terms],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )),
+    ).filter(matched=len(terms)).order_by()
+
+
+def filter_by_search(queryset, query):
+    """問題のクエリセットを検索語で絞り込む（索引を副問い合わせで参照する）"""
+    postings = search_postings(query)
+    if postings is None:
+        return queryset
+    return queryset.filter(id__in=postings.values('question_id'))
+
+
+def rank_questions(query, queryset=None):
+    """
+    スコアの高い順に問題IDのリストを返す
+
+    querysetを渡すと、その中の問題に限定する（ジャンルなど他の条件での絞り込み用）。
+    """
+    postings = search_postings(query)
+    if postings is None:
+        return None
+    if queryset is not None:
+        postings = postings.filter(question_id__in=queryset.order_by().values('id'))
+    return list(postings.order_by('-score', 'question_id').values_list('question_id', flat=True))
+
+
+def highlight(text, query):
+    """
+    検索語のbigramに一致した部分を<mark>で囲んだ抜粋を返す（HTMLエスケープ済み）
+
+    一致する部分がなければNoneを返す。
+    """
+    if not text:
+        return None
+
+    # 正規化後の文字ごとに元の文字の位置を記録しておく
+    normalized = []
+    positions = []
+    for position, char in enumerate(text):
+        for normalized_char in normalize(char):
+            normalized.append(normalized_char)
+            positions.append(position)
+    normalized = ''.join(normalized)
+
+    marked = [False] * len(text)
+    for word in normalize(query).split():
+        # 語がそのまま含まれていればその部分だけ、なければbigram単位で囲む
+        if len(word) == 1 or word in normalized:
+            patterns = [word]
+        else:
+            patterns = [word[index:index + 2] for index in range(len(word) - 1)]
+        for pattern in patterns:
+            start = normalized.find(pattern)
+            while start != -1:
+                for index in range(start, start + len(pattern)):
+                    marked[positions[index]] = True
+                start = normalized.find(pattern, start + 1)
+
+    if not any(marked):
+        return None
+
+    begin = max(marked.index(True) - SNIPPET_CONTEXT, 0)
+    end = min(begin + SNIPPET_LENGTH, len(text))
+    parts = ['…'] if begin > 0 else []
+    run_start = begin
+    for index in range(begin + 1, end + 1):
+        if index == end or marked[index] != marked[run_start]:
+            segment = html.escape(text[run_start:index])
+            parts.append(f'<mark>{segment}</mark>' if marked[run_start] else segment)
+            run_start = index
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def question_highlights(question, query):
+    """問題の各フィールドの抜粋（一致したフィールドのみ）"""
+    highlights = {}
+    for field in FIELD_WEIGHTS:
+        snippet = highlight(question.get(field), query)
+        if snippet is not None:
+            highlights[field] = snippet
+    return highlights
@@ -1,16 +1,22 @@
 from rest_framework import serializers
-from .models import Genre, Question, Choice
+from .models import Genre, Question, Choice, BulkActionJob
 
 
 class GenreSerializer(serializers.ModelSerializer):
     """ジャンルのシリアライザー"""
-    question_count = serializers.IntegerField(source='questions.count', read_only=True)
+    question_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Genre
         fields = ['id', 'name', 'description', 'question_count', 'created_at']
         read_only_fields = ['created_at']
 
+    def get_question_count(self, obj):
+        # 集計済みの問題数があればそれを使う（ジャンルごとのCOUNTを避ける）
+        if hasattr(obj, 'question_count'):
+            return obj.question_count
+        return obj.questions.count()
+
 
 class ChoiceSerializer(serializers.ModelSerializer):
     """選択肢のシリアライザー"""
@@ -57,3 +63,23 @@ class QuestionWithoutAnswerSerializer(serializers.ModelSerializer):
             'choices', 'created_at', 'is_active'
         ]
         read_only_fields = ['created_at']
+
+
+class BulkActionJobSerializer(serializers.ModelSerializer):
+    """問題一括操作ジョブのシリアライザー"""
+    progress = serializers.ReadOnlyField()
+    message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BulkActionJob
+        fields = [
+            'id', 'action', 'status', 'total', 'processed', 'affected', 'progress',
+            'message', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_message(self, obj):
+        if obj.status == 'completed':
+            return f'{obj.affected}件の問題を{obj.get_action_display()}しました'
+        if obj.status == 'failed':
+            return f'{obj.get_action_display()}に失敗しました（{obj.processed}/{obj.total}件処理済み）'
+        return f'{obj.get_action_display()}を{obj.get_status_display()}です（{obj.processed}/{obj.total}件）'
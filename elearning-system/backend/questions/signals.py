@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import admin_stats
+from .search import FIELD_WEIGHTS, index_questions
+from .models import Genre, Question
+
+
+def _may_change_active(update_fields):
+    """保存したフィールドに is_active が含まれうるか"""
+    return update_fields is None or 'is_active' in update_fields
+
+
+@receiver(post_save, sender=Question)
+def count_saved_question(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        admin_stats.increment('total_questions')
+        if instance.is_active:
+            admin_stats.increment('active_questions')
+    elif _may_change_active(update_fields):
+        admin_stats.invalidate('active_questions')
+
+    if update_fields is None or set(update_fields) & set(FIELD_WEIGHTS):
+        index_questions([instance.pk])
+
+
+@receiver(post_delete, sender=Question)
+def count_deleted_question(sender, instance, **kwargs):
+    admin_stats.increment('total_questions', -1)
+    if instance.is_active:
+        admin_stats.increment('active_questions', -1)
+
+
+@receiver(post_save, sender=Genre)
+def count_saved_genre(sender, instance, created, **kwargs):
+    if created:
+        admin_stats.increment('total_genres')
+
+
+@receiver(post_delete, sender=Genre)
+def count_deleted_genre(sender, instance, **kwargs):
+    admin_stats.increment('total_genres', -1)
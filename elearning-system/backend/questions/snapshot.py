@@ -0,0 +1,231 @@
+import hashlib
+import json
+import zipfile
+from datetime import datetime
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Genre, Question, Choice
+from .search import index_questions
+
+SNAPSHOT_FORMAT = 'elearning-question-bank'
+SNAPSHOT_VERSION = 1
+
+# (テーブル名, モデル, 列) スナップショットに含める列。作成者・更新者は環境ごとに異なるため含めない
+TABLES = [
+    ('genres', Genre, ['id', 'name', 'description', 'created_at']),
+    ('questions', Question, [
+        'id', 'genre_id', 'difficulty', 'point_weight', 'time_weight', 'body', 'object',
+        'clarification', 'is_active', 'created_at', 'updated_at',
+    ]),
+    ('choices', Choice, ['id', 'question_id', 'content', 'is_correct', 'order_index', 'created_at']),
+]
+DATETIME_COLUMNS = {'created_at', 'updated_at'}
+
+
+class SnapshotError(Exception):
+    """スナップショットの形式・チェックサムが不正な場合のエラー"""
+
+
+def _encode(values):
+    return json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def export_snapshot(path, since=None, chunk_size=5000):
+    """
+    問題バンクを列指向の圧縮スナップショット（zip）に書き出す
+
+    テーブルの列ごとにJSON配列を1メンバーとして格納し、manifest.json に
+    形式のバージョン・行数・列ごとのSHA-256を記録する。sinceを指定すると
+    それ以降に更新された問題とその選択肢だけを含む差分スナップショットになる。
+    """
+    with transaction.atomic():
+        questions = Question.objects.all()
+        if since is not None:
+            questions = questions.filter(updated_at__gte=since)
+        querysets = {
+            'genres': Genre.objects.all(),
+            'questions': questions,
+            'choices': Choice.objects.filter(question__in=questions.values('id')),
+        }
+        watermark = questions.aggregate(watermark=Max('updated_at'))['watermark'] or since
+
+        manifest = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'created_at': timezone.now().isoformat(),
+            'since': since.isoformat() if since else None,
+            'watermark': watermark.isoformat() if watermark else None,
+            'tables': {},
+        }
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for table, model, columns in TABLES:
+                data = {column: [] for column in columns}
+                rows = querysets[table].order_by('pk').values_list(*columns)
+                for row in rows.iterator(chunk_size=chunk_size):
+                    for column, value in zip(columns, row):
+                        data[column].append(value.isoformat() if column in DATETIME_COLUMNS else value)
+
+                checksums = {}
+                for column, values in data.items():
+                    encoded = _encode(values)
+                    archive.writestr(f'{table}/{column}.json', encoded)
+                    checksums[column] = hashlib.sha256(encoded).hexdigest()
+                manifest['tables'][table] = {
+                    'rows': len(data[columns[0]]),
+                    'columns': checksums,
+                }
+            archive.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+
+def read_manifest(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            manifest = json.loads(archive.read('manifest.json'))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise SnapshotError(f'スナップショットを読み込めません: {e}')
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError('問題バンクのスナップショットではありません')
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f'未対応のスナップショット形式です（バージョン {manifest.get("version")}）')
+    return manifest
+
+
+def read_snapshot(path):
+    """スナップショットを読み込み、チェックサムを検証して (manifest, テーブルごとの列データ) を返す"""
+    manifest = read_manifest(path)
+    tables = {}
+    with zipfile.ZipFile(path) as archive:
+        for table, model, columns in TABLES:
+            info = manifest['tables'].get(table)
+            if info is None or set(info['columns']) != set(columns):
+                raise SnapshotError(f'{table} の列がこのバージョンのモデルと一致しません')
+            data = {}
+            for column in columns:
+                encoded = archive.read(f'{table}/{column}.json')
+                if hashlib.sha256(encoded).hexdigest() != info['columns'][column]:
+                    raise SnapshotError(f'チェックサムが一致しません: {table}/{column}')
+                values = json.loads(encoded)
+                if len(values) != info['rows']:
+                    raise SnapshotError(f'行数が一致しません: {table}/{column}')
+                if column in DATETIME_COLUMNS:
+                    values = [parse_datetime(value) for value in values]
+                data[column] = values
+            tables[table] = data
+    return manifest, tables
+
+
+def _rows(data):
+    columns = list(data)
+    return [dict(zip(columns, values)) for values in zip(*data.values())]
+
+
+def _insert(model, columns, rows):
+    """
+    新規行をexecutemanyで一括INSERTする
+
+    モデルのインスタンス化とSQLのコンパイルを1行ずつ行わないため、bulk_createより
+    大幅に速い。日時列だけはDBごとの形式に変換する。
+    """
+    if not rows:
+        return
+    fields = [model._meta.get_field(column) for column in columns]
+    adapt = connection.ops.adapt_datetimefield_value
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    params = [
+        [adapt(row[column]) if column in DATETIME_COLUMNS else row[column] for column in columns]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _upsert(model, columns, rows, batch_size, touched=None):
+    """
+    主キーで既存行を判定し、新規は一括INSERT、内容が変わった既存行はbulk_updateする
+
+    touchedを渡すと、登録・更新した行の主キーを追加する。
+    """
+    created = updated = 0
+    update_fields = [column for column in columns if column != 'id']
+    for offset in range(0, len(rows), batch_size):
+        batch = rows[offset:offset + batch_size]
+        existing = {
+            values[0]: values
+            for values in model.objects.filter(pk__in=[row['id'] for row in batch]).values_list(*columns)
+        }
+        new_rows = [row for row in batch if row['id'] not in existing]
+        changed = [
+            model(**row) for row in batch
+            if row['id'] in existing and tuple(row[column] for column in columns) != existing[row['id']]
+        ]
+        _insert(model, columns, new_rows)
+        model.objects.bulk_update(changed, update_fields, batch_size=500)
+        if touched is not None:
+            touched.extend(row['id'] for row in new_rows)
+            touched.extend(instance.pk for instance in changed)
+        created += len(new_rows)
+        updated += len(changed)
+    return created, updated
+
+
+@transaction.atomic
+def import_snapshot(tables, since=None, batch_size=2000):
+    """
+    読み込んだスナップショットを問題バンクに反映する
+
+    sinceを指定すると、それ以降に更新された問題とその選択肢だけを反映する。
+    反映した問題に含まれない選択肢は削除する。
+    """
+    genres = _rows(tables['genres'])
+    questions = _rows(tables['questions'])
+    choices = _rows(tables['choices'])
+    if since is not None:
+        questions = [row for row in questions if row['updated_at'] >= since]
+        question_ids = {row['id'] for row in questions}
+        choices = [row for row in choices if row['question_id'] in question_ids]
+
+    stats = {}
+    touched_questions = []
+    for table, model, columns in TABLES:
+        rows = {'genres': genres, 'questions': questions, 'choices': choices}[table]
+        stats[table] = _upsert(model, columns, rows, batch_size, touched_questions if model is Question else None)
+
+    # 一括登録ではシグナルが送られないため、登録・更新した問題の検索索引を作り直す
+    index_questions(touched_questions)
+
+    # スナップショットの問題に含まれなくなった選択肢を削除
+    choice_ids = {row['id'] for row in choices}
+    question_ids = [row['id'] for row in questions]
+    removed = 0
+    for offset in range(0, len(question_ids), batch_size):
+        stale = [
+            choice_id for choice_id in Choice.objects.filter(
+                question_id__in=question_ids[offset:offset + batch_size]
+            ).values_list('id', flat=True)
+            if choice_id not in choice_ids
+        ]
+        if stale:
+            Choice.objects.filter(id__in=stale).delete()
+            removed += len(stale)
+    stats['choices_removed'] = removed
+    return stats
+
+
+def parse_since(value):
+    """ISO形式の日時を解釈する（タイムゾーンがなければ現在のタイムゾーンとみなす）"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise SnapshotError(f'日時の形式が正しくありません: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
@@ -0,0 +1,85 @@
+import logging
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+from .models import BulkActionJob, Question
+from .cache import invalidate_question_bank
+from progress.models import UserAttempt
+
+logger = logging.getLogger(__name__)
+
+# 1トランザクションで処理する問題数
+BULK_ACTION_CHUNK_SIZE = 200
+
+# 削除する問題の回答履歴を1トランザクションで消す件数
+ATTEMPT_DELETE_BATCH_SIZE = 5000
+
+
+def delete_attempts(question_ids, batch_size=ATTEMPT_DELETE_BATCH_SIZE):
+    """
+    問題の回答履歴をbatch_size件ずつ短いトランザクションで削除する
+
+    問題の削除は回答履歴までカスケードするため、先に消しておくことで
+    問題を削除するトランザクションが長時間テーブルをロックしないようにする。
+    """
+    while True:
+        attempt_ids = list(
+            UserAttempt.objects.filter(question_id__in=question_ids).values_list('id', flat=True)[:batch_size]
+        )
+        if not attempt_ids:
+            return
+        with transaction.atomic():
+            UserAttempt.objects.filter(id__in=attempt_ids).delete()
+
+
+def apply_bulk_action(action, question_ids):
+    """1チャンク分の問題に操作を適用し、更新・削除した問題数を返す"""
+    questions = Question.objects.filter(id__in=question_ids)
+    if action == 'activate':
+        return questions.update(is_active=True, updated_at=timezone.now())
+    if action == 'deactivate':
+        return questions.update(is_active=False, updated_at=timezone.now())
+    if action == 'delete':
+        _, deleted = questions.delete()
+        return deleted.get(Question._meta.label, 0)
+    raise ValueError(f'Unknown bulk action: {action}')
+
+
+@shared_task(acks_late=True)
+def run_bulk_action(job_id, chunk_size=BULK_ACTION_CHUNK_SIZE):
+    """
+    問題の一括操作をchunk_size件ずつ処理する
+
+    チャンクごとに進捗を保存するため、ワーカーが途中で止まっても
+    再実行すれば処理済みの続きから再開する。
+    """
+    job = BulkActionJob.objects.get(id=job_id)
+    if job.status == 'completed':
+        return
+
+    job.status = 'running'
+    job.started_at = job.started_at or timezone.now()
+    job.error = ''
+    job.save(update_fields=['status', 'started_at', 'error'])
+
+    try:
+        while job.processed < job.total:
+            chunk = job.question_ids[job.processed:job.processed + chunk_size]
+            if job.action == 'delete':
+                # 回答履歴は問題の削除とは別の短いトランザクションで先に消す
+                delete_attempts(chunk)
+            with transaction.atomic():
+                job.affected += apply_bulk_action(job.action, chunk)
+                job.processed += len(chunk)
+                job.save(update_fields=['processed', 'affected'])
+        job.status = 'completed'
+    except Exception as exc:
+        logger.exception('Bulk action job %s failed', job_id)
+        job.status = 'failed'
+        job.error = str(exc)
+    finally:
+        # 途中で失敗しても処理済みのチャンクは反映されているため、常に無効化する
+        invalidate_question_bank()
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
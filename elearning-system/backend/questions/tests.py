@@ -0,0 +1,148 @@
+from functools import reduce
+from operator import and_
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .admin_stats import counter_key
+from .models import Genre, Question
+from .search import FIELD_WEIGHTS, filter_by_search, rank_questions
+
+User = get_user_model()
+
+
+class QuestionSearchTests(TestCase):
+    """問題のbigram索引での検索結果が、部分一致（icontains）での検索と一致すること"""
+
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(id='g01', name='プログラミング')
+        texts = [
+            ('Pythonのリスト内包表記', 'list', ''),
+            ('Javaのインターフェース', '', 'Pythonとは異なる'),
+            ('SQLのJOIN句', 'データベース', 'INNER JOINとOUTER JOIN'),
+            ('データ構造とアルゴリズム', '', 'リストとスタック'),
+            ('HTTPの状態コード', '', 'ステータス 404 Not Found'),
+        ]
+        for number, (body, target, clarification) in enumerate(texts):
+            Question.objects.create(
+                id=f'Q{number:05d}', genre=genre, difficulty=1,
+                body=body, object=target, clarification=clarification,
+            )
+
+    def setUp(self):
+        # 問題数（IDF）と問題バンクのバージョンのキャッシュを読み直させる
+        cache.clear()
+
+    def search(self, query):
+        return set(filter_by_search(Question.objects.all(), query).values_list('id', flat=True))
+
+    def icontains(self, query):
+        conditions = [
+            reduce(lambda left, right: left | right, [Q(**{f'{field}__icontains': word}) for field in FIELD_WEIGHTS])
+            for word in query.split()
+        ]
+        return set(Question.objects.filter(reduce(and_, conditions)).values_list('id', flat=True))
+
+    def assertMatchesIcontains(self, query):
+        expected = self.icontains(query)
+        self.assertEqual(self.search(query), expected, query)
+        return expected
+
+    def test_ascii_queries(self):
+        for query in ['python', 'PYTHON', 'join', 'outer', '404', 'not found']:
+            self.assertTrue(self.assertMatchesIcontains(query), query)
+
+    def test_japanese_queries(self):
+        for query in ['リスト', 'データ', '内包表記', '状態コード', 'python リスト']:
+            self.assertTrue(self.assertMatchesIcontains(query), query)
+
+    def test_single_character_prefix_query(self):
+        for query in ['デ', 'j', '句']:
+            self.assertTrue(self.assertMatchesIcontains(query), query)
+
+    def test_mid_word_query(self):
+        # 語の途中の文字列も、その位置のbigramで一致する
+        self.assertEqual(self.assertMatchesIcontains('ース'), {'Q00001', 'Q00002'})
+
+    def test_typo_query(self):
+        self.assertEqual(self.assertMatchesIcontains('pythom'), set())
+
+    def test_rank_prefers_body_matches(self):
+        self.assertEqual(rank_questions('python'), ['Q00000', 'Q00001'])
+
+    def test_reindex_on_save(self):
+        question = Question.objects.get(id='Q00003')
+        question.body = 'Kubernetesのポッド'
+        question.clarification = ''
+        question.save()
+
+        self.assertEqual(self.assertMatchesIcontains('kubernetes'), {'Q00003'})
+        self.assertEqual(self.assertMatchesIcontains('アルゴリズム'), set())
+        self.assertEqual(self.assertMatchesIcontains('リスト'), {'Q00000'})
+
+
+class AdminStatsTests(TestCase):
+    """シグナルで増減させたカウンターが、コミットした変更だけを反映して実際の件数と一致すること"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='password', is_staff=True)
+        cls.genre = Genre.objects.create(id='g01', name='ジャンル')
+        for number in range(3):
+            Question.objects.create(id=f'Q{number:05d}', genre=cls.genre, difficulty=1, body=f'問題 {number}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # カウンターをキャッシュに載せておく
+        self.stats()
+
+    def stats(self):
+        response = self.client.get(reverse('admin_stats'), {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertMatchesDirectCounts(self):
+        stats = self.stats()
+        self.assertEqual(stats['total_users'], User.objects.count())
+        self.assertEqual(stats['active_users'], User.objects.filter(is_active=True).count())
+        self.assertEqual(stats['total_questions'], Question.objects.count())
+        self.assertEqual(stats['active_questions'], Question.objects.filter(is_active=True).count())
+        self.assertEqual(stats['total_genres'], Genre.objects.count())
+        self.assertEqual(stats['recent_users'], User.objects.count())
+
+    def test_create_deactivate_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(username='learner', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(id='Q00010', genre=self.genre, difficulty=1, body='追加した問題')
+        # 件数は数え直さずにカウンターから返す
+        self.assertIsNotNone(cache.get(counter_key('total_users')))
+        self.assertMatchesDirectCounts()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_active = False
+            user.save()
+        self.assertMatchesDirectCounts()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.get(id='Q00000').delete()
+        self.assertMatchesDirectCounts()
+
+    def test_rolled_back_changes_are_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    User.objects.create_user(username='rolled-back', password='password')
+                    Question.objects.get(id='Q00001').delete()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertMatchesDirectCounts()
@@ -4,10 +4,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db.models import Q
-import random
 
 from .models import Genre, Question, Choice
 from .serializers import GenreSerializer, QuestionSerializer, QuestionWithoutAnswerSerializer
+from .answer_keys import get_answer_key
+from .pool import get_question_pool
+from .catalog import get_genre_catalog
 
 
 class GenreListView(generics.ListAPIView):
@@ -19,6 +21,14 @@ class GenreListView(generics.ListAPIView):
     serializer_class = GenreSerializer
     permission_classes = [AllowAny]
     
+    def list(self, request, *args, **kwargs):
+        # キャッシュ済みのジャンル一覧を返す
+        catalog = get_genre_catalog()
+        page = self.paginate_queryset(catalog)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(catalog)
+    
 
 class QuestionListView(generics.ListAPIView):
     """
@@ -51,42 +61,42 @@ class RandomQuestionsView(APIView):
     """
     ランダムな問題を取得するAPI
     クエリパラメータ:
-    - genre: ジャンルID（オプション）
+    - genre: ジャンルID（オプション、カンマ区切りで複数指定可）
     - count: 取得する問題数（デフォルト: 10）
-    - difficulty: 難易度（オプション）
+    - difficulty: 難易度（オプション、カンマ区切りで複数指定可）
+    - seed: 乱数シード（オプション、課題用に同じ問題を再現する場合）
     - hide_answers: 正解を隠すかどうか（デフォルト: false）
     """
     permission_classes = [AllowAny]  # 開発環境用に認証を無効化
     
     def get(self, request):
         # クエリパラメータを取得
-        genre_id = request.query_params.get('genre', None)
-        count = int(request.query_params.get('count', 10))
-        difficulty = request.query_params.get('difficulty', None)
+        genre_param = request.query_params.get('genre', None)
+        difficulty_param = request.query_params.get('difficulty', None)
+        seed = request.query_params.get('seed', None)
         hide_answers = request.query_params.get('hide_answers', 'false').lower() == 'true'
         
-        # 基本のクエリセット
-        queryset = Question.objects.filter(is_active=True).select_related('genre', 'author_user').prefetch_related('choices')
+        try:
+            count = int(request.query_params.get('count', 10))
+            genres = set(genre_param.split(',')) if genre_param else None
+            difficulties = {int(value) for value in difficulty_param.split(',')} if difficulty_param else None
+        except ValueError:
+            return Response({
+                'error': '問題数と難易度は数値で指定してください'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # ジャンルでフィルタリング
-        if genre_id:
-            queryset = queryset.filter(genre_id=genre_id)
-            
-        # 難易度でフィルタリング
-        if difficulty:
-            queryset = queryset.filter(difficulty=difficulty)
-            
-        # 問題IDのリストを取得
-        question_ids = list(queryset.values_list('id', flat=True))
+        # ワーカー内のインデックスからDBにアクセスせずにランダムに選択
+        selected_ids = get_question_pool().sample(
+            count,
+            genres=genres,
+            difficulties=difficulties,
+            seed=seed
+        )
         
-        # ランダムに選択
-        if len(question_ids) <= count:
-            selected_ids = question_ids
-        else:
-            selected_ids = random.sample(question_ids, count)
-            
         # 選択されたIDで問題を取得
-        questions = queryset.filter(id__in=selected_ids)
+        questions = Question.objects.filter(id__in=selected_ids, is_active=True).select_related(
+            'genre', 'author_user'
+        ).prefetch_related('choices')
         
         # シリアライズして返す
         if hide_answers:
@@ -126,29 +136,27 @@ class CheckAnswerView(APIView):
                 'error': '問題IDと選択肢IDが必要です'
             }, status=status.HTTP_400_BAD_REQUEST)
             
-        try:
-            question = Question.objects.get(id=question_id, is_active=True)
-            choice = question.choices.get(id=choice_id)
-            
-            # 正解かどうかチェック
-            is_correct = choice.is_correct
-            
-            # 正解の選択肢を取得
-            correct_choices = question.choices.filter(is_correct=True)
-            
-            response_data = {
-                'is_correct': is_correct,
-                'correct_choice_ids': list(correct_choices.values_list('id', flat=True)),
-                'clarification': question.clarification if is_correct or request.data.get('show_clarification', False) else None
-            }
-            
-            return Response(response_data, status=status.HTTP_200_OK)
-            
-        except Question.DoesNotExist:
+        # ワーカー内の正解表で判定（DBアクセスなし）
+        answer_key = get_answer_key()
+        entry = answer_key.get(str(question_id))
+        if entry is None:
             return Response({
                 'error': '問題が見つかりません'
             }, status=status.HTTP_404_NOT_FOUND)
-        except Choice.DoesNotExist:
+        
+        choice_ids, correct_choice_ids, _, _ = entry
+        if str(choice_id) not in choice_ids:
             return Response({
                 'error': '選択肢が見つかりません'
             }, status=status.HTTP_404_NOT_FOUND)
+        
+        # 正解かどうかチェック
+        is_correct = str(choice_id) in correct_choice_ids
+        
+        response_data = {
+            'is_correct': is_correct,
+            'correct_choice_ids': list(correct_choice_ids),
+            'clarification': answer_key.clarification(entry) if is_correct or request.data.get('show_clarification', False) else None
+        }
+        
+        return Response(response_data, status=status.HTTP_200_OK)